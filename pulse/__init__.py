@@ -1,21 +1,26 @@
 # System import
 import argparse
+import json
 import yaml
 from typing import List
 from os import path
 
 # Local imports
 from .logging import get_module_logger
+from .metrics import MetricsRegistry
 from .profiles import Profile
-from .profiles.storage import FileProfileStorage
+from .profiles.storage import SqliteProfileStorage, open_profile_storage
 from .providers import ProvidersManager
 from .cron import ProfileRunner
-from .cron.output import LogResultHandler
+from .cron.bus import ResultBus
+from .cron.cluster import ClusterNode, ClusterProfileStorage, SqliteLeaseCoordinator
+from .cron.shards import ShardSupervisor
 
 
 def main():
     default_input_config_file = "config/profiles_config.yaml"
     default_output_config_file = "config/profiles_config-template.yaml"
+    default_database_file = "config/profiles.db"
 
     _logger = get_module_logger(__name__)
 
@@ -45,7 +50,7 @@ def main():
 
         # Dump the profiles in the template file
         with open(filename, 'w') as file:
-            file.write(yaml.dump(templates))
+            file.write(yaml.safe_dump([template.to_dict() for template in templates], sort_keys=False))
 
         _logger.info(
             "Config template written into file '%s'. Edit it to your liking and use it as an input for the 'start' command.",
@@ -56,14 +61,98 @@ def main():
         The command that's executed for starting the app.
         """
 
-        # Resolve dependencies
+        # Run the profiles on worker processes, if more than one
+        if args.workers > 1:
+            ShardSupervisor(
+                args.input_filename, args.workers, ResultBus.from_config(), args.engine, args.cluster).start()
+            return
+
+        # Resolve dependencies (the result handlers first, as the 'log' one
+        # reconfigures the logging)
+        result_handler = ResultBus.from_config()
+        metrics = MetricsRegistry()
+
+        # Run only the profiles of the shards the node holds, if in a cluster
+        storage = open_profile_storage(args.input_filename)
+        node = None
+        if args.cluster:
+            node = ClusterNode.from_config(SqliteLeaseCoordinator(args.cluster))
+            storage = ClusterProfileStorage(storage, node)
+
         runner = ProfileRunner(
-            FileProfileStorage(args.input_filename),
-            ProvidersManager(),
-            LogResultHandler())
+            storage,
+            ProvidersManager(metrics),
+            result_handler,
+            metrics)
+
+        if node is not None:
+            runner.exit_if_idle = False
+            node.on_change(runner.reload)
+            node.start()
 
         # Start
-        runner.start()
+        try:
+            runner.start(args.engine)
+        finally:
+            if node is not None:
+                node.stop()
+
+    def _command_import(args):
+        """
+        The command that's executed for importing profiles into a database.
+        """
+
+        source = open_profile_storage(args.input_filename)
+        target = SqliteProfileStorage(args.output_filename)
+
+        # Mirror the source, the profiles missing from it are removed
+        profiles = list(source.iter_profiles())
+        ids = set(profile.id for profile in profiles)
+        target.put(profiles)
+        removed = [profile_id for profile_id in target.get_all_ids() if profile_id not in ids]
+        version = target.remove(removed)
+        target.close()
+
+        _logger.info(
+            "%s profile(s) imported, %s removed, into '%s' (version %s).",
+            len(profiles),
+            len(removed),
+            args.output_filename,
+            version)
+
+    def _command_bench(args):
+        """
+        The command that's executed for benchmarking.
+        """
+
+        # Imported here, as it registers the synthetic provider
+        from . import bench
+
+        if args.models:
+            report = bench.measure_models(args.models)
+        else:
+            report = bench.run(
+                [int(size) for size in args.sizes.split(',')],
+                {
+                    'engine': args.engine,
+                    'duration_s': args.duration,
+                    'interval_s': args.interval,
+                    'timeout_s': args.timeout,
+                    'latency_ms': args.latency_ms,
+                    'distribution': args.distribution,
+                    'error_rate': args.error_rate,
+                    'hang_rate': args.hang_rate,
+                    'hang_s': args.hang_s,
+                    'blocking': args.blocking
+                })
+
+        output = json.dumps(report, indent=2)
+        if args.output_filename:
+            with open(args.output_filename, 'w') as file:
+                file.write(output)
+            _logger.info("Benchmark report written into file '%s'.", args.output_filename)
+        else:
+            print(output)
 
     def _setup_usage_args():
         parser = argparse.ArgumentParser(
@@ -97,9 +186,77 @@ def main():
                                 '-i',
                                 '--input_filename',
                                 default=default_input_config_file,
-                                help='Configuration filename (default: {})'.format(default_input_config_file))
+                                help='Configuration filename, or profiles database (.db) filename (default: {})'.format(default_input_config_file))
+
+        start_parser.add_argument(
+                                '-e',
+                                '--engine',
+                                default=ProfileRunner.engines[0],
+                                choices=ProfileRunner.engines,
+                                help='Scheduling engine (default: {})'.format(ProfileRunner.engines[0]))
+
+        start_parser.add_argument(
+                                '-w',
+                                '--workers',
+                                type=int,
+                                default=1,
+                                help='Number of worker processes to shard the profiles across (default: 1)')
+
+        start_parser.add_argument(
+                                '-c',
+                                '--cluster',
+                                help='Join a cluster, through the lease database at this (shared) path')
         start_parser.set_defaults(func=_command_start)
 
+        # Import
+        import_parser = subparsers.add_parser(
+                                'import',
+                                help='Import the profiles of a configuration file into a profiles database.')
+
+        import_parser.add_argument(
+                                '-i',
+                                '--input_filename',
+                                default=default_input_config_file,
+                                help='Configuration filename (default: {})'.format(default_input_config_file))
+
+        import_parser.add_argument(
+                                '-o',
+                                '--output_filename',
+                                default=default_database_file,
+                                help='Profiles database filename (default: {})'.format(default_database_file))
+        import_parser.set_defaults(func=_command_import)
+
+        # Benchmark
+        bench_parser = subparsers.add_parser(
+                                'bench',
+                                help='Benchmark the runner with synthetic profiles and report as JSON.')
+
+        bench_parser.add_argument(
+                                '-s',
+                                '--sizes',
+                                default='1000,10000,100000',
+                                help='Comma separated numbers of profiles to run (default: 1000,10000,100000)')
+
+        bench_parser.add_argument(
+                                '-e',
+                                '--engine',
+                                default=ProfileRunner.engines[0],
+                                choices=ProfileRunner.engines,
+                                help='Scheduling engine (default: {})'.format(ProfileRunner.engines[0]))
+
+        bench_parser.add_argument('--duration', type=float, default=30, help='Seconds to run each size for (default: 30)')
+        bench_parser.add_argument('--interval', type=float, default=10, help='Run every x seconds (default: 10)')
+        bench_parser.add_argument('--timeout', type=float, default=1, help='Run timeout, in seconds (default: 1)')
+        bench_parser.add_argument('--latency-ms', type=float, default=20, help='Mean probe latency, in ms (default: 20)')
+        bench_parser.add_argument('--distribution', default='exp', help='Latency distribution: fixed, uniform, exp, lognormal (default: exp)')
+        bench_parser.add_argument('--error-rate', type=float, default=0.01, help='The part of the probes which fail (default: 0.01)')
+        bench_parser.add_argument('--hang-rate', type=float, default=0.001, help='The part of the probes which hang (default: 0.001)')
+        bench_parser.add_argument('--hang-s', type=float, default=30, help='How long a hung probe takes, in seconds (default: 30)')
+        bench_parser.add_argument('--blocking', action='store_true', help='Probes block a worker, instead of being non-blocking')
+        bench_parser.add_argument('--models', type=int, help='Instead, measure the memory and allocations of this many profiles and runs')
+        bench_parser.add_argument('-o', '--output_filename', help='Report filename (default: stdout)')
+        bench_parser.set_defaults(func=_command_bench)
+
         return parser.parse_args()
 
     menu_args = _setup_usage_args()
@@ -0,0 +1,391 @@
+# System imports
+import concurrent.futures
+import gc
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# Local imports
+from .cron import ProfileRunner
+from .cron.output import BaseResultHandler, ProfileResult
+from .cron.scheduler import Scheduler
+from .metrics import MetricsRegistry
+from .profiles import Profile
+from .profiles.storage import InMemoryProfileStorage
+from .providers import BaseProvider, Deadline, ParameterMetadata, ProviderResult, ProvidersManager, ResultStatus
+
+# The latency distributions of the synthetic provider, by name: mean (ms) to a sample (ms)
+distributions = {
+    'fixed': lambda mean: mean,
+    'uniform': lambda mean: random.uniform(0, 2 * mean),
+    'exp': lambda mean: random.expovariate(1 / mean) if mean > 0 else 0,
+    'lognormal': lambda mean: random.lognormvariate(0, 0.5) * mean / 1.1331
+}
+
+
+class _Plan(NamedTuple):
+    """
+    Description
+    --
+    The run plan of a synthetic profile.
+    """
+
+    latency_ms: float
+    distribution: Callable[[float], float]
+    error_rate: float
+    hang_rate: float
+    hang_s: float
+    blocking: bool
+
+
+class SyntheticProvider(BaseProvider):
+    """
+    Description
+    --
+    An in-process provider for benchmarking, which simulates a probe: it
+    takes a random time (see 'distributions'), fails at a given rate, and
+    hangs (ignores its deadline) at a given rate.
+
+    Non-blocking by default, like the network providers, blocking a worker
+    for the duration of the probe if 'Blocking' is 'true'.
+    """
+
+    _p_latency_ms = "LatencyMs"
+    _p_distribution = "Distribution"
+    _p_error_rate = "ErrorRate"
+    _p_hang_rate = "HangRate"
+    _p_hang_s = "HangS"
+    _p_blocking = "Blocking"
+
+    # The timeouts the probes caused, as opposed to the ones the runner did
+    _expected_timeouts = 0
+    _lock = threading.Lock()
+    _timer = None   # type: Scheduler
+
+    @classmethod
+    def expected_timeouts(cls) -> int:
+        """
+        The number of runs which were meant to time out.
+        """
+
+        return cls._expected_timeouts
+
+    def _discover_parameters(self) -> Dict[str, ParameterMetadata]:
+        return {
+            self._p_latency_ms: ParameterMetadata(description="The mean latency of a probe (ms)", required=True),
+            self._p_distribution: ParameterMetadata(description="The latency distribution: " + ', '.join(distributions)),
+            self._p_error_rate: ParameterMetadata(description="The part of the probes which fail (0..1)"),
+            self._p_hang_rate: ParameterMetadata(description="The part of the probes which hang (0..1)"),
+            self._p_hang_s: ParameterMetadata(description="How long a hung probe takes (seconds)"),
+            self._p_blocking: ParameterMetadata(description="Whether a probe blocks a worker (true/false)")
+        }
+
+    def _validate(self, parameters: Dict[str, str]) -> None:
+        float(parameters[self._p_latency_ms])
+        if parameters.get(self._p_distribution, 'exp') not in distributions:
+            raise ValueError("Unknown distribution '%s'!" % parameters[self._p_distribution])
+
+    def prepare(self, parameters: Dict[str, str]) -> _Plan:
+        return _Plan(
+                float(parameters[self._p_latency_ms]),
+                distributions[parameters.get(self._p_distribution, 'exp')],
+                float(parameters.get(self._p_error_rate, 0)),
+                float(parameters.get(self._p_hang_rate, 0)),
+                float(parameters.get(self._p_hang_s, 30)),
+                parameters.get(self._p_blocking, 'false').lower() == 'true')
+
+    def _sample(self, plan: _Plan, deadline: Deadline) -> Tuple[float, ProviderResult]:
+        """
+        Draws the outcome of a probe.
+
+        Returns
+        --
+        How long the probe takes (seconds) and its result.
+        """
+
+        budget_s = deadline.remaining(sys.float_info.max)
+
+        if random.random() < plan.hang_rate:
+            self._count_expected_timeout()
+            return plan.hang_s, ProviderResult(ResultStatus.TIMEOUT)
+
+        latency_s = plan.distribution(plan.latency_ms) / 1000
+
+        if latency_s >= budget_s:
+            self._count_expected_timeout()
+            return budget_s, ProviderResult(ResultStatus.TIMEOUT)
+
+        if random.random() < plan.error_rate:
+            return latency_s, ProviderResult(ResultStatus.RED)
+
+        return latency_s, ProviderResult(ResultStatus.GREEN, int(latency_s * 1000))
+
+    @classmethod
+    def _count_expected_timeout(cls) -> None:
+        with cls._lock:
+            cls._expected_timeouts += 1
+
+    def submit(self, parameters: _Plan, deadline: Deadline) -> Optional[concurrent.futures.Future]:
+        plan = self._plan_of(parameters)
+        if plan.blocking:
+            return None
+
+        if SyntheticProvider._timer is None:
+            with self._lock:
+                if SyntheticProvider._timer is None:
+                    SyntheticProvider._timer = Scheduler()
+                    SyntheticProvider._timer.start()
+
+        duration_s, result = self._sample(plan, deadline)
+
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+        self._timer.call_later(duration_s, future.set_result, result)
+
+        return future
+
+    def run(self, parameters: _Plan, deadline: Deadline = None) -> ProviderResult:
+        duration_s, result = self._sample(self._plan_of(parameters), deadline or Deadline())
+        time.sleep(duration_s)
+
+        return result
+
+
+class _CountingResultHandler(BaseResultHandler):
+    """
+    Description
+    --
+    Counts the results by status.
+    """
+
+    def __init__(self) -> None:
+        self.counts = dict.fromkeys((status.value for status in ResultStatus), 0)   # type: Dict[str, int]
+        self._lock = threading.Lock()
+
+    def handle_result(self, result: ProfileResult) -> None:
+        with self._lock:
+            self.counts[result.result.status.value] += 1
+
+
+def _run_size(profiles_count: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Description
+    --
+    Benchmarks the runner with a number of synthetic profiles, in the
+    current process.
+
+    Parameters
+    --
+    - profiles_count - the number of profiles to run.
+    - options - the benchmark options (see run).
+
+    Returns
+    --
+    The report of the run.
+    """
+
+    profiles = []
+    for i in range(profiles_count):
+        profile = Profile("Synthetic {}".format(i + 1), SyntheticProvider.__name__, options['interval_s'])
+        profile.timeout_s = options['timeout_s']
+        profile.provider_parameters = {
+            SyntheticProvider._p_latency_ms: str(options['latency_ms']),
+            SyntheticProvider._p_distribution: options['distribution'],
+            SyntheticProvider._p_error_rate: str(options['error_rate']),
+            SyntheticProvider._p_hang_rate: str(options['hang_rate']),
+            SyntheticProvider._p_hang_s: str(options['hang_s']),
+            SyntheticProvider._p_blocking: str(options['blocking']).lower()
+        }
+        profiles.append(profile)
+
+    storage = InMemoryProfileStorage()
+    storage.put(profiles)
+
+    metrics = MetricsRegistry()
+    handler = _CountingResultHandler()
+    runner = ProfileRunner(storage, ProvidersManager(metrics), handler, metrics)
+
+    # Sample the thread count, until the end of the run
+    peak_threads = [threading.active_count()]
+    done = threading.Event()
+
+    def sample_threads() -> None:
+        while not done.wait(0.5):
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+
+    threading.Thread(target=sample_threads, daemon=True).start()
+    threading.Timer(options['duration_s'], runner.stop).start()
+
+    started = time.monotonic()
+    runner.start(options['engine'])
+    elapsed_s = time.monotonic() - started
+    done.set()
+
+    snapshot = metrics.snapshot()
+    results = sum(handler.counts.values())
+    timeouts = handler.counts[ResultStatus.TIMEOUT.value]
+
+    return {
+        'profiles': profiles_count,
+        'duration_s': round(elapsed_s, 3),
+        'target_probes_per_s': round(profiles_count / options['interval_s'], 1),
+        'probes_per_s': round(results / elapsed_s, 1),
+        'results': handler.counts,
+        'schedule_lag_ms': snapshot['histograms'].get('schedule_lag_ms'),
+        'queue_wait_ms': snapshot['histograms'].get('queue_wait_ms{key=%s}' % SyntheticProvider.__name__),
+        'handler_latency_ms': snapshot['histograms'].get('handler_latency_ms'),
+        'runner_timeouts': max(timeouts - SyntheticProvider.expected_timeouts(), 0),
+        'provider_timeouts': SyntheticProvider.expected_timeouts(),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'peak_threads': peak_threads[0]
+    }
+
+
+def run(sizes: List[int], options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Description
+    --
+    Benchmarks the runner with synthetic profiles, a fresh process per size,
+    so the peak RSS and thread counts don't carry over.
+
+    Parameters
+    --
+    - sizes - the numbers of profiles to benchmark with.
+    - options - the benchmark options: engine, duration_s, interval_s,
+    timeout_s, latency_ms, distribution, error_rate, hang_rate, hang_s and
+    blocking.
+
+    Returns
+    --
+    The report: the environment, the options and a report per size.
+    """
+
+    if not sizes:
+        raise ValueError("sizes are required!")
+
+    if options['distribution'] not in distributions:
+        raise ValueError("Unknown distribution '%s'!" % options['distribution'])
+
+    reports = []
+    context = multiprocessing.get_context('spawn')
+    for size in sizes:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            reports.append(executor.submit(_run_size, size, options).result())
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': multiprocessing.cpu_count(),
+        'options': options,
+        'runs': reports
+    }
+
+
+def _measure_models(count: int) -> Dict[str, Any]:
+    """
+    Description
+    --
+    Measures the footprint of the models, in the current process.
+
+    Parameters
+    --
+    - count - the number of profiles (and runs) to measure with.
+
+    Returns
+    --
+    The report of the measurements.
+    """
+
+    # Profiles as loaded from a storage - the parameter names are distinct
+    # strings, as parsed
+    record = json.dumps({
+                'name': 'Synthetic',
+                'provider_id': SyntheticProvider.__name__,
+                'run_every_x_seconds': 10,
+                'provider_parameters': {
+                    SyntheticProvider._p_latency_ms: '0',
+                    SyntheticProvider._p_distribution: 'fixed',
+                    SyntheticProvider._p_error_rate: '0',
+                    SyntheticProvider._p_hang_rate: '0'}})
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    profiles = []
+    for i in range(count):
+        data = json.loads(record)
+        data['id'] = '%032x' % i
+        profiles.append(Profile.from_dict(data))
+    profile_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    # Runs of a provider which returns right away, keeping the results
+    runner = ProfileRunner(InMemoryProfileStorage(), ProvidersManager(), _CountingResultHandler())
+    runner._run_profile(profiles[0])
+
+    gc.collect()
+    collections = gc.get_stats()[0]['collections']
+    started = time.monotonic()
+    results = [runner._run_profile(profile) for profile in profiles]
+    elapsed_s = time.monotonic() - started
+    collections = gc.get_stats()[0]['collections'] - collections
+
+    # Again, traced (which is too slow to time)
+    del results
+    gc.collect()
+    tracemalloc.start()
+    before, blocks = tracemalloc.get_traced_memory()[0], len(tracemalloc.take_snapshot().traces)
+    results = [runner._run_profile(profile) for profile in profiles]
+    result_bytes = tracemalloc.get_traced_memory()[0] - before
+    result_blocks = len(tracemalloc.take_snapshot().traces) - blocks
+    tracemalloc.stop()
+
+    runner._pool.shutdown()
+    del results
+
+    return {
+        'profiles': count,
+        'bytes_per_profile': round(profile_bytes / count, 1),
+        'bytes_per_result': round(result_bytes / count, 1),
+        'blocks_per_result': round(result_blocks / count, 2),
+        'gc_collections_per_1k_runs': round(collections * 1000 / count, 2),
+        'us_per_run': round(elapsed_s * 1000000 / count, 2)
+    }
+
+
+def measure_models(count: int = 100000) -> Dict[str, Any]:
+    """
+    Description
+    --
+    Measures the memory per profile, and the memory, retained allocations
+    and garbage collections per run (of a provider which returns right
+    away), in a fresh process.
+
+    Parameters
+    --
+    - count - the number of profiles (and runs) to measure with.
+
+    Returns
+    --
+    The report: the environment and the measurements.
+    """
+
+    if count <= 0:
+        raise ValueError("count must be > 0")
+
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        report = executor.submit(_measure_models, count).result()
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'models': report
+    }
@@ -1,5 +1,6 @@
 # Import system
 from os import path
+from typing import Any, Callable
 import configparser
 
 
@@ -39,3 +40,34 @@ class Config:
             raise ValueError("Config section '%s' is missing!", section_name)
 
         return config[section_name].get(key_name)
+
+    @staticmethod
+    def load_typed(section_name: str, key_name: str, default: Any, type_: Callable[[str], Any] = int) -> Any:
+        """
+        Description
+        --
+        Loads a setting by setting section name and key, and converts it.
+
+        Parameters
+        --
+        - section_name - the name of the setting section.
+        - key_name - the name of the setting key.
+        - default - the value to fall back to, if the setting is missing or
+        invalid.
+        - type_ - converts the setting (e.g. int, float or str).
+
+        Returns
+        --
+        The setting value.
+        """
+
+        # Imported here, as the logging module loads its settings from here
+        from .logging import get_module_logger
+
+        try:
+            value = Config.load(section_name, key_name)
+            return default if value is None else type_(value)
+        except Exception:
+            get_module_logger(__name__).warning(
+                "Could not parse setting '%s' from config section '%s'", key_name, section_name)
+            return default
@@ -1,19 +1,21 @@
 # System imports
+import asyncio
 import concurrent.futures
-import time
 import threading
-from datetime import datetime
-
-# Thirdparty
-import schedule
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 # Local imports
 from ..config import Config
 from ..logging import get_module_logger
+from ..metrics import MetricsRegistry
 from ..profiles import Profile
 from ..profiles.storage import BaseProfileStorage
-from ..providers import ProviderResult, ResultStatus, ProvidersManager
-from .output import LogResultHandler, ProfileResult
+from ..providers import Deadline, ProviderResult, ResultStatus, ProvidersManager
+from .output import BaseResultHandler, ProfileResult
+from .pool import WorkerPool
+from .scheduler import Scheduler, next_deadline, phase_delay
 
 
 class ProfileRunner:
@@ -23,17 +25,26 @@ class ProfileRunner:
     Runs the profiles.
     """
 
+    # The supported scheduling engines
+    engines = ['thread', 'asyncio']
+
+    # Exit if no valid profiles are loaded, instead of waiting for some
+    exit_if_idle = True
+
     def __init__(
                 self,
                 profile_storage: BaseProfileStorage,
                 providers_manager: ProvidersManager,
-                result_handler: LogResultHandler) -> None:
+                result_handler: BaseResultHandler,
+                metrics: MetricsRegistry = None) -> None:
         """
         Parameters
         --
         - profile_storage - an instance of a profile storage.
         - providers_manager - an instance of a providers manager.
         - result_handler - an instance of result handler.
+        - metrics - the registry to record the internal metrics in (default:
+        a new one).
         """
 
         if profile_storage is None:
@@ -49,23 +60,169 @@ class ProfileRunner:
         self._providers_manager = providers_manager
         self._logger = get_module_logger(__name__)
         self._result_handler = result_handler
+        self._metrics = metrics if metrics is not None else MetricsRegistry()
+
+        self._max_run_timeout_s = self._load_int_setting('max_run_timeout_s', 1)
+        self._reload_interval_s = self._load_int_setting('reload_interval_s', 5)
+        self._metrics_log_interval_s = self._load_int_setting('metrics_log_interval_s', 60)
+        self._coalesce_probes = self._load_int_setting('coalesce_probes', 1) > 0
+        self._pool = WorkerPool(
+                        self._load_int_setting('max_workers', 32),
+                        self._load_provider_limits(),
+                        self._load_int_setting('max_workers_per_provider', 0),
+                        self._metrics)
+
+        # The scheduled profiles, by Id, and their scheduled jobs
+        self._active = {}       # type: Dict[str, Profile]
+        self._jobs = {}         # type: Dict[str, object]
+
+        # The run plans of the scheduled profiles (see BaseProvider.prepare),
+        # and the probe keys of those sharing their probes, by Id
+        self._plans = {}        # type: Dict[str, Any]
+        self._probe_keys = {}   # type: Dict[str, Tuple]
+
+        # The shared probes in flight, by probe key
+        self._probes = {}       # type: Dict[Tuple, concurrent.futures.Future]
+        self._probes_lock = threading.Lock()
+
+        # The runs in flight, by profile Id, and what to do once they are
+        # done (e.g. release the provider instance of a removed profile)
+        self._in_flight = {}    # type: Dict[str, int]
+        self._when_done = {}    # type: Dict[str, List[Callable[[], None]]]
+        self._in_flight_lock = threading.Lock()
+        self._idle = threading.Condition(self._in_flight_lock)
+
+        # The invalid versions of profiles, which are not scheduled
+        self._rejected = {}     # type: Dict[str, Profile]
+        self._synced = False
+
+        # The version of the profile storage the engine is in sync with, if
+        # the storage tracks its changes
+        self._version = None    # type: int
+
+        # The running engine - the scheduler (thread) or the event loop (asyncio)
+        self._scheduler = None  # type: Scheduler
+        self._loop = None       # type: asyncio.AbstractEventLoop
+        self._runs = set()      # type: Set[asyncio.Task]
+        self._stopped = None    # type: asyncio.Future
+        self._reloading = False
+
+        self._metrics.gauge('runs_in_flight', lambda: self._pool.in_flight)
+        self._metrics.gauge('runs_queued', lambda: self._pool.queued)
+        self._metrics.gauge('profiles_active', lambda: len(self._active))
+        self._metrics.gauge('threads', threading.active_count)
+
+    def _load_int_setting(self, key_name: str, default: int) -> int:
+        """
+        Description
+        --
+        Loads an integer setting from the 'profile_runner' config section.
+
+        Parameters
+        --
+        - key_name - the name of the setting key.
+        - default - the value to fall back to, if the setting is invalid.
+
+        Returns
+        --
+        The setting value.
+        """
+
+        return Config.load_typed('profile_runner', key_name, default)
+
+    def _load_provider_limits(self) -> Dict[str, int]:
+        """
+        Description
+        --
+        Loads the per-provider concurrency limits from the 'profile_runner'
+        config section, in the format 'ProviderId:limit, ProviderId:limit'.
+
+        Returns
+        --
+        The concurrency limits, by provider Id.
+        """
+
+        limits = {}  # type: Dict[str, int]
 
         try:
-            self._max_run_timeout_s = int(Config.load('profile_runner', 'max_run_timeout_s'))
+            setting = Config.load('profile_runner', 'provider_limits') or ''
+            for pair in filter(None, (p.strip() for p in setting.split(','))):
+                provider_id, limit = pair.split(':')
+                limits[provider_id.strip()] = int(limit)
         except Exception:
             self._logger.warn(
-                "Could not parse integer setting '%s' from config section '%s", 'max_run_timeout_s', 'profile_runner')
-            self._max_run_timeout_s = 1
+                "Could not parse setting '%s' from config section '%s", 'provider_limits', 'profile_runner')
+
+        return limits
+
+    @property
+    def pool(self) -> WorkerPool:
+        """
+        The worker pool that runs the profiles. Exposes the number of runs in
+        flight and the queue depth.
+        """
+
+        return self._pool
 
-    def _run_profile(self, profile: Profile) -> ProfileResult:
+    @property
+    def metrics(self) -> MetricsRegistry:
+        """
+        The internal metrics of the runner: scheduling lag, queue wait, runs
+        in flight and queued, run durations and results by provider, and
+        result handler latency.
+        """
+
+        return self._metrics
+
+    def _log_metrics(self) -> None:
         """
         Description
         --
-        Runs a single profile.
+        Logs the internal metrics.
+        """
+
+        self._logger.info("Metrics: %s", self._metrics.summary())
+
+    def _log_backlog(self) -> None:
+        """
+        Description
+        --
+        Logs the queue depth, if runs are waiting over the concurrency limits.
+        """
+
+        if self._pool.queued:
+            self._logger.warn(
+                "%s run(s) in flight, %s run(s) queued over the concurrency limits: %s",
+                self._pool.in_flight, self._pool.queued, self._pool.queued_by_key())
+
+    def _timeout_s(self, profile: Profile) -> float:
+        """
+        Description
+        --
+        Gets the run timeout of a profile, which is its own override, if set,
+        or the runner's default.
+
+        Parameters
+        --
+        - profile - the profile.
+
+        Returns
+        --
+        The run timeout, in seconds.
+        """
+
+        return profile.timeout_s or self._max_run_timeout_s
+
+    def _run_profile(self, profile: Profile, plan: Any = None) -> ProfileResult:
+        """
+        Description
+        --
+        Runs a single profile, passing the provider the time budget of the run.
 
         Parameters
         --
         - profile - the profile to run.
+        - plan - the run plan to pass the provider (default: the profile's).
 
         Returns
         --
@@ -75,96 +232,975 @@ class ProfileRunner:
         if profile is None:
             raise ValueError("profile is required")
 
-        # Create an instance of the provider associated with the profile
-        provider_instance = self._providers_manager.instantiate(profile.provider_id)
+        # The budget starts along with the pool timeout, when the run starts
+        deadline = Deadline(self._timeout_s(profile))
+
+        # The (reused) instance of the provider associated with the profile
+        provider_instance = self._providers_manager.get_instance(profile.provider_id, profile.id)
+
+        if plan is None:
+            plan = self._plans.get(profile.id, profile.provider_parameters)
 
-        # Run the provider, by passing the profile parameters
-        profile_result = ProfileResult(profile, datetime.utcnow())
-        profile_result.result = provider_instance.run(profile.provider_parameters)
-        profile_result.finished_at = datetime.utcnow()
+        # Run the provider, by passing the run plan of the profile
+        profile_result = ProfileResult(profile)
+        profile_result.result = provider_instance.run(plan, deadline)
+        self._finish(profile_result)
+        self._metrics.observe(
+                        'run_duration_ms',
+                        (profile_result.finished_ns - profile_result.started_ns) / 1000000,
+                        provider=profile.provider_id)
+
+        return profile_result
+
+    def _finish(self, profile_result: ProfileResult) -> ProfileResult:
+        """
+        Description
+        --
+        Completes the result of a profile run, once the provider is done.
+
+        Parameters
+        --
+        - profile_result - the profile result, with the provider result set.
+
+        Returns
+        --
+        The profile result.
+        """
+
+        profile_result.finish()
 
         if (profile_result.result is None):
-            self._logger.error("Profile '%s' did not return any result!", profile.id)
+            self._logger.error("Profile '%s' did not return any result!", profile_result.profile.id)
+            profile_result.result = ProviderResult(ResultStatus.ERROR)
+
+        return profile_result
+
+    def _submit_nowait(self, profile: Profile, plan: Any = None) -> concurrent.futures.Future:
+        """
+        Description
+        --
+        Starts a profile run without a worker, if its provider supports it
+        (see BaseProvider.submit).
+
+        Parameters
+        --
+        - profile - the profile to run.
+        - plan - the run plan to pass the provider (default: the profile's).
+
+        Returns
+        --
+        The future of the profile result, or None if the run needs a worker.
+        """
+
+        provider_instance = self._providers_manager.get_instance(profile.provider_id, profile.id)
+        deadline = Deadline(self._timeout_s(profile))
+        started_ns = time.monotonic_ns()
+
+        if plan is None:
+            plan = self._plans.get(profile.id, profile.provider_parameters)
+
+        provider_future = provider_instance.submit(plan, deadline)
+        if provider_future is None:
+            return None
+
+        # The wall clock is read only for the runs which don't need a worker
+        profile_result = ProfileResult(profile, datetime.now(timezone.utc), started_ns)
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+
+        def done(provider_done: concurrent.futures.Future) -> None:
+            try:
+                profile_result.result = provider_done.result()
+                self._finish(profile_result)
+                self._metrics.observe(
+                                'run_duration_ms',
+                                (profile_result.finished_ns - started_ns) / 1000000,
+                                provider=profile.provider_id)
+                future.set_result(profile_result)
+            except Exception as err:
+                future.set_exception(err)
+
+        provider_future.add_done_callback(done)
+        return future
+
+    def _failed_result(self, profile: Profile, started_ns: int, err: Exception) -> ProfileResult:
+        """
+        Description
+        --
+        Builds the result of a profile run that did not complete normally.
+
+        Parameters
+        --
+        - profile - the profile that was ran.
+        - started_ns - when was the run started (time.monotonic_ns()).
+        - err - the reason the run did not complete.
+
+        Returns
+        --
+        The profile result.
+        """
+
+        # The start, on the wall clock
+        started_at = datetime.now(timezone.utc) - timedelta(microseconds=(time.monotonic_ns() - started_ns) // 1000)
+        profile_result = ProfileResult(profile, started_at, started_ns)
+        profile_result.finish()
+
+        # What is the reason?
+        if isinstance(err, (concurrent.futures.TimeoutError, asyncio.TimeoutError)):
+            # The run timed out
+            profile_result.result = ProviderResult(ResultStatus.TIMEOUT)
+        else:
+            # The run errored
+            # Log it
+            self._logger.error("Profile Id '%s' encountered error: %s", profile.id, err)
+
+            # Return generic error result
             profile_result.result = ProviderResult(ResultStatus.ERROR)
 
         return profile_result
 
+    def _handle(self, profile_result: ProfileResult) -> None:
+        """
+        Description
+        --
+        Passes a profile result to the result handler, if it is reportable.
+
+        Parameters
+        --
+        - profile_result - the profile result to handle.
+        """
+
+        status = profile_result.result.status
+        self._metrics.inc('runs_total', provider=profile_result.profile.provider_id, status=status.value)
+
+        if status in [ResultStatus.GREEN, ResultStatus.YELLOW, ResultStatus.RED, ResultStatus.TIMEOUT]:
+            started = time.monotonic()
+            self._result_handler.handle_result(profile_result)
+            self._metrics.observe('handler_latency_ms', (time.monotonic() - started) * 1000)
+
+    def _run_started(self, profile_id: str) -> None:
+        """
+        Description
+        --
+        Counts a run of a profile in flight.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile.
+        """
+
+        with self._in_flight_lock:
+            self._in_flight[profile_id] = self._in_flight.get(profile_id, 0) + 1
+
+    def _run_done(self, profile_id: str) -> None:
+        """
+        Description
+        --
+        Counts a run of a profile done (and handled), calling what waits for
+        the runs of the profile, once none are in flight.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile.
+        """
+
+        with self._in_flight_lock:
+            count = self._in_flight.pop(profile_id) - 1
+            if count > 0:
+                self._in_flight[profile_id] = count
+                return
+
+            callbacks = self._when_done.pop(profile_id, [])
+            if not self._in_flight:
+                self._idle.notify_all()
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as ex:
+                self._logger.error("Error cleaning up after profile Id '%s': %s", profile_id, ex)
+
+    def _after_runs(self, profile_id: str, callback: Callable[[], None]) -> None:
+        """
+        Description
+        --
+        Calls back once the runs of a profile in flight are done (and
+        handled), or right away if none are.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile.
+        - callback - what to call.
+        """
+
+        with self._in_flight_lock:
+            if profile_id in self._in_flight:
+                self._when_done.setdefault(profile_id, []).append(callback)
+                return
+
+        callback()
+
+    def _release(self, provider_id: str, profile_id: str) -> None:
+        """
+        Description
+        --
+        Releases the provider instance of a profile, once the runs of the
+        profile in flight, which may be using it, are done.
+
+        Parameters
+        --
+        - provider_id - the Id of the provider.
+        - profile_id - the Id of the profile.
+        """
+
+        self._after_runs(profile_id, lambda: self._providers_manager.release_instance(provider_id, profile_id))
+
+    def _submit(self, profile: Profile) -> concurrent.futures.Future:
+        """
+        Description
+        --
+        Starts a profile run, on a probe of its own or on a shared one (see
+        BaseProvider.probe_plan).
+
+        Parameters
+        --
+        - profile - the profile to run.
+
+        Returns
+        --
+        The future of the profile result.
+        """
+
+        probe_key = self._probe_keys.get(profile.id)
+        if probe_key is not None:
+            return self._submit_shared(profile, probe_key)
+
+        return self._submit_run(profile, self._plans.get(profile.id, profile.provider_parameters))
+
+    def _submit_run(self, profile: Profile, plan: Any) -> concurrent.futures.Future:
+        """
+        Description
+        --
+        Starts a profile run, right away if its provider doesn't block, or
+        on the worker pool otherwise.
+
+        Parameters
+        --
+        - profile - the profile to run.
+        - plan - the run plan to pass the provider.
+
+        Returns
+        --
+        The future of the profile result.
+        """
+
+        try:
+            future = self._submit_nowait(profile, plan)
+        except Exception as err:
+            future = concurrent.futures.Future()
+            future.set_exception(err)
+
+        if future is not None:
+            return future
+
+        return self._pool.submit(
+                        profile.provider_id,
+                        self._run_profile,
+                        profile,
+                        plan,
+                        timeout_s=self._timeout_s(profile))
+
+    def _submit_shared(self, profile: Profile, probe_key: Tuple) -> concurrent.futures.Future:
+        """
+        Description
+        --
+        Starts a profile run on the probe in flight with the same probe key,
+        or on a new one, and judges the result of the probe for the profile,
+        once done.
+
+        Parameters
+        --
+        - profile - the profile to run.
+        - probe_key - the probe key of the profile (see _probe_key).
+
+        Returns
+        --
+        The future of the profile result.
+        """
+
+        with self._probes_lock:
+            probe = self._probes.get(probe_key)
+            coalesced = probe is not None
+            if not coalesced:
+                # The probe plan is the last part of the key
+                probe = self._probes[probe_key] = self._submit_run(profile, probe_key[-1])
+
+        if coalesced:
+            self._metrics.inc('probes_coalesced', provider=profile.provider_id)
+        else:
+            def release(_: concurrent.futures.Future) -> None:
+                with self._probes_lock:
+                    if self._probes.get(probe_key) is probe:
+                        del self._probes[probe_key]
+
+            probe.add_done_callback(release)
+
+        provider_instance = self._providers_manager.get_instance(profile.provider_id, profile.id)
+        plan = self._plans.get(profile.id, profile.provider_parameters)
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+
+        def done(probe_done: concurrent.futures.Future) -> None:
+            try:
+                probe_result = probe_done.result()
+                profile_result = ProfileResult(profile, probe_result.started_at, probe_result.started_ns)
+                profile_result.finished_ns = probe_result.finished_ns
+                profile_result.result = provider_instance.judge(plan, probe_result.result)
+                future.set_result(profile_result)
+            except Exception as err:
+                future.set_exception(err)
+
+        probe.add_done_callback(done)
+        return future
+
     def _run_and_handle(self, profile: Profile) -> None:
+        """
+        Description
+        --
+        Runs a single profile on the worker pool and handles its result, once
+        done, without waiting for it.
+
+        Parameters
+        --
+        - profile - the profile to run.
+        """
+
         if profile is None:
             raise ValueError("profile is required")
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-            # Run
-            future = executor.submit(self._run_profile, profile)
-            profile_result = None   # type: ProfileResult
-            now = datetime.utcnow()
+        started_ns = time.monotonic_ns()
 
+        def done(future: concurrent.futures.Future) -> None:
             try:
-                # Normal profile result
-                profile_result = future.result(timeout=self._max_run_timeout_s)
-            except Exception as err:
-                # Profile result errored out
-                profile_result = ProfileResult(profile, now)
-                profile_result.finished_at = datetime.utcnow()
-
-                # What is the reason?
-                if isinstance(err, concurrent.futures._base.TimeoutError):
-                    # The thread timed out
-                    profile_result.result = ProviderResult(ResultStatus.TIMEOUT)
-                else:
-                    # The thread errored
-                    # Log it
-                    self._logger.error("Profile Id '%s' encountered error: %s", profile.id, err)
-
-                    # Return generic error result
-                    profile_result.result = ProviderResult(ResultStatus.ERROR)
+                if future.cancelled():
+                    return
+
+                try:
+                    # Normal profile result
+                    profile_result = future.result()
+                except Exception as err:
+                    # Profile result errored out
+                    profile_result = self._failed_result(profile, started_ns, err)
+
+                # Now handle the result.
+                self._handle(profile_result)
+            finally:
+                self._run_done(profile.id)
+
+        # Run
+        self._run_started(profile.id)
+        try:
+            future = self._submit(profile)
+        except BaseException:
+            self._run_done(profile.id)
+            raise
+
+        future.add_done_callback(done)
+
+    async def _async_run_and_handle(self, profile: Profile) -> None:
+        """
+        Description
+        --
+        Runs a single profile on the worker pool and handles its result on
+        the event loop.
+
+        Parameters
+        --
+        - profile - the profile to run.
+        """
+
+        if profile is None:
+            raise ValueError("profile is required")
+
+        started_ns = time.monotonic_ns()
+        self._run_started(profile.id)
+        try:
+            future = self._submit(profile)
+        except BaseException:
+            self._run_done(profile.id)
+            raise
+
+        try:
+            # Normal profile result
+            profile_result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # The run may go on (on its worker) until its future is done
+            future.add_done_callback(lambda _: self._run_done(profile.id))
+            raise
+        except Exception as err:
+            # Profile result errored out
+            profile_result = self._failed_result(profile, started_ns, err)
 
+        try:
             # Now handle the result.
-            if profile_result.result.status in [ResultStatus.GREEN, ResultStatus.YELLOW, ResultStatus.RED, ResultStatus.TIMEOUT]:
-                self._result_handler.handle_result(profile_result)
+            self._handle(profile_result)
+        finally:
+            self._run_done(profile.id)
+
+    def _fingerprint(self, profile: Profile) -> tuple:
+        """
+        Description
+        --
+        Gets what identifies the behaviour of a profile, to tell whether a
+        reloaded profile has changed.
+
+        Parameters
+        --
+        - profile - the profile.
+
+        Returns
+        --
+        The fingerprint of the profile.
+        """
+
+        return (
+            profile.name,
+            profile.provider_id,
+            profile.run_every_x_seconds,
+            profile.timeout_s,
+            tuple(sorted(profile.provider_parameters.items())))
+
+    def _prepare(self, profile: Profile) -> Any:
+        """
+        Description
+        --
+        Validates a profile and prepares its run plan, logging the reason if
+        it's invalid.
+
+        Parameters
+        --
+        - profile - the profile to prepare.
+
+        Returns
+        --
+        The run plan of the profile, None if the profile is invalid.
+        """
+
+        try:
+            # Validate profile
+            profile.self_validate()
+            provider_instance = self._providers_manager.get_prototype(profile.provider_id)
+            provider_instance.validate(profile.provider_parameters)
+
+            # Parsed once, rather than on every run
+            return provider_instance.prepare(profile.provider_parameters)
+        except Exception as ex:
+            self._logger.error("Error loading profile '%s': %s", profile.id, ex)
+            return None
+
+    def _probe_key(self, profile: Profile, plan: Any) -> Optional[Tuple]:
+        """
+        Description
+        --
+        Gets what identifies the probe of a profile, for the profiles with
+        the same probe to share it (see BaseProvider.probe_plan).
+
+        Parameters
+        --
+        - profile - the profile.
+        - plan - the run plan of the profile.
+
+        Returns
+        --
+        The provider Id, the run timeout and the probe plan, None if the
+        probe can't be shared.
+        """
+
+        if not self._coalesce_probes:
+            return None
+
+        probe_plan = self._providers_manager.get_prototype(profile.provider_id).probe_plan(plan)
+        if probe_plan is None:
+            return None
+
+        return (profile.provider_id, self._timeout_s(profile), probe_plan)
+
+    def _schedule(self, profile: Profile, plan: Any) -> None:
+        """
+        Description
+        --
+        Schedules a profile on the running engine. Profiles sharing an
+        interval are spread across it, by their Id, while the profiles
+        sharing a probe are lined up, by their probe key.
+
+        Parameters
+        --
+        - profile - the profile to schedule.
+        - plan - the run plan of the profile.
+        """
+
+        self._active[profile.id] = profile
+        self._plans[profile.id] = plan
+
+        probe_key = self._probe_key(profile, plan)
+        if probe_key is not None:
+            self._probe_keys[profile.id] = probe_key
+            phase_key = repr(probe_key)
+        else:
+            phase_key = profile.id
+
+        if self._loop is not None:
+            deadline = self._loop.time() + phase_delay(phase_key, profile.run_every_x_seconds)
+            self._jobs[profile.id] = self._loop.call_at(deadline, self._async_tick, profile.id, deadline)
+        else:
+            self._jobs[profile.id] = self._scheduler.every(
+                                                profile.run_every_x_seconds,
+                                                self._tick,
+                                                profile.id,
+                                                phase_key=phase_key)
+
+    def _unschedule(self, profile_id: str) -> None:
+        """
+        Description
+        --
+        Removes a profile from the running engine and releases its provider
+        instance, once its runs in flight are done.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile to unschedule.
+        """
+
+        profile = self._active.pop(profile_id)
+        job = self._jobs.pop(profile_id)
+        self._plans.pop(profile_id, None)
+        self._probe_keys.pop(profile_id, None)
+
+        if self._loop is not None:
+            job.cancel()
+        else:
+            self._scheduler.cancel(job)
+
+        self._release(profile.provider_id, profile_id)
+
+    def _remove(self, profile_id: str) -> None:
+        """
+        Description
+        --
+        Unschedules a removed profile, and tells the result handler to
+        forget it (e.g. its kept results and exported series), once the
+        results of its runs in flight are handled.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile to remove.
+        """
+
+        def drop() -> None:
+            # Unless added back in the meantime
+            if profile_id not in self._active:
+                self._result_handler.drop(profile_id)
+
+        self._unschedule(profile_id)
+        self._after_runs(profile_id, drop)
+
+    def _reschedule(self, previous: Profile, profile: Profile, plan: Any) -> None:
+        """
+        Description
+        --
+        Applies the changes of a profile to the running engine.
+
+        Parameters
+        --
+        - previous - the running version of the profile.
+        - profile - the changed version of the profile.
+        - plan - the run plan of the changed version.
+        """
+
+        same_interval = previous.run_every_x_seconds == profile.run_every_x_seconds
+        same_probe = self._probe_key(profile, plan) == self._probe_keys.get(profile.id)
+
+        if same_interval and same_probe:
+            # Runs pick the new version up, keeping their timing phase
+            self._active[profile.id] = profile
+            self._plans[profile.id] = plan
+            self._release(previous.provider_id, previous.id)
+        else:
+            self._unschedule(previous.id)
+            self._schedule(profile, plan)
+
+    def _apply(self, profile: Profile) -> Optional[str]:
+        """
+        Description
+        --
+        Applies a (possibly) added or changed profile to the running engine.
+
+        Parameters
+        --
+        - profile - the profile, as read from the profile storage.
+
+        Returns
+        --
+        'added' or 'changed', None if nothing changed.
+        """
+
+        previous = self._active.get(profile.id)
+
+        # Not reloaded, or already known to be invalid
+        if previous is profile or self._rejected.get(profile.id) is profile:
+            return None
+
+        # Reloaded, but not changed
+        if previous is not None and self._fingerprint(previous) == self._fingerprint(profile):
+            self._active[profile.id] = profile
+            return None
+
+        plan = self._prepare(profile)
+        if plan is None:
+            self._rejected[profile.id] = profile
+            return None
+
+        self._rejected.pop(profile.id, None)
+        if previous is None:
+            self._schedule(profile, plan)
+            return 'added'
+
+        self._reschedule(previous, profile, plan)
+        return 'changed'
+
+    def _read_changes(self) -> Tuple[Iterable[Profile], Optional[List[str]], int]:
+        """
+        Description
+        --
+        Reads the changes in the profile storage since the last sync. If the
+        storage tracks its changes, only those are read, otherwise all the
+        profiles are (a page at a time, as iterated).
+
+        Returns
+        --
+        The added and changed profiles (all of them, if the storage doesn't
+        track its changes), the Ids of the removed profiles (None if the
+        storage doesn't track its changes) and the version of the storage.
+        """
+
+        changes = self._profile_storage.changes_since(self._version) if self._version is not None else None
+        if changes is not None:
+            return changes.changed, changes.removed, changes.version
+
+        # Changes made during the read are read again, next time
+        version = self._profile_storage.get_version()
+        return self._profile_storage.iter_profiles(), None, version
+
+    def _sync(self, changes: Tuple[Iterable[Profile], Optional[List[str]], int] = None) -> None:
+        """
+        Description
+        --
+        Applies the changes in the profile storage (added, changed and
+        removed profiles) to the running engine. Unchanged profiles keep their
+        timing phase and provider instances. An invalid change of a running
+        profile is logged, while the previous version keeps running.
+
+        Parameters
+        --
+        - changes - the changes to apply (see _read_changes, default: read
+        them now).
+        """
+
+        profiles, removed_ids, version = changes if changes is not None else self._read_changes()
+        counts = {'added': 0, 'changed': 0, None: 0}
+        removed = 0
+
+        seen = set()    # type: Set[str]
+        for profile in profiles:
+            seen.add(profile.id)
+            counts[self._apply(profile)] += 1
+
+        if removed_ids is not None:
+            for profile_id in removed_ids:
+                self._rejected.pop(profile_id, None)
+                if profile_id in self._active:
+                    self._remove(profile_id)
+                    removed += 1
+        else:
+            for profile_id in [profile_id for profile_id in self._active if profile_id not in seen]:
+                self._remove(profile_id)
+                removed += 1
+
+            for profile_id in [profile_id for profile_id in self._rejected if profile_id not in seen]:
+                del self._rejected[profile_id]
+
+        self._version = version
+
+        added, changed = counts['added'], counts['changed']
+        if self._synced and (added or changed or removed):
+            self._logger.info("Profiles reloaded: %s added, %s changed, %s removed.", added, changed, removed)
+
+        self._synced = True
+
+    def _reload(self) -> None:
+        """
+        Description
+        --
+        Periodically applies the changes in the profile storage.
+        """
+
+        try:
+            self._sync()
+        except Exception as ex:
+            self._logger.error("Error reloading profiles: %s", ex)
+
+    async def _async_reload(self) -> None:
+        """
+        Description
+        --
+        Periodically applies the changes in the profile storage (asyncio
+        engine). The storage is read on the default executor, so the loop
+        keeps running the profiles meanwhile, while the changes are applied
+        on the loop.
+        """
+
+        if self._reloading:
+            return
+
+        def read() -> Tuple[Iterable[Profile], Optional[List[str]], int]:
+            profiles, removed_ids, version = self._read_changes()
+            return list(profiles), removed_ids, version
 
-    def start(self) -> None:
+        self._reloading = True
+        try:
+            self._sync(await self._loop.run_in_executor(None, read))
+        except Exception as ex:
+            self._logger.error("Error reloading profiles: %s", ex)
+        finally:
+            self._reloading = False
+
+    def _async_reload_later(self) -> None:
         """
         Description
         --
-        Sets up profile execution plans, according to their schedule.
+        Starts a reload of the profiles (asyncio engine), without waiting for
+        it.
         """
 
-        def run_threaded(profile: Profile) -> None:
-            threading.Thread(target=self._run_and_handle, args=(profile,)).start()
+        task = self._loop.create_task(self._async_reload())
+        self._runs.add(task)
+        task.add_done_callback(self._runs.discard)
+
+    def _load(self) -> bool:
+        """
+        Description
+        --
+        Loads and schedules the profiles on the running engine.
+
+        Returns
+        --
+        Were any valid profiles loaded?
+        """
 
         self._logger.info("Loading profiles ...")
-        # Read the profiles and schedule the tasks
-        for profile_id in self._profile_storage.get_all_ids():
-            profile = self._profile_storage.get(profile_id)
+        self._sync()
 
-            try:
-                # Validate profile
-                profile.self_validate()
-                provider_instance = self._providers_manager.instantiate(profile.provider_id)
-                provider_instance.validate(profile.provider_parameters)
-            except Exception as ex:
-                self._logger.error("Error loading profile '%s': %s", profile.id, ex)
-            else:
-                schedule.every(profile.run_every_x_seconds).seconds.do(run_threaded, profile)
+        if not self._active:
+            if not self.exit_if_idle:
+                self._logger.info("No valid profiles loaded, waiting for some ...")
+                return True
 
-        if not schedule.jobs:
             self._logger.critical("No valid profiles loaded, exiting!")
-            return
+            return False
         else:
-            self._logger.info("%s profile(s) loaded.", len(schedule.jobs))
+            self._logger.info("%s profile(s) loaded.", len(self._active))
 
-        self._logger.info("Starting loop ...")
+        return True
 
-        # run all jobs
-        schedule.run_all()
-        time.sleep(1)
+    def start(self, engine: str = 'thread') -> None:
+        """
+        Description
+        --
+        Sets up profile execution plans, according to their schedule, and
+        keeps them in sync with the profile storage.
 
-        while True:
-            try:
-                # Run the schedule
-                schedule.run_pending()
-                time.sleep(1)
-            except KeyboardInterrupt:
-                self._logger.info("Shutting down ...")
-                break
+        Parameters
+        --
+        - engine - the scheduling engine, 'thread' (the scheduler thread) or
+        'asyncio' (a single event loop). Either way, the providers run on the
+        bounded worker pool.
+        """
+
+        if engine not in self.engines:
+            raise ValueError("Unknown engine '%s'!", engine)
+
+        if engine == 'asyncio':
+            self._start_asyncio()
+        else:
+            self._start_threaded()
+
+    def stop(self) -> None:
+        """
+        Description
+        --
+        Stops the running engine (from any thread), which makes start()
+        shut down and return.
+        """
+
+        loop = self._loop
+        if loop is not None:
+            def stop() -> None:
+                if not self._stopped.done():
+                    self._stopped.set_result(None)
+
+            loop.call_soon_threadsafe(stop)
+        elif self._scheduler is not None:
+            self._scheduler.stop()
+
+    def reload(self) -> None:
+        """
+        Description
+        --
+        Applies the changes in the profile storage right away (from any
+        thread), instead of waiting for the periodic reload.
+        """
+
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._async_reload_later)
+        elif self._scheduler is not None:
+            self._scheduler.call_later(0, self._reload)
+
+    def _shutdown(self) -> None:
+        """
+        Description
+        --
+        Stops the worker pool, tears down the provider instances, once the
+        runs in flight are done (within their timeouts), and flushes the
+        result handler.
+        """
+
+        self._pool.shutdown(wait=False)
+
+        timeout_s = max([self._timeout_s(profile) for profile in self._active.values()], default=self._max_run_timeout_s)
+        with self._idle:
+            if not self._idle.wait_for(lambda: not self._in_flight, timeout_s):
+                self._logger.warning("%s run(s) still in flight at shutdown.", sum(self._in_flight.values()))
+
+        self._providers_manager.teardown()
+        self._result_handler.close()
+
+    def _tick(self, profile_id: str) -> None:
+        """
+        Description
+        --
+        Runs the current version of a profile (thread engine).
+
+        Parameters
+        --
+        - profile_id - the Id of the profile to run.
+        """
+
+        profile = self._active.get(profile_id)
+        if profile is not None:
+            self._run_and_handle(profile)
+
+    def _start_threaded(self) -> None:
+        """
+        Description
+        --
+        Runs the profiles on the scheduler, which runs on the calling thread.
+        """
+
+        self._scheduler = Scheduler(self._metrics)
+        if not self._load():
+            return
+
+        self._logger.info("Starting loop (engine: %s) ...", 'thread')
+
+        self._scheduler.every(1, self._log_backlog)
+        if self._metrics_log_interval_s > 0:
+            self._scheduler.every(self._metrics_log_interval_s, self._log_metrics)
+        if self._reload_interval_s > 0:
+            self._scheduler.every(self._reload_interval_s, self._reload)
+
+        try:
+            # Run the schedule
+            self._scheduler.run()
+        except KeyboardInterrupt:
+            self._logger.info("Shutting down ...")
+        finally:
+            self._shutdown()
+
+    def _start_asyncio(self) -> None:
+        """
+        Description
+        --
+        Runs the profiles on a single event loop. Scheduling and result
+        handling happen on the loop, while the (blocking) providers run on the
+        bounded worker pool.
+        """
+
+        try:
+            asyncio.run(self._async_main())
+        except KeyboardInterrupt:
+            self._logger.info("Shutting down ...")
+        finally:
+            self._loop = None
+            self._shutdown()
+
+    def _async_tick(self, profile_id: str, deadline: float) -> None:
+        """
+        Description
+        --
+        Runs the current version of a profile and schedules its next run
+        (asyncio engine).
+
+        Parameters
+        --
+        - profile_id - the Id of the profile to run.
+        - deadline - when was the run due (loop time).
+        """
+
+        profile = self._active.get(profile_id)
+        if profile is None:
+            return
+
+        now = self._loop.time()
+        self._metrics.observe('schedule_lag_ms', (now - deadline) * 1000)
+
+        # Start the run, keeping a reference to it until it's done
+        task = self._loop.create_task(self._async_run_and_handle(profile))
+        self._runs.add(task)
+        task.add_done_callback(self._runs.discard)
+
+        # Schedule the next run off the previous deadline, so it doesn't
+        # drift, skipping the runs missed while the loop was busy
+        deadline = next_deadline(deadline, profile.run_every_x_seconds, now)
+        self._jobs[profile_id] = self._loop.call_at(deadline, self._async_tick, profile_id, deadline)
+
+    async def _async_main(self) -> None:
+        """
+        Description
+        --
+        The event loop entry point. Schedules every profile and runs until
+        stopped.
+        """
+
+        self._stopped = asyncio.get_running_loop().create_future()
+        self._loop = asyncio.get_running_loop()
+        if not self._load():
+            return
+
+        self._logger.info("Starting loop (engine: %s) ...", 'asyncio')
+
+        def every(interval_s: float, callback) -> None:
+            def call() -> None:
+                callback()
+                self._loop.call_later(interval_s, call)
+
+            self._loop.call_later(interval_s, call)
+
+        every(1, self._log_backlog)
+        if self._metrics_log_interval_s > 0:
+            every(self._metrics_log_interval_s, self._log_metrics)
+        if self._reload_interval_s > 0:
+            every(self._reload_interval_s, self._async_reload_later)
+
+        # Run until stopped
+        await self._stopped
@@ -0,0 +1,392 @@
+# System imports
+import math
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+# Local imports
+from ..metrics import LatencyHistogram
+from ..providers import ResultStatus
+from .output import BaseResultHandler, ProfileResult
+
+# The rolling windows to aggregate over, by name (seconds)
+windows = {
+    '1m': 60,
+    '5m': 300,
+    '1h': 3600
+}   # type: Dict[str, int]
+
+_statuses = tuple(ResultStatus)
+_status_codes = {status: code for code, status in enumerate(_statuses)}
+
+
+class Aggregate:
+    """
+    Description
+    --
+    The aggregated results of one or more profiles: a histogram of the
+    values and the number of results by status. Mergeable.
+    """
+
+    __slots__ = ('latency', 'status_counts')
+
+    def __init__(self) -> None:
+        self.latency = LatencyHistogram()
+        self.status_counts = array('L', bytes(array('L').itemsize * len(_statuses)))
+
+    @property
+    def count(self) -> int:
+        """
+        The number of results.
+        """
+
+        return sum(self.status_counts)
+
+    def record(self, status: ResultStatus, value: Optional[float]) -> None:
+        """
+        Description
+        --
+        Records a result.
+
+        Parameters
+        --
+        - status - the status of the result.
+        - value - the value of the result, if any.
+        """
+
+        self.status_counts[_status_codes[status]] += 1
+
+        if value is not None and value >= 0:
+            self.latency.record(value)
+
+    def merge(self, other: 'Aggregate') -> 'Aggregate':
+        """
+        Description
+        --
+        Adds the results of another aggregate to this one.
+
+        Parameters
+        --
+        - other - the aggregate to merge in.
+
+        Returns
+        --
+        This aggregate.
+        """
+
+        self.latency.merge(other.latency)
+        for code, count in enumerate(other.status_counts):
+            self.status_counts[code] += count
+
+        return self
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Description
+        --
+        Estimates a percentile of the values.
+
+        Parameters
+        --
+        - percent - the percentile (0..100).
+
+        Returns
+        --
+        The percentile, or None if there are no values.
+        """
+
+        return self.latency.percentile(percent)
+
+    def ratios(self) -> Dict[ResultStatus, float]:
+        """
+        Description
+        --
+        Gets the part of the results with each status.
+
+        Returns
+        --
+        The ratios (0..1) by status, all 0 if there are no results.
+        """
+
+        total = self.count
+        return {status: (self.status_counts[code] / total if total else 0.0) for code, status in enumerate(_statuses)}
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Description
+        --
+        Summarizes the aggregate (p50/p95/p99 and ratios by status).
+
+        Returns
+        --
+        The summary, as a dictionary.
+        """
+
+        data = {
+            'count': self.count,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99)
+        }   # type: Dict[str, Any]
+
+        for status, ratio in self.ratios().items():
+            data[status.value] = ratio
+
+        return data
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Description
+        --
+        Converts the aggregate to plain data (e.g. to send to another process).
+
+        Returns
+        --
+        The aggregate, as a dictionary.
+        """
+
+        return {
+            'latency': self.latency.to_dict(),
+            'statuses': {status.value: self.status_counts[code] for code, status in enumerate(_statuses)}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Aggregate':
+        """
+        Description
+        --
+        Creates an aggregate from plain data (see to_dict).
+
+        Parameters
+        --
+        - data - the aggregate, as a dictionary.
+
+        Returns
+        --
+        The aggregate.
+        """
+
+        aggregate = cls()
+        aggregate.latency = LatencyHistogram.from_dict(data['latency'])
+        for status, count in data['statuses'].items():
+            aggregate.status_counts[_status_codes[ResultStatus(status)]] = count
+
+        return aggregate
+
+
+class _SlotRing:
+    """
+    Description
+    --
+    Aggregates the results of a profile in fixed time slots (e.g. 10s), kept
+    in a ring that covers a span of time. Slots are created on first use
+    and reset when the ring comes back around to them.
+    """
+
+    __slots__ = ('slot_s', '_slots', '_slot_ids')
+
+    def __init__(self, slot_s: int, count: int) -> None:
+        self.slot_s = slot_s
+        self._slots = [None] * count    # type: List[Aggregate]
+        self._slot_ids = [None] * count  # type: List[int]
+
+    @property
+    def span_s(self) -> int:
+        return self.slot_s * len(self._slots)
+
+    def record(self, timestamp: float, status: ResultStatus, value: Optional[float]) -> None:
+        slot_id = int(timestamp // self.slot_s)
+        position = slot_id % len(self._slots)
+
+        if self._slot_ids[position] != slot_id:
+            if self._slot_ids[position] is not None and self._slot_ids[position] > slot_id:
+                # Older than the span of the ring
+                return
+
+            self._slots[position] = Aggregate()
+            self._slot_ids[position] = slot_id
+
+        self._slots[position].record(status, value)
+
+    def window(self, window_s: float, now: float, into: Aggregate) -> Aggregate:
+        last = int(now // self.slot_s)
+        first = last - min(math.ceil(window_s / self.slot_s), len(self._slots)) + 1
+
+        for position, slot_id in enumerate(self._slot_ids):
+            if slot_id is not None and first <= slot_id <= last:
+                into.merge(self._slots[position])
+
+        return into
+
+
+class AggregatesStore(BaseResultHandler):
+    """
+    Description
+    --
+    Aggregates the results of every profile over rolling windows (up to an
+    hour), as they come in: percentiles of the values and ratios by status.
+    - Results are counted in 10s slots for the last minute and in 1m slots
+    for the last hour, so a window is accurate to a slot.
+    - Recording a result is O(1). Windows are merged from the slots when
+    queried, and profiles can be rolled up the same way (see fleet).
+    """
+
+    # The slots: (slot length, number of slots), fine to coarse
+    _resolutions = ((10, 6), (60, 60))
+
+    def __init__(self) -> None:
+        self._profiles = {}     # type: Dict[str, List[_SlotRing]]
+        self._lock = threading.Lock()
+
+    def _record(self, result: ProfileResult) -> None:
+        """
+        Records a result of a profile (under the lock).
+        """
+
+        if result.result is None:
+            return
+
+        rings = self._profiles.get(result.profile.id)
+        if rings is None:
+            rings = self._profiles[result.profile.id] = [_SlotRing(*resolution) for resolution in self._resolutions]
+
+        timestamp = result.started_at.timestamp()
+        for ring in rings:
+            ring.record(timestamp, result.result.status, result.result.value)
+
+    def handle_result(self, result: ProfileResult) -> None:
+        """
+        Description
+        --
+        Records a result in the aggregates of its profile.
+
+        Parameters
+        --
+        - result - the profile result.
+        """
+
+        with self._lock:
+            self._record(result)
+
+    def handle_results(self, batch: List[ProfileResult]) -> None:
+        """
+        Description
+        --
+        Records a batch of results in the aggregates of their profiles.
+
+        Parameters
+        --
+        - batch - the profile results.
+        """
+
+        with self._lock:
+            for result in batch:
+                self._record(result)
+
+    def _ring(self, rings: List[_SlotRing], window_s: float) -> _SlotRing:
+        """
+        Picks the finest ring which covers a window.
+        """
+
+        for ring in rings:
+            if window_s <= ring.span_s:
+                return ring
+
+        raise ValueError("window_s must be <= %s" % rings[-1].span_s)
+
+    def window(self, profile_id: str, window_s: float, now: float = None) -> Aggregate:
+        """
+        Description
+        --
+        Aggregates the results of a profile over a rolling window.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile.
+        - window_s - the length of the window, in seconds (see 'windows').
+        - now - the end of the window (epoch seconds, default: now).
+
+        Returns
+        --
+        The aggregate. Empty, if the profile has no results.
+        """
+
+        if not profile_id:
+            raise ValueError("profile_id is required!")
+
+        if window_s is None or window_s <= 0:
+            raise ValueError("window_s must be > 0")
+
+        if now is None:
+            now = time.time()
+
+        aggregate = Aggregate()
+        with self._lock:
+            rings = self._profiles.get(profile_id)
+            if rings is not None:
+                self._ring(rings, window_s).window(window_s, now, aggregate)
+
+        return aggregate
+
+    def fleet(self, window_s: float, profile_ids: List[str] = None, now: float = None) -> Aggregate:
+        """
+        Description
+        --
+        Rolls up the results of several profiles over a rolling window.
+
+        Parameters
+        --
+        - window_s - the length of the window, in seconds (see 'windows').
+        - profile_ids - the Ids of the profiles (default: all).
+        - now - the end of the window (epoch seconds, default: now).
+
+        Returns
+        --
+        The aggregate.
+        """
+
+        if profile_ids is None:
+            with self._lock:
+                profile_ids = list(self._profiles)
+
+        aggregate = Aggregate()
+        for profile_id in profile_ids:
+            aggregate.merge(self.window(profile_id, window_s, now))
+
+        return aggregate
+
+    def summary(self, profile_id: str, now: float = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Description
+        --
+        Summarizes the results of a profile over all the windows.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile.
+        - now - the end of the windows (epoch seconds, default: now).
+
+        Returns
+        --
+        The summaries (see Aggregate.summary), by window name.
+        """
+
+        if now is None:
+            now = time.time()
+
+        return {name: self.window(profile_id, window_s, now).summary() for name, window_s in windows.items()}
+
+    def drop(self, profile_id: str) -> None:
+        """
+        Description
+        --
+        Drops the aggregates of a profile.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile.
+        """
+
+        with self._lock:
+            self._profiles.pop(profile_id, None)
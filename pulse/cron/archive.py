@@ -0,0 +1,629 @@
+# System imports
+import glob
+import math
+import mmap
+import os
+import struct
+import threading
+import zlib
+from array import array
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Local imports
+from ..config import Config
+from ..logging import get_module_logger
+from ..providers import ResultStatus
+from .history import Samples
+from .output import BaseResultHandler, ProfileResult
+
+_statuses = tuple(ResultStatus)
+_status_codes = {status: code for code, status in enumerate(_statuses)}
+
+_INDEX_MAGIC = b'PULSE-ARCHIVE-1\n'
+_INDEX_HEADER = struct.Struct('<I')             # chunk_s
+_INDEX_ENTRY = struct.Struct('<qqQII')          # first_ms, last_ms, offset, length, count
+_BLOCK_HEADER = struct.Struct('<IIII')          # count, timestamps, values, statuses (lengths)
+_BLOCK_CRC = struct.Struct('<I')
+_DOUBLE = struct.Struct('<d')
+_QWORD = struct.Struct('<Q')
+
+# A missing value is archived as a NaN
+_NO_VALUE_BITS = _QWORD.unpack(_DOUBLE.pack(math.nan))[0]
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, position: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+class _BlockEncoder:
+    """
+    Description
+    --
+    Encodes the results of a profile within a time chunk, Gorilla-style, one
+    result at a time.
+    - Timestamps (ms) as the delta of their deltas (zigzag varints), which
+    is a single zero byte for a steady interval.
+    - Values (float64) XOR-ed with the previous value, keeping only the
+    meaningful bytes (a header byte + 0..8 bytes).
+    - Statuses as runs (varint code, varint length).
+    """
+
+    __slots__ = ('chunk_id', 'count', 'first_ms', 'last_ms', '_delta', '_bits',
+                 '_timestamps', '_values', '_statuses', '_status', '_run')
+
+    def __init__(self, chunk_id: int) -> None:
+        self.chunk_id = chunk_id
+        self.count = 0
+        self.first_ms = None    # type: int
+        self.last_ms = None     # type: int
+        self._delta = 0
+        self._bits = 0
+        self._timestamps = bytearray()
+        self._values = bytearray()
+        self._statuses = bytearray()
+        self._status = None     # type: int
+        self._run = 0
+
+    def append(self, timestamp_ms: int, status: ResultStatus, value: Optional[float]) -> None:
+        # Timestamp
+        if self.count == 0:
+            self.first_ms = timestamp_ms
+            _write_varint(self._timestamps, _zigzag(timestamp_ms))
+        else:
+            delta = timestamp_ms - self.last_ms
+            _write_varint(self._timestamps, _zigzag(delta - self._delta))
+            self._delta = delta
+
+        self.last_ms = timestamp_ms
+
+        # Value
+        bits = _NO_VALUE_BITS if value is None else _QWORD.unpack(_DOUBLE.pack(value))[0]
+        xor = bits ^ self._bits
+        self._bits = bits
+
+        if xor == 0:
+            self._values.append(0)
+        else:
+            trailing = ((xor & -xor).bit_length() - 1) // 8
+            length = (xor.bit_length() + 7) // 8 - trailing
+            self._values.append(trailing << 4 | length)
+            self._values += (xor >> trailing * 8).to_bytes(length, 'little')
+
+        # Status
+        code = _status_codes[status]
+        if code == self._status:
+            self._run += 1
+        else:
+            self._end_run()
+            self._status = code
+            self._run = 1
+
+        self.count += 1
+
+    def _end_run(self) -> None:
+        if self._run:
+            _write_varint(self._statuses, self._status)
+            _write_varint(self._statuses, self._run)
+
+    def encode(self) -> bytes:
+        """
+        Encodes the block: header, the three streams and a CRC.
+        """
+
+        self._end_run()
+        self._run = 0
+
+        block = _BLOCK_HEADER.pack(self.count, len(self._timestamps), len(self._values), len(self._statuses)) \
+            + self._timestamps + self._values + self._statuses
+
+        return block + _BLOCK_CRC.pack(zlib.crc32(block))
+
+
+def _decode_block(data: bytes) -> Tuple[array, array, array]:
+    """
+    Description
+    --
+    Decodes a block (see _BlockEncoder).
+
+    Returns
+    --
+    The timestamps (epoch seconds), status codes and values of the block.
+    """
+
+    crc_at = len(data) - _BLOCK_CRC.size
+    if zlib.crc32(data[:crc_at]) != _BLOCK_CRC.unpack_from(data, crc_at)[0]:
+        raise ValueError("Corrupt archive block!")
+
+    count, timestamps_len, values_len, _ = _BLOCK_HEADER.unpack_from(data, 0)
+    timestamps, statuses, values = array('d'), array('B'), array('d')
+
+    # Timestamps
+    position = _BLOCK_HEADER.size
+    timestamp_ms = delta = 0
+    for i in range(count):
+        encoded, position = _read_varint(data, position)
+        if i == 0:
+            timestamp_ms = _unzigzag(encoded)
+        else:
+            delta += _unzigzag(encoded)
+            timestamp_ms += delta
+        timestamps.append(timestamp_ms / 1000)
+
+    # Values
+    position = _BLOCK_HEADER.size + timestamps_len
+    bits = 0
+    for _ in range(count):
+        header = data[position]
+        position += 1
+        if header:
+            trailing, length = header >> 4, header & 0x0f
+            bits ^= int.from_bytes(data[position:position + length], 'little') << trailing * 8
+            position += length
+        values.append(_DOUBLE.unpack(_QWORD.pack(bits))[0])
+
+    # Statuses
+    position = _BLOCK_HEADER.size + timestamps_len + values_len
+    while len(statuses) < count:
+        code, position = _read_varint(data, position)
+        run, position = _read_varint(data, position)
+        statuses.extend([code] * run)
+
+    return timestamps, statuses, values
+
+
+class _IndexEntry(NamedTuple):
+    profile_id: str
+    first_ms: int
+    last_ms: int
+    offset: int
+    length: int
+    count: int
+
+
+def _parse_index(data: bytes, position: int = len(_INDEX_MAGIC) + _INDEX_HEADER.size) -> Tuple[List[_IndexEntry], int]:
+    """
+    Description
+    --
+    Parses the entries of an index.
+
+    Parameters
+    --
+    - data - the index, or its tail.
+    - position - where the first entry starts (default: after the header).
+
+    Returns
+    --
+    The entries and the end of the last whole one (an entry may have been
+    partially written, on a crash, or still being written).
+    """
+
+    entries = []
+    while position + 2 <= len(data):
+        id_length = struct.unpack_from('<H', data, position)[0]
+        entry_at = position + 2 + id_length
+        if entry_at + _INDEX_ENTRY.size > len(data):
+            break
+
+        profile_id = data[position + 2:entry_at].decode()
+        entries.append(_IndexEntry(profile_id, *_INDEX_ENTRY.unpack_from(data, entry_at)))
+        position = entry_at + _INDEX_ENTRY.size
+
+    return entries, min(position, len(data))
+
+
+class _Segment:
+    """
+    Description
+    --
+    An open (for appending) segment of the archive: the blocks of a time
+    chunk and their index.
+    """
+
+    def __init__(self, directory: str, chunk_id: int, chunk_s: int) -> None:
+        base_path = os.path.join(directory, str(chunk_id * chunk_s))
+
+        self.blocks = open(base_path + '.seg', 'ab')    # type: BinaryIO
+        self.index = open(base_path + '.idx', 'ab')     # type: BinaryIO
+
+        if self.index.tell() == 0:
+            self.index.write(_INDEX_MAGIC + _INDEX_HEADER.pack(chunk_s))
+        else:
+            # Drop a partially written entry, so the next ones line up
+            with open(base_path + '.idx', 'rb') as file:
+                _, end = _parse_index(file.read())
+            self.index.truncate(end)
+
+    def append(self, profile_id: str, encoder: _BlockEncoder) -> None:
+        block = encoder.encode()
+        offset = self.blocks.tell()
+        self.blocks.write(block)
+
+        encoded_id = profile_id.encode()
+        entry = _INDEX_ENTRY.pack(encoder.first_ms, encoder.last_ms, offset, len(block), encoder.count)
+        self.index.write(struct.pack('<H', len(encoded_id)) + encoded_id + entry)
+
+    def flush(self) -> None:
+        # The blocks go first, so the index never points past them
+        self.blocks.flush()
+        self.index.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.blocks.close()
+        self.index.close()
+
+
+class ResultArchive(BaseResultHandler):
+    """
+    Description
+    --
+    Archives the results of every profile on disk, compressed, for offline
+    queries (see ArchiveReader).
+    - Time is split into chunks (e.g. 2h), each with an append-only segment
+    file of blocks and an index file.
+    - The results of a profile are buffered in a block (see _BlockEncoder)
+    until its chunk is over or it's full, then appended to the segment.
+    - The index is written after the block, so a crash can only lose the
+    buffered results, not corrupt the archive.
+    """
+
+    def __init__(self, directory: str, chunk_s: int = 7200, block_size: int = 300) -> None:
+        """
+        Parameters
+        --
+        - directory - the directory of the archive.
+        - chunk_s - the length of a time chunk, in seconds.
+        - block_size - the maximum number of results per block.
+        """
+
+        if not directory:
+            raise ValueError("directory is required!")
+
+        if chunk_s is None or chunk_s <= 0:
+            raise ValueError("chunk_s must be > 0")
+
+        if block_size is None or block_size <= 0:
+            raise ValueError("block_size must be > 0")
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._directory = directory
+        self._chunk_ms = chunk_s * 1000
+        self._chunk_s = chunk_s
+        self._block_size = block_size
+        self._encoders = {}     # type: Dict[str, _BlockEncoder]
+        self._segments = {}     # type: Dict[int, _Segment]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> 'ResultArchive':
+        """
+        Description
+        --
+        Creates a result archive from the 'archive' config section.
+
+        Returns
+        --
+        The result archive.
+        """
+
+        return cls(
+                Config.load_typed('archive', 'directory', 'data/archive', str),
+                Config.load_typed('archive', 'chunk_s', 7200),
+                Config.load_typed('archive', 'block_size', 300))
+
+    def _segment(self, chunk_id: int) -> _Segment:
+        """
+        Gets the open segment of a chunk, opening it if needed.
+        """
+
+        segment = self._segments.get(chunk_id)
+        if segment is None:
+            segment = self._segments[chunk_id] = _Segment(self._directory, chunk_id, self._chunk_s)
+
+        return segment
+
+    def _write(self, profile_id: str, encoder: _BlockEncoder) -> None:
+        """
+        Appends a block to the segment of its chunk.
+        """
+
+        self._segment(encoder.chunk_id).append(profile_id, encoder)
+
+    def _append(self, result: ProfileResult) -> None:
+        """
+        Adds a result to the block of its profile (under the lock).
+        """
+
+        if result.result is None:
+            return
+
+        profile_id = result.profile.id
+        timestamp_ms = int(result.started_at.timestamp() * 1000)
+        chunk_id = timestamp_ms // self._chunk_ms
+
+        encoder = self._encoders.get(profile_id)
+        if encoder is not None and (encoder.chunk_id != chunk_id or encoder.count >= self._block_size):
+            self._write(profile_id, encoder)
+            encoder = None
+
+        if encoder is None:
+            encoder = self._encoders[profile_id] = _BlockEncoder(chunk_id)
+
+        encoder.append(timestamp_ms, result.result.status, result.result.value)
+
+    def _flush_segments(self) -> None:
+        """
+        Flushes the open segments, closing the ones of past chunks.
+        """
+
+        if not self._segments:
+            return
+
+        latest = max(self._segments)
+        for chunk_id in list(self._segments):
+            if chunk_id < latest:
+                self._segments.pop(chunk_id).close()
+            else:
+                self._segments[chunk_id].flush()
+
+    def handle_result(self, result: ProfileResult) -> None:
+        """
+        Description
+        --
+        Archives a result.
+
+        Parameters
+        --
+        - result - the profile result.
+        """
+
+        self.handle_results([result])
+
+    def handle_results(self, batch: List[ProfileResult]) -> None:
+        """
+        Description
+        --
+        Archives a batch of results.
+
+        Parameters
+        --
+        - batch - the profile results, in order of completion.
+        """
+
+        with self._lock:
+            for result in batch:
+                self._append(result)
+
+            self._flush_segments()
+
+    def flush(self) -> None:
+        """
+        Description
+        --
+        Writes the buffered results to the archive.
+        """
+
+        with self._lock:
+            for profile_id, encoder in self._encoders.items():
+                self._write(profile_id, encoder)
+
+            self._encoders.clear()
+            self._flush_segments()
+
+    def close(self) -> None:
+        """
+        Description
+        --
+        Writes the buffered results and closes the archive.
+        """
+
+        self.flush()
+
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+
+            self._segments.clear()
+
+
+class _ChunkIndex:
+    """
+    Description
+    --
+    The (loaded) index of a chunk, by profile Id.
+    """
+
+    __slots__ = ('chunk_ms', 'end', 'entries')
+
+    def __init__(self, chunk_ms: int) -> None:
+        self.chunk_ms = chunk_ms
+        self.end = len(_INDEX_MAGIC) + _INDEX_HEADER.size
+        self.entries = {}   # type: Dict[str, List[_IndexEntry]]
+
+
+class ArchiveReader:
+    """
+    Description
+    --
+    Queries a result archive (see ResultArchive), e.g. offline.
+    - The index of a chunk is loaded once, by profile Id, and only the
+    entries appended since are read by the later queries (e.g. of the
+    current chunk, while it's being archived).
+    - A query looks up the blocks of its profile in the indexes of the
+    chunks within its time range, and decodes them straight from the
+    memory-mapped segments.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        Parameters
+        --
+        - directory - the directory of the archive.
+        """
+
+        if not directory:
+            raise ValueError("directory is required!")
+
+        self._directory = directory
+        self._indexes = {}      # type: Dict[str, Optional[_ChunkIndex]]
+        self._lock = threading.Lock()
+
+    def _index(self, base_path: str) -> Optional[_ChunkIndex]:
+        """
+        Gets the index of a chunk, loading it (or the entries appended since
+        it was loaded) if needed. None if it's not an index of an archive.
+        """
+
+        index_path = base_path + '.idx'
+
+        with self._lock:
+            if base_path in self._indexes:
+                index = self._indexes[base_path]
+                if index is None or os.path.getsize(index_path) <= index.end:
+                    return index
+
+            with open(index_path, 'rb') as file:
+                if base_path not in self._indexes:
+                    header = file.read(len(_INDEX_MAGIC) + _INDEX_HEADER.size)
+                    if not header.startswith(_INDEX_MAGIC):
+                        get_module_logger(__name__).warn("Skipping unknown archive index '%s'", index_path)
+                        self._indexes[base_path] = None
+                        return None
+
+                    self._indexes[base_path] = _ChunkIndex(_INDEX_HEADER.unpack_from(header, len(_INDEX_MAGIC))[0] * 1000)
+
+                index = self._indexes[base_path]
+                file.seek(index.end)
+                entries, end = _parse_index(file.read(), 0)
+
+            for entry in entries:
+                profile_entries = index.entries.get(entry.profile_id)
+                if profile_entries is None:
+                    profile_entries = index.entries[entry.profile_id] = []
+                profile_entries.append(entry)
+
+            index.end += end
+            return index
+
+    def _chunks(self, since_ms: int, until_ms: int) -> Iterator[Tuple[str, _ChunkIndex]]:
+        """
+        Finds the chunks overlapping a time range.
+
+        Returns
+        --
+        The base paths and the indexes of the chunks, oldest first.
+        """
+
+        chunks = []
+        for index_path in glob.glob(os.path.join(self._directory, '*.idx')):
+            name = os.path.basename(index_path)[:-len('.idx')]
+            if name.isdigit():
+                chunks.append((int(name), index_path[:-len('.idx')]))
+
+        for start_s, base_path in sorted(chunks):
+            # Past the range
+            if start_s * 1000 >= until_ms:
+                break
+
+            index = self._index(base_path)
+            if index is not None and start_s * 1000 + index.chunk_ms > since_ms:
+                yield base_path, index
+
+    def profile_ids(self, since: float = None, until: float = None) -> List[str]:
+        """
+        Description
+        --
+        Gets the Ids of the profiles archived within a time range.
+
+        Parameters
+        --
+        - since - the start of the range (epoch seconds, inclusive).
+        - until - the end of the range (epoch seconds, exclusive).
+
+        Returns
+        --
+        The profile Ids.
+        """
+
+        since_ms, until_ms = self._range_ms(since, until)
+        profile_ids = set()
+        for _, index in self._chunks(since_ms, until_ms):
+            for profile_id, entries in index.entries.items():
+                if any(entry.first_ms < until_ms and entry.last_ms >= since_ms for entry in entries):
+                    profile_ids.add(profile_id)
+
+        return sorted(profile_ids)
+
+    @staticmethod
+    def _range_ms(since: Optional[float], until: Optional[float]) -> Tuple[int, int]:
+        return (
+            -2 ** 63 if since is None else math.ceil(since * 1000),
+            2 ** 63 - 1 if until is None else math.ceil(until * 1000))
+
+    def query(self, profile_id: str, since: float = None, until: float = None) -> Samples:
+        """
+        Description
+        --
+        Gets the archived results of a profile started within a time range.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile.
+        - since - the start of the range (epoch seconds, inclusive), default:
+        the oldest result.
+        - until - the end of the range (epoch seconds, exclusive), default:
+        the newest result.
+
+        Returns
+        --
+        The results, oldest first (within a chunk, in order of archiving).
+        """
+
+        if not profile_id:
+            raise ValueError("profile_id is required!")
+
+        since_ms, until_ms = self._range_ms(since, until)
+        samples = Samples(array('d'), array('B'), array('f'))
+
+        for base_path, index in self._chunks(since_ms, until_ms):
+            entries = [
+                entry for entry in index.entries.get(profile_id, ())
+                if entry.first_ms < until_ms and entry.last_ms >= since_ms]
+
+            if not entries:
+                continue
+
+            with open(base_path + '.seg', 'rb') as file, \
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as blocks:
+                for entry in sorted(entries, key=lambda entry: entry.first_ms):
+                    timestamps, statuses, values = _decode_block(blocks[entry.offset:entry.offset + entry.length])
+                    for timestamp, status, value in zip(timestamps, statuses, values):
+                        if since_ms <= round(timestamp * 1000) < until_ms:
+                            samples.timestamps.append(timestamp)
+                            samples.statuses.append(status)
+                            samples.values.append(value)
+
+        return samples
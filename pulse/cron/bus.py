@@ -0,0 +1,311 @@
+# System imports
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Union
+
+# Local imports
+from ..config import Config
+from ..logging import get_module_logger
+from .aggregates import AggregatesStore
+from .archive import ResultArchive
+from .exporter import OpenMetricsExporter
+from .history import HistoryStore
+from .output import BaseResultHandler, LogResultHandler, ProfileResult
+
+# The result handlers which can be configured as sinks, by name
+result_handlers = {
+    'log': LogResultHandler,
+    'history': HistoryStore.from_config,
+    'aggregates': AggregatesStore,
+    'archive': ResultArchive.from_config,
+    'openmetrics': OpenMetricsExporter.from_config
+}   # type: Dict[str, Callable[[], BaseResultHandler]]
+
+
+class _Drop(NamedTuple):
+    """
+    Description
+    --
+    A removed profile, queued along with the results (see ResultBus.drop).
+    """
+
+    profile_id: str
+
+
+class _SinkChannel:
+    """
+    Description
+    --
+    A bounded queue of results, drained in batches into a sink by its own
+    thread.
+    """
+
+    def __init__(self, name: str, sink: BaseResultHandler, capacity: int, batch_size: int, flush_interval_s: float) -> None:
+        self.name = name
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+
+        self.queue = deque()    # type: Deque[Union[ProfileResult, _Drop]]
+        self.cv = threading.Condition()
+        self.closed = False
+
+        # Counters
+        self.published = 0
+        self.handled = 0
+        self.dropped = 0
+        self.errors = 0
+        self.batches = 0
+
+        self.thread = threading.Thread(target=self._drain, name='pulse-sink-' + name, daemon=True)
+
+    def put(self, result: ProfileResult) -> None:
+        """
+        Queues a result, without ever blocking. When the queue is full, the
+        oldest result is dropped (the queued removals are kept).
+        """
+
+        with self.cv:
+            if len(self.queue) >= self.capacity:
+                oldest = next((index for index, item in enumerate(self.queue) if not isinstance(item, _Drop)), None)
+                if oldest is not None:
+                    del self.queue[oldest]
+                    self.dropped += 1
+
+            self.queue.append(result)
+            self.published += 1
+
+            if len(self.queue) >= self.batch_size:
+                self.cv.notify()
+
+    def put_drop(self, profile_id: str) -> None:
+        """
+        Queues the removal of a profile, after its queued results.
+        """
+
+        with self.cv:
+            self.queue.append(_Drop(profile_id))
+
+    def _handle(self, batch: List[ProfileResult]) -> None:
+        """
+        Passes a batch of results to the sink.
+        """
+
+        if not batch:
+            return
+
+        try:
+            self.sink.handle_results(batch)
+            self.handled += len(batch)
+        except Exception as ex:
+            self.errors += 1
+            get_module_logger(__name__).error(
+                "Result sink '%s' failed to handle %s result(s): %s", self.name, len(batch), ex)
+
+        self.batches += 1
+
+    def _drain(self) -> None:
+        """
+        The sink thread.
+        """
+
+        logger = get_module_logger(__name__)
+
+        while True:
+            with self.cv:
+                # Wait for a full batch, or for the flush interval
+                flush_at = time.monotonic() + self.flush_interval_s
+                while len(self.queue) < self.batch_size and not self.closed:
+                    remaining = flush_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cv.wait(remaining)
+
+                if not self.queue:
+                    if self.closed:
+                        return
+                    continue
+
+                batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+
+            # The results before a removal go first
+            results = []    # type: List[ProfileResult]
+            for item in batch:
+                if not isinstance(item, _Drop):
+                    results.append(item)
+                    continue
+
+                self._handle(results)
+                results = []
+                try:
+                    self.sink.drop(item.profile_id)
+                except Exception as ex:
+                    logger.error("Result sink '%s' failed to drop profile '%s': %s", self.name, item.profile_id, ex)
+
+            self._handle(results)
+
+
+class ResultBus(BaseResultHandler):
+    """
+    Description
+    --
+    Fans the profile results out to one or more sinks (result handlers).
+    - Publishing never blocks the caller.
+    - Every sink has its own bounded queue and thread, and gets the results
+    in batches, so a slow sink can only fall behind (and drop its oldest
+    results), but not stall the others or the scheduler.
+    """
+
+    def __init__(
+                self,
+                sinks: Dict[str, BaseResultHandler],
+                capacity: int = 10000,
+                batch_size: int = 100,
+                flush_interval_s: float = 0.5) -> None:
+        """
+        Parameters
+        --
+        - sinks - the result handlers to fan out to, by name.
+        - capacity - how many results can wait for each sink.
+        - batch_size - the maximum number of results per batch.
+        - flush_interval_s - how long a partial batch can wait, in seconds.
+        """
+
+        if not sinks:
+            raise ValueError("sinks are required!")
+
+        if capacity <= 0 or batch_size <= 0:
+            raise ValueError("capacity and batch_size must be > 0")
+
+        self._channels = [
+            _SinkChannel(name, sink, capacity, batch_size, flush_interval_s)
+            for name, sink in sinks.items()]    # type: List[_SinkChannel]
+
+        for channel in self._channels:
+            channel.thread.start()
+
+    @classmethod
+    def from_config(cls) -> 'ResultBus':
+        """
+        Description
+        --
+        Creates a result bus from the 'result_bus' config section.
+
+        Returns
+        --
+        The result bus.
+        """
+
+        names = [name.strip() for name in (Config.load_typed('result_bus', 'handlers', 'log', str) or 'log').split(',') if name.strip()]
+        for name in names:
+            if name not in result_handlers:
+                raise ValueError("Unknown result handler '%s'!" % name)
+
+        return cls(
+                {name: result_handlers[name]() for name in names},
+                Config.load_typed('result_bus', 'capacity', 10000),
+                Config.load_typed('result_bus', 'batch_size', 100),
+                Config.load_typed('result_bus', 'flush_interval_s', 0.5, float))
+
+    def sink(self, name: str) -> BaseResultHandler:
+        """
+        Description
+        --
+        Gets a sink, e.g. to query the 'history' sink.
+
+        Parameters
+        --
+        - name - the name of the sink.
+
+        Returns
+        --
+        The sink, or None if there's no such sink.
+        """
+
+        for channel in self._channels:
+            if channel.name == name:
+                return channel.sink
+
+        return None
+
+    def handle_result(self, result: ProfileResult) -> None:
+        """
+        Description
+        --
+        Publishes a result to all the sinks, without blocking.
+
+        Parameters
+        --
+        - result - the profile result.
+        """
+
+        if result is None:
+            return
+
+        for channel in self._channels:
+            channel.put(result)
+
+    def drop(self, profile_id: str) -> None:
+        """
+        Description
+        --
+        Tells all the sinks to forget a removed profile, once they handled
+        its queued results, without blocking.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile.
+        """
+
+        for channel in self._channels:
+            channel.put_drop(profile_id)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Description
+        --
+        Gets the counters of every sink.
+
+        Returns
+        --
+        The queued, published, handled, dropped and errored results and the
+        handled batches, by sink name.
+        """
+
+        return {
+            channel.name: {
+                'queued': len(channel.queue),
+                'published': channel.published,
+                'handled': channel.handled,
+                'dropped': channel.dropped,
+                'errors': channel.errors,
+                'batches': channel.batches
+            } for channel in self._channels}
+
+    def close(self, timeout_s: float = 5) -> None:
+        """
+        Description
+        --
+        Flushes the queued results into the sinks and closes them.
+
+        Parameters
+        --
+        - timeout_s - how long to wait for each sink to flush. A sink still
+        flushing after that is left open, rather than closed under its thread.
+        """
+
+        for channel in self._channels:
+            with channel.cv:
+                channel.closed = True
+                channel.cv.notify()
+
+        for channel in self._channels:
+            channel.thread.join(timeout_s)
+            if channel.thread.is_alive():
+                get_module_logger(__name__).warning(
+                    "Result sink '%s' did not flush within %ss, leaving it open", channel.name, timeout_s)
+                continue
+
+            channel.sink.close()
@@ -0,0 +1,484 @@
+# System imports
+import abc
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, FrozenSet, Iterator, List
+
+# Local imports
+from ..config import Config
+from ..logging import get_module_logger
+from ..profiles import Profile
+from ..profiles.storage import BaseProfileStorage
+from .shards import shard_of
+
+
+class BaseLeaseCoordinator(abc.ABC):
+    """
+    Description
+    --
+    The base abstract lease coordinator, shared by the nodes of a cluster.
+    The profiles are partitioned into a fixed number of shards, and every
+    shard is held by at most one node at a time, through a time-limited
+    lease.
+    """
+
+    @abc.abstractmethod
+    def heartbeat(self, node_id: str, shards: int, lease_s: float, release_grace_s: float) -> Dict[int, float]:
+        """
+        Description
+        --
+        Atomically renews the membership of a node and its leases, claims
+        its fair share of the free (or expired) shards and releases its
+        surplus. A released shard can't be claimed for release_grace_s, so
+        its previous holder has the time to stop running it.
+        Must be overriden.
+
+        Parameters
+        --
+        - node_id - the Id of the node.
+        - shards - the number of shards (must be the same on every node).
+        - lease_s - for how long are the membership and the leases renewed.
+        - release_grace_s - for how long can't a released shard be claimed.
+
+        Returns
+        --
+        The shards held by the node, and when do their leases expire (epoch
+        seconds).
+        """
+
+        pass
+
+    @abc.abstractmethod
+    def leave(self, node_id: str, release_grace_s: float) -> None:
+        """
+        Description
+        --
+        Removes a node from the cluster and releases its leases.
+        Must be overriden.
+
+        Parameters
+        --
+        - node_id - the Id of the node.
+        - release_grace_s - for how long can't the released shards be claimed.
+        """
+
+        pass
+
+
+class SqliteLeaseCoordinator(BaseLeaseCoordinator):
+    """
+    Description
+    --
+    A lease coordinator backed by an SQLite database on a path shared by the
+    nodes (e.g. a network share). Every heartbeat is a single write
+    transaction, so the nodes are serialized by the database lock.
+    - The lease expiries are wall clock times, so the clocks of the nodes
+    must be in sync (well within a lease period).
+    - The database uses the rollback journal, as WAL doesn't work over
+    network file systems.
+    - A heartbeat waits for the database lock for a quarter of the lease
+    period at most, so a node kept waiting stops running its shards (a
+    third of a lease period before they expire) rather than outlive them.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Parameters
+        --
+        - path - the database file.
+        """
+
+        if not path:
+            raise ValueError("path is required!")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS nodes (
+                node_id TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS leases (
+                shard INTEGER PRIMARY KEY,
+                node_id TEXT,
+                expires_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS leases_node_id ON leases (node_id);
+            """)
+
+    def heartbeat(self, node_id: str, shards: int, lease_s: float, release_grace_s: float) -> Dict[int, float]:
+        """
+        Description
+        --
+        Atomically renews the membership of a node and its leases, claims
+        its fair share of the free (or expired) shards and releases its
+        surplus.
+
+        Parameters
+        --
+        - node_id - the Id of the node.
+        - shards - the number of shards (must be the same on every node).
+        - lease_s - for how long are the membership and the leases renewed.
+        - release_grace_s - for how long can't a released shard be claimed.
+
+        Returns
+        --
+        The shards held by the node, and when do their leases expire (epoch
+        seconds).
+        """
+
+        if not node_id:
+            raise ValueError("node_id is required!")
+
+        if shards <= 0 or lease_s <= 0:
+            raise ValueError("shards and lease_s must be > 0")
+
+        with self._lock:
+            db = self._connection
+            db.execute("PRAGMA busy_timeout = %d" % (lease_s * 1000 / 4))
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                expires_at = now + lease_s
+
+                # Membership
+                db.execute("DELETE FROM nodes WHERE expires_at < ?", (now,))
+                db.execute("INSERT OR REPLACE INTO nodes VALUES (?, ?)", (node_id, expires_at))
+                nodes = db.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+
+                # The shards
+                db.execute("DELETE FROM leases WHERE shard >= ?", (shards,))
+                db.executemany("INSERT OR IGNORE INTO leases VALUES (?, NULL, 0)", ((shard,) for shard in range(shards)))
+
+                # Renew the (still valid) leases of the node
+                db.execute(
+                    "UPDATE leases SET expires_at = ? WHERE node_id = ? AND expires_at >= ?",
+                    (expires_at, node_id, now))
+                held = [row[0] for row in db.execute(
+                    "SELECT shard FROM leases WHERE node_id = ? AND expires_at >= ? ORDER BY shard", (node_id, now))]
+
+                fair_share = math.ceil(shards / nodes)
+                if len(held) > fair_share:
+                    # Release the surplus
+                    db.executemany(
+                        "UPDATE leases SET node_id = NULL, expires_at = ? WHERE shard = ?",
+                        ((now + release_grace_s, shard) for shard in held[fair_share:]))
+                    held = held[:fair_share]
+                elif len(held) < fair_share:
+                    # Claim the free and expired shards
+                    claimed = [row[0] for row in db.execute(
+                        "SELECT shard FROM leases WHERE expires_at < ? ORDER BY shard LIMIT ?",
+                        (now, fair_share - len(held)))]
+                    db.executemany(
+                        "UPDATE leases SET node_id = ?, expires_at = ? WHERE shard = ?",
+                        ((node_id, expires_at, shard) for shard in claimed))
+                    held += claimed
+
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+        return dict.fromkeys(held, expires_at)
+
+    def leave(self, node_id: str, release_grace_s: float) -> None:
+        """
+        Description
+        --
+        Removes a node from the cluster and releases its leases.
+
+        Parameters
+        --
+        - node_id - the Id of the node.
+        - release_grace_s - for how long can't the released shards be claimed.
+        """
+
+        with self._lock:
+            db = self._connection
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("DELETE FROM nodes WHERE node_id = ?", (node_id,))
+                db.execute(
+                    "UPDATE leases SET node_id = NULL, expires_at = ? WHERE node_id = ?",
+                    (time.time() + release_grace_s, node_id))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        """
+        Description
+        --
+        Closes the database.
+        """
+
+        with self._lock:
+            self._connection.close()
+
+
+class ClusterNode:
+    """
+    Description
+    --
+    A node of a cluster, which holds leases on shards of the profiles,
+    through a shared lease coordinator.
+    - It heartbeats every third of the lease period, so a failed node's
+    shards are taken over within a third of a lease period, once its leases
+    expire.
+    - A node stops running a shard a third of a lease period before its
+    lease expires (e.g. when the coordinator is unreachable), and a
+    released shard can't be claimed for a third of a lease period, so no
+    shard is run by two nodes at a time.
+    """
+
+    def __init__(
+                self,
+                coordinator: BaseLeaseCoordinator,
+                shards: int = 64,
+                lease_s: float = 15,
+                node_id: str = None) -> None:
+        """
+        Parameters
+        --
+        - coordinator - the lease coordinator, shared by the nodes.
+        - shards - the number of shards (must be the same on every node).
+        - lease_s - the lease period, in seconds.
+        - node_id - the Id of the node (default: host name, process Id and
+        a random suffix).
+        """
+
+        if coordinator is None:
+            raise ValueError("coordinator is required!")
+
+        if shards <= 0 or lease_s <= 0:
+            raise ValueError("shards and lease_s must be > 0")
+
+        self.shards = shards
+        self.node_id = node_id or "{}-{}-{}".format(socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+
+        self._coordinator = coordinator
+        self._lease_s = lease_s
+        self._guard_s = lease_s / 3
+        self._logger = get_module_logger(__name__)
+
+        self._leases = {}           # type: Dict[int, float]
+        self._owned = frozenset()   # type: FrozenSet[int]
+        self._listeners = []        # type: List[Callable[[], None]]
+        self._stopped = threading.Event()
+        self._thread = None         # type: threading.Thread
+
+    @classmethod
+    def from_config(cls, coordinator: BaseLeaseCoordinator) -> 'ClusterNode':
+        """
+        Description
+        --
+        Creates a node from the 'cluster' config section.
+
+        Parameters
+        --
+        - coordinator - the lease coordinator, shared by the nodes.
+
+        Returns
+        --
+        The node.
+        """
+
+        return cls(
+                coordinator,
+                Config.load_typed('cluster', 'shards', 64),
+                Config.load_typed('cluster', 'lease_s', 15, float),
+                Config.load_typed('cluster', 'node_id', None, str) or None)
+
+    @property
+    def owned(self) -> FrozenSet[int]:
+        """
+        The shards the node runs.
+        """
+
+        return self._owned
+
+    def owns(self, profile_id: str) -> bool:
+        """
+        Description
+        --
+        Does the node run a profile?
+
+        Parameters
+        --
+        - profile_id - the Id of the profile.
+
+        Returns
+        --
+        True if the node holds the lease on the shard of the profile.
+        """
+
+        return shard_of(profile_id, self.shards) in self._owned
+
+    def on_change(self, callback: Callable[[], None]) -> None:
+        """
+        Description
+        --
+        Registers a callback, called (from the node thread) when the shards
+        the node runs change.
+
+        Parameters
+        --
+        - callback - the callable to call.
+        """
+
+        self._listeners.append(callback)
+
+    def heartbeat(self) -> None:
+        """
+        Description
+        --
+        Renews the leases of the node and claims or releases shards, then
+        updates the shards it runs.
+        """
+
+        try:
+            self._leases = self._coordinator.heartbeat(self.node_id, self.shards, self._lease_s, self._guard_s)
+        except Exception as ex:
+            self._logger.error("Cluster heartbeat of node '%s' failed: %s", self.node_id, ex)
+
+        # Stop running the shards which are about to expire
+        deadline = time.time() + self._guard_s
+        owned = frozenset(shard for shard, expires_at in self._leases.items() if expires_at > deadline)
+        if owned == self._owned:
+            return
+
+        self._logger.info(
+            "Cluster node '%s' runs %s/%s shard(s) (+%s, -%s).",
+            self.node_id, len(owned), self.shards, len(owned - self._owned), len(self._owned - owned))
+        self._owned = owned
+
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as ex:
+                self._logger.error("Cluster change callback '%s' failed: %s", callback, ex)
+
+    def _run(self) -> None:
+        """
+        Heartbeats, until stopped.
+        """
+
+        while not self._stopped.wait(self._lease_s / 3):
+            self.heartbeat()
+
+    def start(self) -> None:
+        """
+        Description
+        --
+        Joins the cluster, claiming a fair share of the shards right away,
+        and heartbeats on a background (daemon) thread.
+        """
+
+        if self._thread is not None:
+            return
+
+        self.heartbeat()
+        self._thread = threading.Thread(target=self._run, name='pulse-cluster', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Description
+        --
+        Leaves the cluster, releasing the leases of the node.
+        """
+
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        self._owned = frozenset()
+        try:
+            self._coordinator.leave(self.node_id, self._guard_s)
+        except Exception as ex:
+            self._logger.error("Node '%s' failed to leave the cluster: %s", self.node_id, ex)
+
+
+class ClusterProfileStorage(BaseProfileStorage):
+    """
+    Description
+    --
+    The profiles of a profile storage which a cluster node runs.
+    """
+
+    def __init__(self, profile_storage: BaseProfileStorage, node: ClusterNode) -> None:
+        """
+        Parameters
+        --
+        - profile_storage - the storage of all the profiles.
+        - node - the cluster node.
+        """
+
+        if profile_storage is None:
+            raise ValueError("profile_storage is required!")
+
+        if node is None:
+            raise ValueError("node is required!")
+
+        self._profile_storage = profile_storage
+        self._node = node
+
+    def get_all_ids(self) -> List[str]:
+        """
+        Description
+        --
+        Gets the Ids of the profiles which the node runs.
+
+        Returns
+        --
+        A list of the Ids of the profiles which the node runs.
+        """
+
+        return [profile_id for profile_id in self._profile_storage.get_all_ids() if self._node.owns(profile_id)]
+
+    def iter_profiles(self, page_size: int = 500) -> Iterator[Profile]:
+        """
+        Description
+        --
+        Iterates over the profiles which the node runs, a page at a time.
+        The changes are not tracked, as the shards the node holds change
+        too.
+
+        Parameters
+        --
+        - page_size - how many profiles to load at a time.
+
+        Returns
+        --
+        An iterator over the profiles which the node runs.
+        """
+
+        for profile in self._profile_storage.iter_profiles(page_size):
+            if self._node.owns(profile.id):
+                yield profile
+
+    def get(self, profile_id: str) -> Profile:
+        """
+        Description
+        --
+        Gets a profile by Id.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile to get.
+
+        Returns
+        --
+        The profile.
+        """
+
+        return self._profile_storage.get(profile_id)
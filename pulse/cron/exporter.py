@@ -0,0 +1,281 @@
+# System imports
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+# Local imports
+from ..config import Config
+from ..logging import get_module_logger
+from ..providers import ResultStatus
+from .output import BaseResultHandler, ProfileResult
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# The metric families: name, type, help
+_FAMILIES = (
+    ('pulse_profile_status', 'stateset', 'The status of the latest run of a profile.'),
+    ('pulse_profile_value', 'gauge', 'The value of the latest run of a profile.'),
+    ('pulse_profile_run_duration_seconds', 'gauge', 'The duration of the latest run of a profile.'),
+    ('pulse_profile_last_run_timestamp_seconds', 'gauge', 'When was the latest run of a profile started.'),
+    ('pulse_profile_results', 'counter', 'The runs of a profile, by status.')
+)   # type: Tuple[Tuple[str, str, str], ...]
+
+_HEADERS = tuple(
+    '# TYPE {0} {1}\n# HELP {0} {2}\n'.format(name, type_, help_).encode() for name, type_, help_ in _FAMILIES)
+
+# How many profiles are rendered together, at most (see _Segment)
+_SEGMENT_SIZE = 64
+
+
+def _escape(value: str) -> str:
+    """
+    Escapes a label value.
+    """
+
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Series:
+    """
+    Description
+    --
+    The state of a profile and its rendered samples, one chunk per family.
+    """
+
+    __slots__ = ('labels', 'counts', 'chunks', 'segment')
+
+    def __init__(self, result: ProfileResult, segment: '_Segment') -> None:
+        profile = result.profile
+        self.labels = 'profile_id="{}",profile_name="{}",provider_id="{}"'.format(
+            _escape(profile.id), _escape(profile.name), _escape(profile.provider_id))
+        self.counts = dict.fromkeys(ResultStatus, 0)    # type: Dict[ResultStatus, int]
+        self.chunks = [''] * len(_FAMILIES)             # type: List[str]
+        self.segment = segment                          # type: _Segment
+
+    def update(self, result: ProfileResult) -> None:
+        """
+        Applies a result and renders the samples again.
+        """
+
+        status = result.result.status
+        self.counts[status] += 1
+        labels = self.labels
+
+        self.chunks[0] = ''.join(
+            'pulse_profile_status{{{},pulse_profile_status="{}"}} {}\n'.format(
+                labels, each.value, 1 if each == status else 0) for each in ResultStatus)
+        value = result.result.value
+        self.chunks[1] = 'pulse_profile_value{{{}}} {}\n'.format(labels, value if value is not None else 'NaN')
+        self.chunks[2] = 'pulse_profile_run_duration_seconds{{{}}} {}\n'.format(
+            labels, (result.runtime_ms or 0) / 1000)
+        self.chunks[3] = 'pulse_profile_last_run_timestamp_seconds{{{}}} {}\n'.format(
+            labels, result.started_at.timestamp())
+        self.chunks[4] = ''.join(
+            'pulse_profile_results_total{{{},status="{}"}} {}\n'.format(labels, each.value, count)
+            for each, count in self.counts.items())
+
+
+class _Segment:
+    """
+    Description
+    --
+    A group of series, and their rendered samples, one chunk per family.
+    Rendered again on scrape, only if any of its series changed.
+    """
+
+    __slots__ = ('series', 'chunks', 'dirty')
+
+    def __init__(self) -> None:
+        self.series = {}                        # type: Dict[str, _Series]
+        self.chunks = [b''] * len(_FAMILIES)    # type: List[bytes]
+        self.dirty = False
+
+    def render(self) -> None:
+        """
+        Renders the samples of the series again.
+        """
+
+        series = list(self.series.values())
+        self.chunks = [''.join(each.chunks[family] for each in series).encode() for family in range(len(_FAMILIES))]
+        self.dirty = False
+
+
+class OpenMetricsExporter(BaseResultHandler):
+    """
+    Description
+    --
+    Serves the latest result of every profile and the result counters, in
+    the OpenMetrics text format, over an embedded HTTP server (any path).
+    - The samples of a profile are rendered when its result comes in (on
+    the result bus thread), not on scrape.
+    - A scrape renders again only the segments (of up to _SEGMENT_SIZE
+    profiles) which changed since the previous scrape, and joins them, so
+    it never waits for the probes and doesn't cost O(all the series).
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9464) -> None:
+        """
+        Parameters
+        --
+        - host - the address to listen on.
+        - port - the port to listen on (0 = any free port).
+        """
+
+        self._logger = get_module_logger(__name__)
+        self._series = {}       # type: Dict[str, _Series]
+        self._segments = []     # type: List[_Segment]
+        self._lock = threading.Lock()
+        self._body = b'# EOF\n'
+        self._dirty = False
+
+        exporter = self
+
+        class _RequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = exporter.render()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), _RequestHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='pulse-metrics', daemon=True)
+        self._thread.start()
+
+        self._logger.info("Serving OpenMetrics on http://%s:%s/metrics", *self.address)
+
+    @classmethod
+    def from_config(cls) -> 'OpenMetricsExporter':
+        """
+        Description
+        --
+        Creates an exporter from the 'openmetrics' config section.
+
+        Returns
+        --
+        The exporter.
+        """
+
+        return cls(Config.load_typed('openmetrics', 'host', '127.0.0.1', str), Config.load_typed('openmetrics', 'port', 9464))
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """
+        The address (host, port) the exporter listens on.
+        """
+
+        return self._server.server_address[:2]
+
+    def _update(self, result: ProfileResult) -> None:
+        """
+        Applies a result to the series of its profile (under the lock).
+        """
+
+        if result.result is None:
+            return
+
+        series = self._series.get(result.profile.id)
+        if series is None:
+            # New series fill up the last segment
+            if not self._segments or len(self._segments[-1].series) >= _SEGMENT_SIZE:
+                self._segments.append(_Segment())
+
+            segment = self._segments[-1]
+            series = self._series[result.profile.id] = segment.series[result.profile.id] = _Series(result, segment)
+
+        series.update(result)
+        series.segment.dirty = True
+        self._dirty = True
+
+    def handle_result(self, result: ProfileResult) -> None:
+        """
+        Description
+        --
+        Updates the series of a profile.
+
+        Parameters
+        --
+        - result - the profile result.
+        """
+
+        with self._lock:
+            self._update(result)
+
+    def handle_results(self, batch: List[ProfileResult]) -> None:
+        """
+        Description
+        --
+        Updates the series of the profiles of a batch of results.
+
+        Parameters
+        --
+        - batch - the profile results, in order of completion.
+        """
+
+        with self._lock:
+            for result in batch:
+                self._update(result)
+
+    def drop(self, profile_id: str) -> None:
+        """
+        Description
+        --
+        Stops exposing the series of a profile.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile.
+        """
+
+        with self._lock:
+            series = self._series.pop(profile_id, None)
+            if series is None:
+                return
+
+            segment = series.segment
+            del segment.series[profile_id]
+            if segment.series:
+                segment.dirty = True
+            else:
+                self._segments.remove(segment)
+
+            self._dirty = True
+
+    def render(self) -> bytes:
+        """
+        Description
+        --
+        Renders the exposition.
+
+        Returns
+        --
+        The exposition, in the OpenMetrics text format.
+        """
+
+        with self._lock:
+            if self._dirty:
+                for segment in self._segments:
+                    if segment.dirty:
+                        segment.render()
+
+                self._body = b''.join(
+                    _HEADERS[family] + b''.join(segment.chunks[family] for segment in self._segments)
+                    for family in range(len(_FAMILIES))) + b'# EOF\n'
+                self._dirty = False
+
+            return self._body
+
+    def close(self) -> None:
+        """
+        Description
+        --
+        Stops the HTTP server.
+        """
+
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,385 @@
+# System imports
+import math
+import threading
+from array import array
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Local imports
+from ..config import Config
+from ..providers import ResultStatus
+from .output import BaseResultHandler, ProfileResult
+
+# The statuses, by their (stored) code
+statuses = tuple(ResultStatus)
+_status_codes = {status: code for code, status in enumerate(statuses)}
+
+# The stored value of a result without one
+_NO_VALUE = math.nan
+
+# The size of a stored result: timestamp (double), status (byte), value (float)
+_SAMPLE_BYTES = 8 + 1 + 4
+
+
+class Samples(NamedTuple):
+    """
+    Description
+    --
+    The history of a profile over a time range, as columns, oldest first.
+    - timestamps - when were the runs started (epoch seconds).
+    - statuses - the status codes of the runs (indexes in 'statuses').
+    - values - the values of the runs, NaN where there was none.
+    """
+
+    timestamps: array
+    statuses: array
+    values: array
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def rows(self) -> Iterator[Tuple[float, ResultStatus, Optional[float]]]:
+        """
+        Description
+        --
+        Iterates over the samples, as (timestamp, status, value) tuples.
+        """
+
+        for timestamp, code, value in zip(self.timestamps, self.statuses, self.values):
+            yield timestamp, statuses[code], None if math.isnan(value) else value
+
+
+class HistoryRing:
+    """
+    Description
+    --
+    A fixed-capacity ring buffer of the results of a single profile, kept in
+    typed columns (13 bytes per result), instead of Python objects. Once
+    full, the oldest results are overwritten.
+    """
+
+    __slots__ = ('capacity', '_timestamps', '_statuses', '_values', '_start', '_size')
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Parameters
+        --
+        - capacity - the maximum number of results to keep.
+        """
+
+        if capacity is None or capacity <= 0:
+            raise ValueError("capacity must be > 0")
+
+        self.capacity = capacity
+        self._timestamps = array('d', bytes(8 * capacity))
+        self._statuses = array('B', bytes(capacity))
+        self._values = array('f', bytes(4 * capacity))
+
+        # The position of the oldest result and the number of results
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, status: ResultStatus, value: Optional[float]) -> None:
+        """
+        Description
+        --
+        Adds a result, in order of the start time, overwriting the oldest
+        one when full. Results are completed (and added) out of order when
+        the runs of a profile overlap, so those are moved into place.
+
+        Parameters
+        --
+        - timestamp - when was the run started (epoch seconds).
+        - status - the status of the run.
+        - value - the value of the run, if any.
+        """
+
+        # Mostly the newest, otherwise close to it
+        index = self._size
+        while index > 0 and self._timestamp_at(index - 1) > timestamp:
+            index -= 1
+
+        if self._size == self.capacity:
+            if index == 0:
+                # Older than all the kept results
+                return
+
+            # Overwrite the oldest
+            self._start = (self._start + 1) % self.capacity
+            self._size -= 1
+            index -= 1
+
+        # Make room, by moving the newer results up
+        for later in range(self._size, index, -1):
+            target = (self._start + later) % self.capacity
+            source = (self._start + later - 1) % self.capacity
+            self._timestamps[target] = self._timestamps[source]
+            self._statuses[target] = self._statuses[source]
+            self._values[target] = self._values[source]
+
+        position = (self._start + index) % self.capacity
+        self._size += 1
+
+        self._timestamps[position] = timestamp
+        self._statuses[position] = _status_codes[status]
+        self._values[position] = _NO_VALUE if value is None else value
+
+    def resized(self, capacity: int) -> 'HistoryRing':
+        """
+        Description
+        --
+        Copies the ring into a new one of another capacity, keeping the
+        newest results that fit.
+
+        Parameters
+        --
+        - capacity - the maximum number of results to keep.
+
+        Returns
+        --
+        The new ring buffer.
+        """
+
+        ring = HistoryRing(capacity)
+        count = min(self._size, capacity)
+        first = self._size - count
+
+        ring._timestamps[:count] = self._slice(self._timestamps, first, count)
+        ring._statuses[:count] = self._slice(self._statuses, first, count)
+        ring._values[:count] = self._slice(self._values, first, count)
+        ring._size = count
+
+        return ring
+
+    def _timestamp_at(self, index: int) -> float:
+        """
+        Gets the timestamp of the result at a (chronological) index.
+        """
+
+        return self._timestamps[(self._start + index) % self.capacity]
+
+    def _bisect(self, timestamp: float) -> int:
+        """
+        Finds the (chronological) index of the first result started at or
+        after a timestamp.
+        """
+
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            if self._timestamp_at(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def _slice(self, column: array, first: int, count: int) -> array:
+        """
+        Copies a chronological range of a column.
+        """
+
+        start = (self._start + first) % self.capacity
+        end = start + count
+
+        if end <= self.capacity:
+            return column[start:end]
+
+        # The range wraps around
+        return column[start:] + column[:end - self.capacity]
+
+    def query(self, since: float = None, until: float = None) -> Samples:
+        """
+        Description
+        --
+        Gets the results started within a time range.
+
+        Parameters
+        --
+        - since - the start of the range (epoch seconds, inclusive), default:
+        the oldest result.
+        - until - the end of the range (epoch seconds, exclusive), default:
+        the newest result.
+
+        Returns
+        --
+        The results, oldest first.
+        """
+
+        first = self._bisect(since) if since is not None else 0
+        last = self._bisect(until) if until is not None else self._size
+        count = max(last - first, 0)
+
+        return Samples(
+                self._slice(self._timestamps, first, count),
+                self._slice(self._statuses, first, count),
+                self._slice(self._values, first, count))
+
+
+class HistoryStore(BaseResultHandler):
+    """
+    Description
+    --
+    Keeps the recent results of every profile in memory, to be queried by
+    time range. Each profile gets a ring buffer, sized to hold 'retention_s'
+    seconds of its results (at most 'max_samples').
+
+    The results can arrive in any order (e.g. in order of completion, as a
+    result bus sink), and are kept in order of the start time.
+    """
+
+    def __init__(self, retention_s: float = 3600, max_samples: int = 3600) -> None:
+        """
+        Parameters
+        --
+        - retention_s - how long to keep the results for, in seconds.
+        - max_samples - the maximum number of results to keep per profile.
+        """
+
+        if retention_s is None or retention_s <= 0:
+            raise ValueError("retention_s must be > 0")
+
+        if max_samples is None or max_samples <= 0:
+            raise ValueError("max_samples must be > 0")
+
+        self._retention_s = retention_s
+        self._max_samples = max_samples
+        self._rings = {}    # type: Dict[str, HistoryRing]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> 'HistoryStore':
+        """
+        Description
+        --
+        Creates a history store from the 'history' config section.
+
+        Returns
+        --
+        The history store.
+        """
+
+        return cls(Config.load_typed('history', 'retention_s', 3600, float), Config.load_typed('history', 'max_samples', 3600))
+
+    def _capacity(self, run_every_x_seconds: float) -> int:
+        """
+        Calculates the capacity of the ring buffer of a profile.
+        """
+
+        return max(1, min(self._max_samples, math.ceil(self._retention_s / run_every_x_seconds)))
+
+    def _append(self, result: ProfileResult) -> None:
+        """
+        Adds a result to the ring buffer of its profile (under the lock).
+        """
+
+        if result.result is None:
+            return
+
+        profile = result.profile
+        capacity = self._capacity(profile.run_every_x_seconds)
+        ring = self._rings.get(profile.id)
+        if ring is None:
+            ring = self._rings[profile.id] = HistoryRing(capacity)
+        elif ring.capacity != capacity:
+            # The interval of the profile changed (e.g. reloaded)
+            ring = self._rings[profile.id] = ring.resized(capacity)
+
+        ring.append(result.started_at.timestamp(), result.result.status, result.result.value)
+
+    def handle_result(self, result: ProfileResult) -> None:
+        """
+        Description
+        --
+        Adds a result to the history of its profile.
+
+        Parameters
+        --
+        - result - the profile result.
+        """
+
+        with self._lock:
+            self._append(result)
+
+    def handle_results(self, batch: List[ProfileResult]) -> None:
+        """
+        Description
+        --
+        Adds a batch of results to the history of their profiles.
+
+        Parameters
+        --
+        - batch - the profile results, in order of completion.
+        """
+
+        with self._lock:
+            for result in batch:
+                self._append(result)
+
+    def profile_ids(self) -> List[str]:
+        """
+        Description
+        --
+        Gets the Ids of the profiles with history.
+
+        Returns
+        --
+        The profile Ids.
+        """
+
+        with self._lock:
+            return list(self._rings)
+
+    def query(self, profile_id: str, since: float = None, until: float = None) -> Samples:
+        """
+        Description
+        --
+        Gets the results of a profile started within a time range.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile.
+        - since - the start of the range (epoch seconds, inclusive), default:
+        the oldest result.
+        - until - the end of the range (epoch seconds, exclusive), default:
+        the newest result.
+
+        Returns
+        --
+        The results, oldest first. Empty, if the profile has no history.
+        """
+
+        if not profile_id:
+            raise ValueError("profile_id is required!")
+
+        with self._lock:
+            ring = self._rings.get(profile_id)
+            if ring is None:
+                return Samples(array('d'), array('B'), array('f'))
+
+            return ring.query(since, until)
+
+    def drop(self, profile_id: str) -> None:
+        """
+        Description
+        --
+        Drops the history of a profile.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile.
+        """
+
+        with self._lock:
+            self._rings.pop(profile_id, None)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The memory taken by the result columns, in bytes.
+        """
+
+        with self._lock:
+            return sum(ring.capacity * _SAMPLE_BYTES for ring in self._rings.values())
@@ -1,8 +1,11 @@
 # Standard library imports
-from datetime import datetime
+import abc
+from datetime import datetime, timedelta, timezone
 import logging
 from logging.config import fileConfig
 from os import path
+import time
+from typing import List
 
 # Local imports
 from ..profiles import Profile
@@ -13,37 +16,133 @@ class ProfileResult:
     """
     Description
     --
-    Associates a profile with its result.
+    Associates a profile with its result. Slotted, as every run creates one.
+    The wall clock is read once, when the run starts, the runtime is timed
+    on the monotonic clock (in integer nanoseconds).
     """
 
-    def __init__(self, profile: Profile, started_at: datetime) -> None:
+    __slots__ = ('profile', 'result', 'started_at', 'started_ns', 'finished_ns')
+
+    def __init__(self, profile: Profile, started_at: datetime = None, started_ns: int = None) -> None:
         """
         Parameters
         --
         - profile - the profile that was executed.
-        - started_at - when was it started.
+        - started_at - when was it started (timezone-aware, in UTC), now if
+        not set.
+        - started_ns - when was it started, on the monotonic clock
+        (time.monotonic_ns()), now if not set.
         """
 
         if profile is None:
             raise ValueError("profile is required!")
 
-        if started_at is None:
-            raise ValueError("started_at is required!")
-
         self.profile = profile
         self.result = None              # type: ProviderResult
-        self.started_at = started_at
-        self.finished_at = None         # type: datetime
+        self.started_at = started_at if started_at is not None else datetime.now(timezone.utc)
+        self.started_ns = started_ns if started_ns is not None else time.monotonic_ns()
+        self.finished_ns = None         # type: int
+
+    def finish(self) -> None:
+        """
+        Description
+        --
+        Marks the run as finished, now.
+        """
+
+        self.finished_ns = time.monotonic_ns()
+
+    @property
+    def finished_at(self) -> datetime:
+        """
+        When was the run finished (UTC), None if it's not, derived from the
+        start and the runtime.
+        """
+
+        if self.finished_ns is None:
+            return None
+
+        return self.started_at + timedelta(microseconds=(self.finished_ns - self.started_ns) // 1000)
+
+    @finished_at.setter
+    def finished_at(self, finished_at: datetime) -> None:
+        if finished_at is None:
+            self.finished_ns = None
+        else:
+            delta = finished_at - self.started_at
+            self.finished_ns = self.started_ns + (delta // timedelta(microseconds=1)) * 1000
 
     @property
     def runtime_ms(self) -> int:
-        if self.finished_at is None:
+        if self.finished_ns is None:
             return None
         else:
-            return int((self.finished_at - self.started_at).total_seconds() * 1000)
+            return (self.finished_ns - self.started_ns) // 1000000
+
+
+class BaseResultHandler(abc.ABC):
+    """
+    Description
+    --
+    The base abstract result handler.
+    """
+
+    @abc.abstractmethod
+    def handle_result(self, result: ProfileResult) -> None:
+        """
+        Description
+        --
+        Handles a single profile result.
+        Must be overriden.
+
+        Parameters
+        --
+        - result - the profile result.
+        """
+
+        pass
+
+    def handle_results(self, batch: List[ProfileResult]) -> None:
+        """
+        Description
+        --
+        Handles a batch of profile results, one by one by default.
+        Can be overriden, by handlers which write in bulk.
+
+        Parameters
+        --
+        - batch - the profile results, in order of completion.
+        """
+
+        for result in batch:
+            self.handle_result(result)
+
+    def drop(self, profile_id: str) -> None:
+        """
+        Description
+        --
+        Forgets a profile which was removed (e.g. its kept results).
+        Can be overriden.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile.
+        """
+
+        pass
+
+    def close(self) -> None:
+        """
+        Description
+        --
+        Flushes and releases the resources of the handler.
+        Can be overriden.
+        """
+
+        pass
 
 
-class LogResultHandler():
+class LogResultHandler(BaseResultHandler):
     """
     Description
     --
@@ -67,7 +166,9 @@ class LogResultHandler():
                 'start_date': result.started_at,
                 'end_date': result.finished_at,
                 'runtime_ms': result.runtime_ms,
-                'result_value': result.result.value
+                'result_value': result.result.value if result.result.value is not None else '-',
+                'resolve_ms': result.result.resolve_ms,
+                'timings': result.result.timings
         }
 
         # RED and TIMEOUT-s are Error
@@ -0,0 +1,271 @@
+# System imports
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict
+
+# Local imports
+from ..metrics import MetricsRegistry
+from .scheduler import Job, Scheduler
+
+
+class _WorkItem:
+    """
+    Description
+    --
+    A unit of work, waiting in (or taken from) the pool queue.
+    """
+
+    __slots__ = ('key', 'fn', 'args', 'timeout_s', 'timeout_job', 'future', 'queued_at')
+
+    def __init__(self, key: str, fn: Callable, args: tuple, timeout_s: float) -> None:
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.timeout_s = timeout_s
+        self.timeout_job = None     # type: Job
+        self.future = concurrent.futures.Future()
+        self.queued_at = time.monotonic()
+
+
+def _set_result(future: concurrent.futures.Future, result=None, exception: BaseException = None) -> None:
+    """
+    Description
+    --
+    Completes a future, unless it was already completed (e.g. timed out).
+    """
+
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except concurrent.futures.InvalidStateError:
+        pass
+
+
+class WorkerPool:
+    """
+    Description
+    --
+    A long-lived, bounded pool of worker threads.
+    - Limits the number of runs in flight, globally and per key (e.g. a
+    provider Id).
+    - Work over the limits waits in a queue, served round-robin across keys.
+    - Optionally times out runs, counting from when they are started.
+    """
+
+    def __init__(
+                self,
+                max_workers: int,
+                key_limits: Dict[str, int] = None,
+                default_key_limit: int = 0,
+                metrics: MetricsRegistry = None) -> None:
+        """
+        Parameters
+        --
+        - max_workers - the maximum number of runs in flight.
+        - key_limits - the maximum number of runs in flight, per key.
+        - default_key_limit - the maximum number of runs in flight for keys
+        not in key_limits. 0 means 'up to max_workers'.
+        - metrics - if set, records how long the runs wait in the queue
+        ('queue_wait_ms', by key).
+        """
+
+        if not max_workers or max_workers <= 0:
+            raise ValueError("max_workers must be > 0")
+
+        self._max_workers = max_workers
+        self._metrics = metrics
+        self._key_limits = dict(key_limits or {})
+        self._default_key_limit = default_key_limit or max_workers
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pulse')
+        self._lock = threading.Lock()
+        self._queues = OrderedDict()     # type: OrderedDict[str, Deque[_WorkItem]]
+        self._queued = 0
+        self._in_flight = {}             # type: Dict[str, int]
+        self._in_flight_total = 0
+        self._shutdown = False
+
+        # Times out the runs in flight. The timed out futures are completed
+        # on their own threads, so slow done callbacks can't hold up the
+        # other timeouts.
+        self._timeouts = Scheduler()
+        self._expirer = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pulse-timeout')
+
+    @property
+    def queued(self) -> int:
+        """
+        The number of runs waiting in the queue.
+        """
+
+        return self._queued
+
+    @property
+    def in_flight(self) -> int:
+        """
+        The number of runs in flight.
+        """
+
+        return self._in_flight_total
+
+    def queued_by_key(self) -> Dict[str, int]:
+        """
+        Description
+        --
+        Gets the queue depth per key.
+
+        Returns
+        --
+        The number of runs waiting in the queue, per key.
+        """
+
+        with self._lock:
+            return {key: len(queue) for key, queue in self._queues.items()}
+
+    def limit(self, key: str) -> int:
+        """
+        Description
+        --
+        Gets the concurrency limit of a key.
+
+        Parameters
+        --
+        - key - the key.
+
+        Returns
+        --
+        The maximum number of runs in flight for the key.
+        """
+
+        return min(self._key_limits.get(key, self._default_key_limit), self._max_workers)
+
+    def submit(self, key: str, fn: Callable, *args, timeout_s: float = None) -> concurrent.futures.Future:
+        """
+        Description
+        --
+        Submits work to the pool. It starts right away, if the limits allow
+        it, or waits in the queue otherwise.
+
+        Parameters
+        --
+        - key - the key to limit the concurrency by (e.g. a provider Id).
+        - fn - the callable to run.
+        - args - the arguments to pass to the callable.
+        - timeout_s - if set, the future fails with a TimeoutError when the
+        run takes longer than this.
+
+        Returns
+        --
+        The future of the run.
+        """
+
+        item = _WorkItem(key, fn, args, timeout_s)
+
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("The pool is shut down!")
+
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = deque()
+            queue.append(item)
+            self._queued += 1
+            self._dispatch()
+
+        return item.future
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Description
+        --
+        Cancels the queued work and stops the pool.
+
+        Parameters
+        --
+        - wait - wait for the runs in flight to finish?
+        """
+
+        with self._lock:
+            self._shutdown = True
+            for queue in self._queues.values():
+                for item in queue:
+                    item.future.cancel()
+            self._queues.clear()
+            self._queued = 0
+
+        self._timeouts.stop()
+        self._executor.shutdown(wait=wait)
+        self._expirer.shutdown(wait=wait)
+
+    def _dispatch(self) -> None:
+        """
+        Starts queued work, as long as the limits allow it. The lock must be
+        held.
+        """
+
+        progress = True
+        while progress and self._in_flight_total < self._max_workers:
+            progress = False
+            for key in list(self._queues):
+                if self._in_flight_total >= self._max_workers:
+                    break
+
+                if self._in_flight.get(key, 0) >= self.limit(key):
+                    continue
+
+                # One item per key per pass, so the keys take turns
+                queue = self._queues[key]
+                item = queue.popleft()
+                self._queued -= 1
+                if queue:
+                    self._queues.move_to_end(key)
+                else:
+                    del self._queues[key]
+
+                # Cancelled while waiting in the queue
+                if not item.future.set_running_or_notify_cancel():
+                    progress = True
+                    continue
+
+                if self._metrics is not None:
+                    self._metrics.observe('queue_wait_ms', (time.monotonic() - item.queued_at) * 1000, key=key)
+
+                self._in_flight[key] = self._in_flight.get(key, 0) + 1
+                self._in_flight_total += 1
+                if item.timeout_s is not None:
+                    self._timeouts.start()
+                    item.timeout_job = self._timeouts.call_later(item.timeout_s, self._time_out, item)
+                self._executor.submit(self._work, item)
+                progress = True
+
+    def _work(self, item: _WorkItem) -> None:
+        """
+        Runs a work item on a worker thread.
+        """
+
+        try:
+            _set_result(item.future, item.fn(*item.args))
+        except BaseException as err:
+            _set_result(item.future, exception=err)
+        finally:
+            if item.timeout_job is not None:
+                self._timeouts.cancel(item.timeout_job)
+
+            with self._lock:
+                self._in_flight[item.key] -= 1
+                self._in_flight_total -= 1
+                if not self._shutdown:
+                    self._dispatch()
+
+    def _time_out(self, item: _WorkItem) -> None:
+        """
+        Fails the future of a run which exceeded its timeout.
+        """
+
+        try:
+            self._expirer.submit(_set_result, item.future, exception=concurrent.futures.TimeoutError())
+        except RuntimeError:
+            # Shut down meanwhile
+            _set_result(item.future, exception=concurrent.futures.TimeoutError())
@@ -0,0 +1,289 @@
+# System imports
+import hashlib
+import heapq
+import itertools
+import math
+import threading
+import time
+from typing import Callable, List, Tuple
+
+# Local imports
+from ..logging import get_module_logger
+from ..metrics import MetricsRegistry
+
+# The period the phases are derived over. Jobs with the same key line up,
+# whenever their intervals divide it (e.g. every 5s and every 10s).
+_phase_period_s = 86400
+
+
+def phase_delay(phase_key: str, interval_s: float, wall_time: float = None) -> float:
+    """
+    Description
+    --
+    Calculates how long to wait before the first run of a periodic job, so
+    jobs sharing an interval are spread across it, instead of all running at
+    the same instant. The phase is derived from the key (e.g. a profile Id)
+    and anchored to the wall clock, so it's stable across restarts. Jobs
+    with the same key line up (see _phase_period_s).
+
+    Parameters
+    --
+    - phase_key - the key to derive the phase from.
+    - interval_s - the interval of the job, in seconds.
+    - wall_time - the current wall clock time (default: now).
+
+    Returns
+    --
+    The delay before the first run, in seconds, in [0, interval_s).
+    """
+
+    if not phase_key:
+        raise ValueError("phase_key is required")
+
+    if interval_s is None or interval_s <= 0:
+        raise ValueError("interval_s must be > 0")
+
+    if wall_time is None:
+        wall_time = time.time()
+
+    digest = hashlib.blake2b(phase_key.encode(), digest_size=8).digest()
+    phase = int.from_bytes(digest, 'big') / 2 ** 64 * _phase_period_s
+
+    return (phase - wall_time) % interval_s
+
+
+def next_deadline(deadline: float, interval_s: float, now: float) -> float:
+    """
+    Description
+    --
+    Calculates the next deadline of a periodic job, off its previous one,
+    so it doesn't drift. The runs that were missed (e.g. while the caller
+    was busy) are skipped, rather than ran in a burst.
+
+    Parameters
+    --
+    - deadline - the previous deadline.
+    - interval_s - the interval of the job, in seconds.
+    - now - the current time, on the clock of the deadline.
+
+    Returns
+    --
+    The next deadline, after now.
+    """
+
+    deadline += interval_s
+    if deadline <= now:
+        deadline += (math.floor((now - deadline) / interval_s) + 1) * interval_s
+
+    return deadline
+
+
+class Job:
+    """
+    Description
+    --
+    A scheduled (one-off or periodic) call.
+    """
+
+    __slots__ = ('deadline', 'interval_s', 'callback', 'args', 'cancelled')
+
+    def __init__(self, deadline: float, interval_s: float, callback: Callable, args: tuple) -> None:
+        """
+        Parameters
+        --
+        - deadline - when is the call due (monotonic clock, seconds).
+        - interval_s - the interval of a periodic job, None for one-off.
+        - callback - the callable to call.
+        - args - the arguments to pass to the callable.
+        """
+
+        self.deadline = deadline
+        self.interval_s = interval_s
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class Scheduler:
+    """
+    Description
+    --
+    A heap-based scheduler, driven by monotonic deadlines.
+    - Supports fractional intervals.
+    - Periodic jobs are rescheduled off their previous deadline, so they
+    don't drift. Runs missed while the scheduler was busy are skipped.
+    - Callbacks run on the scheduler thread and must return quickly.
+    """
+
+    def __init__(self, metrics: MetricsRegistry = None) -> None:
+        """
+        Parameters
+        --
+        - metrics - if set, records how late the calls are ('schedule_lag_ms').
+        """
+
+        self._logger = get_module_logger(__name__)
+        self._metrics = metrics
+        self._heap = []      # type: List[Tuple[float, int, Job]]
+        self._seq = itertools.count()
+        self._cv = threading.Condition()
+        self._stopped = False
+        self._thread = None  # type: threading.Thread
+
+    def __len__(self) -> int:
+        """
+        The number of scheduled calls, including cancelled ones not yet
+        discarded.
+        """
+
+        return len(self._heap)
+
+    def _push(self, job: Job) -> Job:
+        """
+        Adds a job to the heap, waking up the scheduler if it's due first.
+        """
+
+        with self._cv:
+            heapq.heappush(self._heap, (job.deadline, next(self._seq), job))
+            if self._heap[0][2] is job:
+                self._cv.notify()
+
+        return job
+
+    def call_at(self, deadline: float, callback: Callable, *args) -> Job:
+        """
+        Description
+        --
+        Schedules a one-off call.
+
+        Parameters
+        --
+        - deadline - when is the call due (time.monotonic() based).
+        - callback - the callable to call.
+        - args - the arguments to pass to the callable.
+
+        Returns
+        --
+        The scheduled job.
+        """
+
+        return self._push(Job(deadline, None, callback, args))
+
+    def call_later(self, delay_s: float, callback: Callable, *args) -> Job:
+        """
+        Description
+        --
+        Schedules a one-off call, after a delay.
+
+        Parameters
+        --
+        - delay_s - the delay, in seconds.
+        - callback - the callable to call.
+        - args - the arguments to pass to the callable.
+
+        Returns
+        --
+        The scheduled job.
+        """
+
+        return self.call_at(time.monotonic() + delay_s, callback, *args)
+
+    def every(self, interval_s: float, callback: Callable, *args, phase_key: str = None) -> Job:
+        """
+        Description
+        --
+        Schedules a periodic call.
+
+        Parameters
+        --
+        - interval_s - the interval, in seconds.
+        - callback - the callable to call.
+        - args - the arguments to pass to the callable.
+        - phase_key - if set, the first call is delayed by a phase derived from
+        it (see phase_delay). Otherwise, the first call is due right away.
+
+        Returns
+        --
+        The scheduled job.
+        """
+
+        if interval_s is None or interval_s <= 0:
+            raise ValueError("interval_s must be > 0")
+
+        delay_s = phase_delay(phase_key, interval_s) if phase_key else 0
+        return self._push(Job(time.monotonic() + delay_s, interval_s, callback, args))
+
+    def cancel(self, job: Job) -> None:
+        """
+        Description
+        --
+        Cancels a scheduled job. It's discarded once it's due.
+
+        Parameters
+        --
+        - job - the job to cancel.
+        """
+
+        job.cancelled = True
+
+    def run(self) -> None:
+        """
+        Description
+        --
+        Runs the due jobs, until stopped.
+        """
+
+        with self._cv:
+            while not self._stopped:
+                now = time.monotonic()
+
+                if not self._heap or self._heap[0][0] > now:
+                    # Nothing is due, wait for the earliest deadline
+                    self._cv.wait(self._heap[0][0] - now if self._heap else None)
+                    continue
+
+                deadline, _, job = heapq.heappop(self._heap)
+                if job.cancelled:
+                    continue
+
+                if job.interval_s:
+                    # Next deadline, skipping the runs that were missed
+                    job.deadline = next_deadline(deadline, job.interval_s, now)
+                    heapq.heappush(self._heap, (job.deadline, next(self._seq), job))
+
+                if self._metrics is not None:
+                    self._metrics.observe('schedule_lag_ms', (now - deadline) * 1000)
+
+                # Callbacks run without the lock, so they can (re)schedule
+                self._cv.release()
+                try:
+                    job.callback(*job.args)
+                except Exception as ex:
+                    self._logger.error("Scheduled call '%s' failed: %s", job.callback, ex)
+                finally:
+                    self._cv.acquire()
+
+    def start(self) -> None:
+        """
+        Description
+        --
+        Runs the scheduler on a background (daemon) thread.
+        """
+
+        with self._cv:
+            if self._thread is not None:
+                return
+
+            self._thread = threading.Thread(target=self.run, name='pulse-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Description
+        --
+        Stops the scheduler.
+        """
+
+        with self._cv:
+            self._stopped = True
+            self._cv.notify_all()
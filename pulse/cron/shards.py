@@ -0,0 +1,446 @@
+# System imports
+import hashlib
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+# Local imports
+from ..logging import get_module_logger
+from ..metrics import MetricsRegistry
+from ..profiles import Profile
+from ..profiles.storage import BaseProfileStorage, ProfileChanges, open_profile_storage
+from ..providers import ProvidersManager
+from . import ProfileRunner
+from .bus import ResultBus
+from .output import BaseResultHandler, ProfileResult
+
+
+def shard_of(profile_id: str, shards: int) -> int:
+    """
+    Description
+    --
+    Maps a profile to a shard, by jump consistent hashing of its Id: going
+    from N to N + 1 shards moves only 1 / (N + 1) of the profiles, all of
+    them into the new shard.
+
+    Parameters
+    --
+    - profile_id - the Id of the profile.
+    - shards - the number of shards.
+
+    Returns
+    --
+    The shard, 0 .. shards - 1.
+    """
+
+    if shards <= 0:
+        raise ValueError("shards must be > 0")
+
+    key = int.from_bytes(hashlib.blake2b(profile_id.encode(), digest_size=8).digest(), 'little')
+
+    bucket, jump = -1, 0
+    while jump < shards:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+
+    return bucket
+
+
+class ShardedProfileStorage(BaseProfileStorage):
+    """
+    Description
+    --
+    The profiles of one shard of a profile storage.
+    """
+
+    def __init__(self, profile_storage: BaseProfileStorage, shard: int, shards: int) -> None:
+        """
+        Parameters
+        --
+        - profile_storage - the storage of all the profiles.
+        - shard - the shard, 0 .. shards - 1.
+        - shards - the number of shards.
+        """
+
+        if profile_storage is None:
+            raise ValueError("profile_storage is required!")
+
+        if not 0 <= shard < shards:
+            raise ValueError("shard must be in 0 .. shards - 1")
+
+        self._profile_storage = profile_storage
+        self._shard = shard
+        self._shards = shards
+
+    def get_all_ids(self) -> List[str]:
+        """
+        Description
+        --
+        Gets the Ids of the profiles of the shard.
+
+        Returns
+        --
+        A list of the Ids of the profiles of the shard.
+        """
+
+        return [
+            profile_id for profile_id in self._profile_storage.get_all_ids()
+            if shard_of(profile_id, self._shards) == self._shard]
+
+    def get(self, profile_id: str) -> Profile:
+        """
+        Description
+        --
+        Gets a profile by Id.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile to get.
+
+        Returns
+        --
+        The profile.
+        """
+
+        return self._profile_storage.get(profile_id)
+
+    def iter_profiles(self, page_size: int = 500) -> Iterator[Profile]:
+        """
+        Description
+        --
+        Iterates over the profiles of the shard, a page at a time.
+
+        Parameters
+        --
+        - page_size - how many profiles to load at a time.
+
+        Returns
+        --
+        An iterator over the profiles of the shard.
+        """
+
+        for profile in self._profile_storage.iter_profiles(page_size):
+            if shard_of(profile.id, self._shards) == self._shard:
+                yield profile
+
+    def get_version(self) -> Optional[int]:
+        """
+        Description
+        --
+        Gets the current version of the underlying storage.
+
+        Returns
+        --
+        The version, or None if the changes are not tracked.
+        """
+
+        return self._profile_storage.get_version()
+
+    def changes_since(self, version: int) -> Optional[ProfileChanges]:
+        """
+        Description
+        --
+        Gets the changes of the shard since a version of the underlying
+        storage.
+
+        Parameters
+        --
+        - version - the version.
+
+        Returns
+        --
+        The changes, or None if the changes are not tracked.
+        """
+
+        changes = self._profile_storage.changes_since(version)
+        if changes is None:
+            return None
+
+        return changes._replace(
+                    changed=[
+                        profile for profile in changes.changed
+                        if shard_of(profile.id, self._shards) == self._shard],
+                    removed=[
+                        profile_id for profile_id in changes.removed
+                        if shard_of(profile_id, self._shards) == self._shard])
+
+
+class _QueueResultHandler(BaseResultHandler):
+    """
+    Description
+    --
+    Passes the results of a worker process to the parent, a batch per
+    message, and the Ids of the removed profiles.
+    """
+
+    def __init__(self, results: multiprocessing.Queue) -> None:
+        self._results = results
+
+    def handle_result(self, result: ProfileResult) -> None:
+        self.handle_results([result])
+
+    def handle_results(self, batch: List[ProfileResult]) -> None:
+        self._results.put(batch)
+
+    def drop(self, profile_id: str) -> None:
+        self._results.put(profile_id)
+
+
+def _run_worker(shard: int, shards: int, options: Dict[str, Any], results: multiprocessing.Queue, stopping) -> None:
+    """
+    Description
+    --
+    The entry point of a worker process. Runs the profiles of a shard, until
+    the parent stops it.
+
+    Parameters
+    --
+    - shard - the shard of the worker.
+    - shards - the number of shards.
+    - options - the profiles file ('input_filename'), the engine and the
+    cluster lease database ('cluster', if any).
+    - results - the queue to pass the results to the parent over.
+    - stopping - set by the parent to stop the worker.
+    """
+
+    # Ctrl+C is handled by the parent, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Every worker of a cluster node is a node of its own
+    storage = open_profile_storage(options['input_filename'])
+    node = None
+    if options.get('cluster'):
+        # Imported here, as the cluster module builds on this one
+        from .cluster import ClusterNode, ClusterProfileStorage, SqliteLeaseCoordinator
+
+        node = ClusterNode.from_config(SqliteLeaseCoordinator(options['cluster']))
+        storage = ClusterProfileStorage(storage, node)
+    else:
+        storage = ShardedProfileStorage(storage, shard, shards)
+
+    metrics = MetricsRegistry()
+    runner = ProfileRunner(
+        storage,
+        ProvidersManager(metrics),
+        ResultBus({'parent': _QueueResultHandler(results)}),
+        metrics)
+
+    # A shard can be empty, until profiles are added to it
+    runner.exit_if_idle = False
+
+    # Polled, as a worker which dies while waiting on the event would block
+    # setting it
+    def stop() -> None:
+        while not stopping.is_set():
+            time.sleep(0.2)
+        runner.stop()
+
+    threading.Thread(target=stop, name='pulse-stop', daemon=True).start()
+
+    get_module_logger(__name__).info("Worker %s/%s started.", shard + 1, shards)
+    if node is not None:
+        node.on_change(runner.reload)
+        node.start()
+
+    try:
+        runner.start(options['engine'])
+    finally:
+        if node is not None:
+            node.stop()
+
+
+class ShardSupervisor:
+    """
+    Description
+    --
+    Runs the profiles on a number of worker processes, each running the
+    profiles of its shard on its own scheduler.
+    - The profiles are partitioned by consistent hashing of their Ids (see
+    shard_of), so changing the number of workers moves as few of them as
+    possible.
+    - The results of the workers are gathered into the result handler of
+    the parent.
+    - A worker which exits is restarted, backing off while it keeps exiting.
+    """
+
+    # How long can a worker back off, in seconds
+    _max_backoff_s = 60
+
+    def __init__(
+                self,
+                input_filename: str,
+                workers: int,
+                result_handler: BaseResultHandler,
+                engine: str = 'thread',
+                cluster: str = None) -> None:
+        """
+        Parameters
+        --
+        - input_filename - the profiles file.
+        - workers - the number of worker processes.
+        - result_handler - the result handler to gather the results into.
+        - engine - the scheduling engine of the workers.
+        - cluster - if set, the (shared) lease database of a cluster, which
+        every worker joins as a node of its own, instead of running a shard.
+        """
+
+        if not input_filename:
+            raise ValueError("input_filename is required!")
+
+        if workers <= 0:
+            raise ValueError("workers must be > 0")
+
+        if result_handler is None:
+            raise ValueError("result_handler is required!")
+
+        self._options = {'input_filename': input_filename, 'engine': engine, 'cluster': cluster}
+        self._workers = workers
+        self._result_handler = result_handler
+        self._logger = get_module_logger(__name__)
+
+        self._context = multiprocessing.get_context('spawn')
+        self._results = self._context.Queue()
+        self._stopping = self._context.Event()
+        self._stopped = threading.Event()
+
+        self._processes = [None] * workers      # type: List[multiprocessing.Process]
+        self._started_at = [0.0] * workers      # type: List[float]
+        self._restart_at = [0.0] * workers      # type: List[float]
+        self._failures = [0] * workers          # type: List[int]
+        self.restarts = 0
+
+    def _spawn(self, shard: int) -> None:
+        """
+        Starts the worker of a shard.
+        """
+
+        process = self._context.Process(
+                    target=_run_worker,
+                    args=(shard, self._workers, self._options, self._results, self._stopping),
+                    name='pulse-worker-%s' % shard,
+                    daemon=True)
+        process.start()
+
+        self._processes[shard] = process
+        self._started_at[shard] = time.monotonic()
+
+    def _gather(self) -> None:
+        """
+        Passes the results of the workers into the result handler, until the
+        end-of-results marker.
+        """
+
+        while True:
+            batch = self._results.get()
+            if batch is None:
+                return
+
+            if isinstance(batch, str):
+                # A removed profile
+                self._result_handler.drop(batch)
+                continue
+
+            try:
+                self._result_handler.handle_results(batch)
+            except Exception as ex:
+                self._logger.error("Error handling %s result(s): %s", len(batch), ex)
+
+    def _supervise(self) -> None:
+        """
+        Restarts the workers which exited, backing off while they keep
+        exiting.
+        """
+
+        now = time.monotonic()
+        for shard, process in enumerate(self._processes):
+            if process.is_alive():
+                continue
+
+            if self._restart_at[shard] == 0:
+                # Forgive the past failures of a worker which ran for a while
+                if now - self._started_at[shard] > self._max_backoff_s:
+                    self._failures[shard] = 0
+
+                backoff_s = min(2 ** self._failures[shard], self._max_backoff_s)
+                self._failures[shard] += 1
+                self._restart_at[shard] = now + backoff_s
+
+                self._logger.warn(
+                    "Worker %s/%s exited (code %s), restarting in %ss ...",
+                    shard + 1, self._workers, process.exitcode, backoff_s)
+            elif now >= self._restart_at[shard]:
+                self._restart_at[shard] = 0
+                self.restarts += 1
+                self._spawn(shard)
+
+    def start(self) -> None:
+        """
+        Description
+        --
+        Starts the workers and supervises them, until stopped (or Ctrl+C).
+        """
+
+        self._logger.info("Starting %s worker(s) (engine: %s) ...", self._workers, self._options['engine'])
+
+        gatherer = threading.Thread(target=self._gather, name='pulse-gather', daemon=True)
+        gatherer.start()
+
+        for shard in range(self._workers):
+            self._spawn(shard)
+
+        try:
+            while not self._stopped.wait(1):
+                self._supervise()
+        except KeyboardInterrupt:
+            self._logger.info("Shutting down ...")
+        finally:
+            # Don't interrupt the workers shutdown (within its timeout)
+            if threading.current_thread() is threading.main_thread():
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+            self._shutdown(gatherer)
+
+    def stop(self) -> None:
+        """
+        Description
+        --
+        Stops the workers (from any thread), which makes start() shut down
+        and return.
+        """
+
+        self._stopped.set()
+
+    def _shutdown(self, gatherer: threading.Thread, timeout_s: float = 10) -> None:
+        """
+        Description
+        --
+        Stops the workers, gathers their last results and flushes the result
+        handler.
+
+        Parameters
+        --
+        - gatherer - the thread gathering the results.
+        - timeout_s - how long to wait for the workers to stop.
+        """
+
+        self._stopping.set()
+
+        deadline = time.monotonic() + timeout_s
+        for process in self._processes:
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                self._logger.warn("Worker %s did not stop, terminating it.", process.name)
+                process.terminate()
+                process.join()
+
+        try:
+            self._results.put(None)
+            gatherer.join(timeout_s)
+        except (OSError, ValueError, queue.Full):
+            pass
+
+        self._result_handler.close()
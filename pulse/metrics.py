@@ -0,0 +1,332 @@
+# System imports
+import math
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# The histogram counts values below 2^_PRECISION_BITS exactly, larger ones in
+# 2^(_PRECISION_BITS - 1) buckets per power of two, which bounds the relative
+# error of a percentile to 1 / 2^_PRECISION_BITS
+_PRECISION_BITS = 7
+_LINEAR_LIMIT = 1 << _PRECISION_BITS
+_HALF_LIMIT = _LINEAR_LIMIT >> 1
+
+
+class LatencyHistogram:
+    """
+    Description
+    --
+    An HDR-style histogram of non-negative values (e.g. latencies in ms).
+    - Values below 128 are counted exactly, larger values in log-linear
+    buckets, with a relative error below 1%.
+    - Recording is O(1), and histograms merge by adding the bucket counts,
+    so they can be combined across time slots, profiles and processes.
+    """
+
+    __slots__ = ('_counts', 'count', 'minimum', 'maximum')
+
+    def __init__(self) -> None:
+        self._counts = {}       # type: Dict[int, int]
+        self.count = 0
+        self.minimum = None     # type: float
+        self.maximum = None     # type: float
+
+    @staticmethod
+    def _bucket(value: float) -> int:
+        """
+        Gets the index of the bucket of a value.
+        """
+
+        value = int(value)
+        if value < _LINEAR_LIMIT:
+            return value
+
+        shift = value.bit_length() - _PRECISION_BITS
+        return _LINEAR_LIMIT + (shift - 1) * _HALF_LIMIT + (value >> shift) - _HALF_LIMIT
+
+    @staticmethod
+    def _bucket_value(bucket: int) -> float:
+        """
+        Gets the representative value (the middle) of a bucket.
+        """
+
+        if bucket < _LINEAR_LIMIT:
+            return bucket
+
+        shift = (bucket - _LINEAR_LIMIT) // _HALF_LIMIT + 1
+        low = ((bucket - _LINEAR_LIMIT) % _HALF_LIMIT + _HALF_LIMIT) << shift
+        return low + ((1 << shift) - 1) / 2
+
+    def record(self, value: float, count: int = 1) -> None:
+        """
+        Description
+        --
+        Records a value.
+
+        Parameters
+        --
+        - value - the value (>= 0, fractions are truncated).
+        - count - how many times to record it.
+        """
+
+        if value is None or value < 0 or math.isnan(value):
+            raise ValueError("value must be >= 0")
+
+        bucket = self._bucket(value)
+        self._counts[bucket] = self._counts.get(bucket, 0) + count
+        self.count += count
+
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """
+        Description
+        --
+        Adds the values of another histogram to this one.
+
+        Parameters
+        --
+        - other - the histogram to merge in.
+
+        Returns
+        --
+        This histogram.
+        """
+
+        for bucket, count in other._counts.items():
+            self._counts[bucket] = self._counts.get(bucket, 0) + count
+
+        self.count += other.count
+
+        if other.minimum is not None and (self.minimum is None or other.minimum < self.minimum):
+            self.minimum = other.minimum
+
+        if other.maximum is not None and (self.maximum is None or other.maximum > self.maximum):
+            self.maximum = other.maximum
+
+        return self
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Description
+        --
+        Estimates a percentile of the recorded values.
+
+        Parameters
+        --
+        - percent - the percentile (0..100).
+
+        Returns
+        --
+        The percentile, or None if nothing was recorded.
+        """
+
+        if percent < 0 or percent > 100:
+            raise ValueError("percent must be between 0 and 100")
+
+        if not self.count:
+            return None
+
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for bucket in sorted(self._counts):
+            seen += self._counts[bucket]
+            if seen >= rank:
+                # Never estimate outside of the recorded range
+                return min(max(self._bucket_value(bucket), self.minimum), self.maximum)
+
+        return self.maximum
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Description
+        --
+        Converts the histogram to plain data (e.g. to send to another process).
+
+        Returns
+        --
+        The histogram, as a dictionary.
+        """
+
+        return {
+            'counts': dict(self._counts),
+            'count': self.count,
+            'minimum': self.minimum,
+            'maximum': self.maximum
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencyHistogram':
+        """
+        Description
+        --
+        Creates a histogram from plain data (see to_dict).
+
+        Parameters
+        --
+        - data - the histogram, as a dictionary.
+
+        Returns
+        --
+        The histogram.
+        """
+
+        histogram = cls()
+        histogram._counts = {int(bucket): count for bucket, count in data['counts'].items()}
+        histogram.count = data['count']
+        histogram.minimum = data['minimum']
+        histogram.maximum = data['maximum']
+        return histogram
+
+
+# A metric key: the metric name and its labels, as (name, value) pairs
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _format_key(key: _Key) -> str:
+    """
+    Formats a metric key, e.g. 'run_duration_ms{provider=PingProvider}'.
+    """
+
+    name, labels = key
+    if not labels:
+        return name
+
+    return '{}{{{}}}'.format(name, ','.join('{}={}'.format(label, value) for label, value in labels))
+
+
+class MetricsRegistry:
+    """
+    Description
+    --
+    A thread-safe registry of internal metrics (self-instrumentation).
+    - Counters, incremented by events (e.g. runs by status).
+    - Histograms of durations in ms (see LatencyHistogram), kept in us, so
+    sub-millisecond durations are not lost.
+    - Gauges, read from callbacks when a snapshot is taken (e.g. the queue
+    depth).
+
+    Metrics are created on first use and identified by their name and
+    labels.
+    """
+
+    def __init__(self) -> None:
+        self._counters = {}     # type: Dict[_Key, int]
+        self._histograms = {}   # type: Dict[_Key, LatencyHistogram]
+        self._gauges = {}       # type: Dict[str, Callable[[], float]]
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: int = 1, **labels: str) -> None:
+        """
+        Description
+        --
+        Increments a counter.
+
+        Parameters
+        --
+        - name - the name of the counter.
+        - amount - how much to increment it by.
+        - labels - the labels of the counter.
+        """
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value_ms: float, **labels: str) -> None:
+        """
+        Description
+        --
+        Records a duration in a histogram.
+
+        Parameters
+        --
+        - name - the name of the histogram.
+        - value_ms - the duration, in ms (negative ones count as 0).
+        - labels - the labels of the histogram.
+        """
+
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(max(value_ms, 0) * 1000)
+
+    def gauge(self, name: str, callback: Callable[[], float]) -> None:
+        """
+        Description
+        --
+        Registers a gauge.
+
+        Parameters
+        --
+        - name - the name of the gauge.
+        - callback - returns the current value of the gauge.
+        """
+
+        if not name:
+            raise ValueError("name is required!")
+
+        if callback is None:
+            raise ValueError("callback is required!")
+
+        with self._lock:
+            self._gauges[name] = callback
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Description
+        --
+        Takes a snapshot of all the metrics.
+
+        Returns
+        --
+        The counters, the gauges and the histograms (count, p50, p95, p99 and
+        max, in ms), by formatted key, under 'counters', 'gauges' and
+        'histograms'.
+        """
+
+        def ms(value_us: float) -> float:
+            return round(value_us / 1000, 3)
+
+        with self._lock:
+            counters = {_format_key(key): count for key, count in self._counters.items()}
+            histograms = {
+                _format_key(key): {
+                    'count': histogram.count,
+                    'p50': ms(histogram.percentile(50)),
+                    'p95': ms(histogram.percentile(95)),
+                    'p99': ms(histogram.percentile(99)),
+                    'max': ms(histogram.maximum)
+                } for key, histogram in self._histograms.items()}
+            gauges = dict(self._gauges)
+
+        return {
+            'counters': counters,
+            'gauges': {name: callback() for name, callback in gauges.items()},
+            'histograms': histograms
+        }
+
+    def summary(self) -> str:
+        """
+        Description
+        --
+        Summarizes the metrics on a single line, e.g. for the logs.
+
+        Returns
+        --
+        The summary.
+        """
+
+        snapshot = self.snapshot()
+        parts = ['{}={}'.format(name, value) for name, value in sorted(snapshot['gauges'].items())]
+        parts += ['{}={}'.format(name, value) for name, value in sorted(snapshot['counters'].items())]
+        parts += [
+            '{}=p50:{} p99:{} max:{} n:{}'.format(name, stats['p50'], stats['p99'], stats['max'], stats['count'])
+            for name, stats in sorted(snapshot['histograms'].items())]
+
+        return ', '.join(parts)
@@ -1,22 +1,36 @@
 # System imports
+import sys
 import uuid
-from typing import Dict
+from typing import Any, Dict, Tuple
+
+
+def _intern(value: Any) -> Any:
+    """
+    Interns a string, so equal strings share the same object.
+    """
+
+    return sys.intern(value) if type(value) is str else value
 
 
 class Profile:
     """
     Description
     --
-    A profile model.
+    A profile model. Slotted, as there can be a great many of them, and the
+    parameter names (and provider Ids) are interned, so the profiles share
+    them.
     """
 
-    def __init__(self, name: str, provider_id: str, run_every_x_seconds: int) -> None:
+    __slots__ = ('id', 'name', 'provider_id', 'run_every_x_seconds', 'provider_parameters', 'timeout_s', 'tags')
+
+    def __init__(self, name: str, provider_id: str, run_every_x_seconds: float) -> None:
         """
         Parameters
         --
         - name - the name of the profile.
         - provider_id - the Id of the provider that will run this profile.
         - run_every_x_seconds - every how many seconds should the profile be ran?
+        Fractions of a second are supported.
         """
 
         # Auto-generate the profile Id
@@ -28,6 +42,12 @@ class Profile:
         self.run_every_x_seconds = run_every_x_seconds
         self.provider_parameters = {}  # type: Dict[str, str]
 
+        # Optional run timeout override (seconds), defaults to the runner's
+        self.timeout_s = None   # type: float
+
+        # Optional tags, to group and filter the profiles by
+        self.tags = ()          # type: Tuple[str, ...]
+
         # Validate the properties
         self.self_validate()
 
@@ -51,5 +71,70 @@ class Profile:
         if self.run_every_x_seconds <= 0:
             raise ValueError("run_every_x_seconds must be > 0")
 
+        if self.timeout_s is not None and self.timeout_s <= 0:
+            raise ValueError("timeout_s must be > 0")
+
+        if any(not tag or not isinstance(tag, str) for tag in self.tags):
+            raise ValueError("tags must be non-empty strings")
+
         if not self.id:
             raise ValueError("id is required")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Description
+        --
+        Converts the profile to plain data (e.g. for serialization).
+
+        Returns
+        --
+        The profile, as a dictionary.
+        """
+
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'provider_id': self.provider_id,
+            'run_every_x_seconds': self.run_every_x_seconds,
+            'provider_parameters': dict(self.provider_parameters)
+        }
+
+        if self.timeout_s is not None:
+            data['timeout_s'] = self.timeout_s
+
+        if self.tags:
+            data['tags'] = list(self.tags)
+
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Profile':
+        """
+        Description
+        --
+        Creates a profile from plain data, as produced by to_dict(). The
+        profile is not validated.
+
+        Parameters
+        --
+        - data - the profile, as a dictionary.
+
+        Returns
+        --
+        The profile.
+        """
+
+        # Bypass the initializer, the Id is given and validation is up to the caller
+        profile = cls.__new__(cls)
+        profile.id = data.get('id')
+        profile.name = data.get('name')
+        profile.provider_id = _intern(data.get('provider_id'))
+        profile.run_every_x_seconds = data.get('run_every_x_seconds')
+        profile.provider_parameters = {
+            _intern(key): value for key, value in (data.get('provider_parameters') or {}).items()}
+        profile.timeout_s = data.get('timeout_s')
+
+        tags = data.get('tags') or ()
+        profile.tags = (tags,) if isinstance(tags, str) else tuple(tags)
+
+        return profile
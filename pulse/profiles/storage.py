@@ -1,6 +1,11 @@
 # System imports
 import abc
-from typing import List, Dict
+import hashlib
+import json
+import marshal
+import sqlite3
+import threading
+from typing import Any, Iterable, Iterator, List, Dict, NamedTuple, Optional, Tuple
 from os import path
 import os
 import yaml
@@ -8,6 +13,46 @@ import yaml
 # Local imports
 from . import Profile
 
+# The libyaml (C) loader, if available
+_SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# The file signature before the first load (None is a missing file)
+_NOT_LOADED = ()
+
+
+class _ProfileLoader(_SafeLoader):
+    """
+    Description
+    --
+    Loads profiles as plain data. Profiles tagged as python objects (the
+    legacy format) are loaded as plain mappings too, without constructing
+    any objects.
+    """
+
+    pass
+
+
+_ProfileLoader.add_constructor(
+                    'tag:yaml.org,2002:python/object:pulse.profiles.Profile',
+                    lambda loader, node: loader.construct_mapping(node, deep=True))
+
+
+class ProfileChanges(NamedTuple):
+    """
+    Description
+    --
+    The changes in a profile storage since a version of it.
+    """
+
+    # The version of the storage, with the changes applied
+    version: int
+
+    # The added and changed profiles
+    changed: List[Profile]
+
+    # The Ids of the removed profiles
+    removed: List[str]
+
 
 class BaseProfileStorage(abc.ABC):
     """
@@ -50,6 +95,63 @@ class BaseProfileStorage(abc.ABC):
 
         pass
 
+    def iter_profiles(self, page_size: int = 500) -> Iterator[Profile]:
+        """
+        Description
+        --
+        Iterates over all available profiles, without loading them all at
+        once, if the storage supports it.
+        Can be overriden.
+
+        Parameters
+        --
+        - page_size - how many profiles to load at a time.
+
+        Returns
+        --
+        An iterator over the profiles.
+        """
+
+        for profile_id in self.get_all_ids():
+            yield self.get(profile_id)
+
+    def get_version(self) -> Optional[int]:
+        """
+        Description
+        --
+        Gets the current version of the storage, which grows with every
+        change, if the storage keeps track of its changes.
+        Can be overriden.
+
+        Returns
+        --
+        The version, or None if the changes are not tracked (see
+        changes_since).
+        """
+
+        return None
+
+    def changes_since(self, version: int) -> Optional[ProfileChanges]:
+        """
+        Description
+        --
+        Gets the changes since a version of the storage, so they can be
+        applied incrementally.
+        Can be overriden.
+
+        Parameters
+        --
+        - version - the version, as returned by get_version() or by a
+        previous call.
+
+        Returns
+        --
+        The changes, or None if the changes are not tracked, in which case
+        all the profiles must be read again.
+        """
+
+        return None
+
 
 class InMemoryProfileStorage(BaseProfileStorage):
     """
@@ -58,7 +160,25 @@ class InMemoryProfileStorage(BaseProfileStorage):
     An in-memory profile storage.
     """
 
-    _profiles = {}  # type: Dict[str, Profile]
+    def __init__(self) -> None:
+        self._profiles = {}     # type: Dict[str, Profile]
+
+    def put(self, profiles: Iterable[Profile]) -> None:
+        """
+        Description
+        --
+        Adds or replaces profiles.
+
+        Parameters
+        --
+        - profiles - the profiles.
+        """
+
+        for profile in profiles:
+            if not profile.id:
+                raise ValueError("id is required!")
+
+            self._profiles[profile.id] = profile
 
     def get_all_ids(self) -> List[str]:
         """
@@ -107,25 +227,107 @@ class FileProfileStorage(BaseProfileStorage):
     Description
     --
     A file-based profile storage. Serializes and deserializes data to file.
+    - The file is parsed once into an in-memory index, and parsed again only
+    when its modification time or size change.
+    - The parsed profiles are cached in a binary snapshot next to the file
+    (keyed by its content hash), so unchanged files load in one bulk read.
     """
 
     _file_path = None    # type: str
+    _snapshot_magic = b'PULSE-PROFILES-1'
 
     def __init__(self, data_file: str) -> None:
         if not data_file:
             raise ValueError("data_file is required!")
 
         self._file_path = data_file
+        self._snapshot_path = data_file + '.snapshot'
+        self._profiles = {}     # type: Dict[str, Profile]
+        self._signature = _NOT_LOADED   # type: Optional[Tuple[int, int]]
+        self._lock = threading.Lock()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        """
+        Gets the signature (modification time, size) of the file, None if it
+        doesn't exist.
+        """
+
+        try:
+            stat = os.stat(self._file_path)
+        except FileNotFoundError:
+            return None
+
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read_snapshot(self, digest: bytes) -> Optional[List[Dict[str, Any]]]:
+        """
+        Reads the profiles from the snapshot, if it matches the file content
+        hash.
+        """
+
+        try:
+            with open(self._snapshot_path, 'rb') as file:
+                header = file.read(len(self._snapshot_magic) + len(digest))
+                if header != self._snapshot_magic + digest:
+                    return None
+
+                return marshal.loads(file.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def _write_snapshot(self, digest: bytes, records: List[Dict[str, Any]]) -> None:
+        """
+        Writes the profiles into the snapshot, keyed by the file content hash.
+        """
+
+        temp_path = "{}.{}.tmp".format(self._snapshot_path, os.getpid())
+
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(self._snapshot_magic + digest)
+                file.write(marshal.dumps(records))
+            os.replace(temp_path, self._snapshot_path)
+        except (OSError, ValueError):
+            # The snapshot is just a cache, the next load will parse again
+            if path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _read_profiles(self) -> List[Profile]:
+        """
+        Parses the profiles from the file, or loads them from its snapshot if
+        the file did not change since it was last parsed.
+        """
+
+        if not path.exists(self._file_path):
+            return []
+
+        with open(self._file_path, 'rb') as file:
+            content = file.read()
+
+        if not content.strip():
+            return []
+
+        digest = hashlib.blake2b(content, digest_size=32).digest()
+        records = self._read_snapshot(digest)
+
+        if records is None:
+            data = yaml.load(content, Loader=_ProfileLoader) or []
+            records = [Profile.from_dict(item).to_dict() for item in data]
+            self._write_snapshot(digest, records)
+
+        return [Profile.from_dict(record) for record in records]
 
     def _get_profiles(self) -> Dict[str, Profile]:
-        profiles = []  # type: List[Profile]
+        signature = self._stat()
 
-        if path.exists(self._file_path):
-            if os.stat(self._file_path).st_size > 0:
-                with open(self._file_path, 'r') as file:
-                    profiles = list(yaml.load(file, Loader=yaml.FullLoader))
+        if signature != self._signature:
+            with self._lock:
+                # Another thread might have reloaded it meanwhile
+                if signature != self._signature:
+                    self._profiles = {profile.id: profile for profile in self._read_profiles()}
+                    self._signature = signature
 
-        return {profile.id: profile for profile in profiles}
+        return self._profiles
 
     def get_all_ids(self) -> List[str]:
         """
@@ -159,7 +361,7 @@ class FileProfileStorage(BaseProfileStorage):
             raise ValueError("profile_id is required!")
 
         # Get the profile by Id
-        profile = self._get_profiles()[profile_id]
+        profile = self._get_profiles().get(profile_id)
 
         # If the profile was not found ...
         if profile is None:
@@ -167,3 +369,343 @@ class FileProfileStorage(BaseProfileStorage):
 
         # Return the profile
         return profile
+
+
+class SqliteProfileStorage(BaseProfileStorage):
+    """
+    Description
+    --
+    An SQLite-based profile storage, for large numbers of profiles.
+    - The profiles are indexed by provider, interval and tags, and can be
+    read a page at a time.
+    - Every write transaction bumps the version of the storage. The removed
+    profiles are kept as tombstones, so the changes since any version can
+    be read (see changes_since).
+    """
+
+    def __init__(self, db_path: str) -> None:
+        """
+        Parameters
+        --
+        - db_path - the database file.
+        """
+
+        if not db_path:
+            raise ValueError("db_path is required!")
+
+        directory = path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS profiles (
+                id TEXT PRIMARY KEY,
+                provider_id TEXT,
+                run_every_x_seconds REAL,
+                data TEXT,
+                version INTEGER NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0);
+            CREATE INDEX IF NOT EXISTS profiles_provider_id ON profiles (provider_id);
+            CREATE INDEX IF NOT EXISTS profiles_run_every_x_seconds ON profiles (run_every_x_seconds);
+            CREATE INDEX IF NOT EXISTS profiles_version ON profiles (version);
+            CREATE TABLE IF NOT EXISTS profile_tags (
+                tag TEXT NOT NULL,
+                profile_id TEXT NOT NULL,
+                PRIMARY KEY (tag, profile_id)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS profile_tags_profile_id ON profile_tags (profile_id);
+            """)
+
+    @staticmethod
+    def _to_profile(data: str) -> Profile:
+        """
+        Loads a profile from its stored (JSON) form.
+        """
+
+        return Profile.from_dict(json.loads(data))
+
+    def _write(self, write) -> int:
+        """
+        Runs a write in a transaction of its own, under the next version.
+        """
+
+        with self._lock:
+            db = self._connection
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                version = db.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM profiles").fetchone()[0]
+                total_changes = db.total_changes
+                write(db, version)
+                db.execute("COMMIT")
+
+                # Nothing was written
+                if db.total_changes == total_changes:
+                    version -= 1
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+        return version
+
+    def put(self, profiles: Iterable[Profile]) -> int:
+        """
+        Description
+        --
+        Adds or replaces profiles, in a single transaction.
+
+        Parameters
+        --
+        - profiles - the profiles.
+
+        Returns
+        --
+        The version of the storage, with the profiles written.
+        """
+
+        def write(db: sqlite3.Connection, version: int) -> None:
+            for profile in profiles:
+                if not profile.id:
+                    raise ValueError("id is required!")
+
+                db.execute(
+                    "INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?, ?, 0)",
+                    (
+                        profile.id,
+                        profile.provider_id,
+                        profile.run_every_x_seconds,
+                        json.dumps(profile.to_dict()),
+                        version))
+                db.execute("DELETE FROM profile_tags WHERE profile_id = ?", (profile.id,))
+                db.executemany(
+                    "INSERT OR IGNORE INTO profile_tags VALUES (?, ?)",
+                    ((tag, profile.id) for tag in profile.tags))
+
+        return self._write(write)
+
+    def remove(self, profile_ids: Iterable[str]) -> int:
+        """
+        Description
+        --
+        Removes profiles, in a single transaction.
+
+        Parameters
+        --
+        - profile_ids - the Ids of the profiles.
+
+        Returns
+        --
+        The version of the storage, with the profiles removed.
+        """
+
+        def write(db: sqlite3.Connection, version: int) -> None:
+            for profile_id in profile_ids:
+                db.execute(
+                    "UPDATE profiles SET deleted = 1, data = NULL, version = ? WHERE id = ? AND deleted = 0",
+                    (version, profile_id))
+                db.execute("DELETE FROM profile_tags WHERE profile_id = ?", (profile_id,))
+
+        return self._write(write)
+
+    def get_all_ids(self) -> List[str]:
+        """
+        Description
+        --
+        Gets all available profiles Ids.
+
+        Returns
+        --
+        A list of the Ids of all available profiles.
+        """
+
+        with self._lock:
+            return [row[0] for row in self._connection.execute("SELECT id FROM profiles WHERE deleted = 0 ORDER BY id")]
+
+    def get(self, profile_id: str) -> Profile:
+        """
+        Description
+        --
+        Gets a profile by Id.
+
+        Parameters
+        --
+        - profile_id - the Id of the profile to get.
+
+        Returns
+        --
+        The profile.
+        """
+
+        if not profile_id:
+            raise ValueError("profile_id is required!")
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM profiles WHERE id = ? AND deleted = 0", (profile_id,)).fetchone()
+
+        # If the profile was not found ...
+        if row is None:
+            raise ValueError("Profile not found by Id!")
+
+        return self._to_profile(row[0])
+
+    def get_page(
+                self,
+                after_id: str = None,
+                limit: int = 500,
+                provider_id: str = None,
+                tag: str = None,
+                max_interval_s: float = None) -> List[Profile]:
+        """
+        Description
+        --
+        Gets a page of profiles, ordered by Id, optionally filtered.
+
+        Parameters
+        --
+        - after_id - the Id of the last profile of the previous page, None
+        for the first page.
+        - limit - the size of the page.
+        - provider_id - only the profiles of this provider, if set.
+        - tag - only the profiles with this tag, if set.
+        - max_interval_s - only the profiles which run at least this often,
+        if set.
+
+        Returns
+        --
+        The profiles, less than limit if it's the last page.
+        """
+
+        if limit <= 0:
+            raise ValueError("limit must be > 0")
+
+        query = "SELECT p.data FROM profiles p"
+        conditions = ["p.deleted = 0"]
+        args = []   # type: List[Any]
+
+        if tag is not None:
+            query += " JOIN profile_tags t ON t.profile_id = p.id AND t.tag = ?"
+            args.append(tag)
+        if after_id is not None:
+            conditions.append("p.id > ?")
+            args.append(after_id)
+        if provider_id is not None:
+            conditions.append("p.provider_id = ?")
+            args.append(provider_id)
+        if max_interval_s is not None:
+            conditions.append("p.run_every_x_seconds <= ?")
+            args.append(max_interval_s)
+
+        query += " WHERE " + " AND ".join(conditions) + " ORDER BY p.id LIMIT ?"
+        args.append(limit)
+
+        with self._lock:
+            rows = self._connection.execute(query, args).fetchall()
+
+        return [self._to_profile(row[0]) for row in rows]
+
+    def iter_profiles(self, page_size: int = 500, **filters) -> Iterator[Profile]:
+        """
+        Description
+        --
+        Iterates over all available profiles, a page at a time.
+
+        Parameters
+        --
+        - page_size - how many profiles to load at a time.
+        - filters - the filters of get_page(), if any.
+
+        Returns
+        --
+        An iterator over the profiles.
+        """
+
+        after_id = None
+        while True:
+            page = self.get_page(after_id, page_size, **filters)
+            yield from page
+
+            if len(page) < page_size:
+                return
+            after_id = page[-1].id
+
+    def get_version(self) -> Optional[int]:
+        """
+        Description
+        --
+        Gets the current version of the storage.
+
+        Returns
+        --
+        The version, 0 if the storage was never written to.
+        """
+
+        with self._lock:
+            return self._connection.execute("SELECT COALESCE(MAX(version), 0) FROM profiles").fetchone()[0]
+
+    def changes_since(self, version: int) -> Optional[ProfileChanges]:
+        """
+        Description
+        --
+        Gets the changes since a version of the storage.
+
+        Parameters
+        --
+        - version - the version, as returned by get_version() or by a
+        previous call.
+
+        Returns
+        --
+        The changes.
+        """
+
+        if version is None:
+            raise ValueError("version is required!")
+
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, data, version, deleted FROM profiles WHERE version > ? ORDER BY version", (version,)).fetchall()
+
+        changes = ProfileChanges(version, [], [])
+        for profile_id, data, row_version, deleted in rows:
+            if deleted:
+                changes.removed.append(profile_id)
+            else:
+                changes.changed.append(self._to_profile(data))
+
+        return changes._replace(version=rows[-1][2]) if rows else changes
+
+    def close(self) -> None:
+        """
+        Description
+        --
+        Closes the database.
+        """
+
+        with self._lock:
+            self._connection.close()
+
+
+def open_profile_storage(file_path: str) -> BaseProfileStorage:
+    """
+    Description
+    --
+    Opens the profile storage of a file, by its extension: SQLite for '.db',
+    '.sqlite' and '.sqlite3' files, YAML otherwise.
+
+    Parameters
+    --
+    - file_path - the file.
+
+    Returns
+    --
+    The profile storage.
+    """
+
+    if not file_path:
+        raise ValueError("file_path is required!")
+
+    if path.splitext(file_path)[1].lower() in ('.db', '.sqlite', '.sqlite3'):
+        return SqliteProfileStorage(file_path)
+
+    return FileProfileStorage(file_path)
@@ -3,9 +3,14 @@ import abc
 import importlib
 import os
 import pkgutil
-import sys
+import threading
+import time
 from enum import Enum
-from typing import Dict, List, NamedTuple
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Kept out of the runtime imports, as it pulls in logging
+    import concurrent.futures
 
 
 class ParameterMetadata(NamedTuple):
@@ -40,16 +45,133 @@ class ProviderResult:
     The result of a  provider run.
     """
 
-    def __init__(self, status: ResultStatus, value: int = None) -> None:
+    __slots__ = ('status', 'value', 'resolve_ms', 'timings')
+
+    def __init__(
+                self,
+                status: ResultStatus,
+                value: int = None,
+                resolve_ms: int = None,
+                timings: Dict[str, int] = None) -> None:
         """
         Parameters
         --
         - status - the status of the result.
-        - value - the value of the result.
+        - value - the value of the result, None if the run measured none
+        (e.g. it timed out).
+        - resolve_ms - how long the hostname resolution took, if any. Not
+        included in the value.
+        - timings - how long the phases of the run took (ms), by phase (e.g.
+        'connect', 'tls', 'ttfb'), if the provider reports them.
         """
 
         self.status = status                            # type: ResultStatus
-        self.value = value if value is not None else 0  # type: int
+        self.value = value                              # type: Optional[int]
+        self.resolve_ms = resolve_ms                    # type: int
+        self.timings = timings                          # type: Dict[str, int]
+
+
+class Threshold(NamedTuple):
+    """
+    Description
+    --
+    A threshold on the value of a result (e.g. a latency, in ms): over the
+    limit is RED, close to it (over 90%) is YELLOW.
+    """
+
+    limit: int
+    warning: float
+
+    @classmethod
+    def of(cls, limit: int) -> 'Threshold':
+        """
+        Description
+        --
+        Creates a threshold.
+
+        Parameters
+        --
+        - limit - the limit.
+
+        Returns
+        --
+        The threshold.
+        """
+
+        return cls(limit, limit - (limit / 10))
+
+    def status(self, value: int) -> ResultStatus:
+        """
+        Description
+        --
+        Gets the status of a value.
+
+        Parameters
+        --
+        - value - the value.
+
+        Returns
+        --
+        RED over the limit, YELLOW close to it, GREEN otherwise.
+        """
+
+        if value > self.limit:
+            # Over the limit
+            return ResultStatus.RED
+        elif value > self.warning:
+            # Close to the limit (over 90%)
+            return ResultStatus.YELLOW
+
+        return ResultStatus.GREEN
+
+
+class Deadline:
+    """
+    Description
+    --
+    The time budget of a provider run. Providers derive their socket and I/O
+    timeouts from it, so a run that times out also frees its resources.
+    """
+
+    __slots__ = ('expires_at',)
+
+    def __init__(self, timeout_s: float = None) -> None:
+        """
+        Parameters
+        --
+        - timeout_s - the budget, in seconds. None means no deadline.
+        """
+
+        # When does the budget expire (time.monotonic() based)
+        self.expires_at = time.monotonic() + timeout_s if timeout_s is not None else None  # type: float
+
+    @property
+    def expired(self) -> bool:
+        """
+        Is the budget used up?
+        """
+
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def remaining(self, default: float = None) -> float:
+        """
+        Description
+        --
+        Gets the remaining budget.
+
+        Parameters
+        --
+        - default - the value to return, if there is no deadline.
+
+        Returns
+        --
+        The remaining budget in seconds, never less than 0.
+        """
+
+        if self.expires_at is None:
+            return default
+
+        return max(self.expires_at - time.monotonic(), 0)
 
 
 class BaseProvider(abc.ABC):
@@ -60,8 +182,126 @@ class BaseProvider(abc.ABC):
     - Basic run workflow.
     - Basic validation workflow.
     - Common parameters for all providers.
+    - Lifecycle hooks, for the resources reused across runs.
     """
 
+    # By default, a single instance runs all the profiles of the provider
+    # (concurrently, so it must be thread-safe). Set to True to get an
+    # instance per profile instead.
+    instance_per_profile = False
+
+    def setup(self) -> None:
+        """
+        Description
+        --
+        Creates the resources (sockets, sessions, compiled state) that the
+        instance reuses across runs. Called once, before the first run.
+        Can be overriden.
+        """
+
+        pass
+
+    def teardown(self) -> None:
+        """
+        Description
+        --
+        Releases the resources created by setup(). Called once, when the
+        instance is no longer used.
+        Can be overriden.
+        """
+
+        pass
+
+    def prepare(self, parameters: Dict[str, str]) -> Any:
+        """
+        Description
+        --
+        Turns the (validated) parameters of a profile into its run plan, once
+        when the profile is loaded, so the runs don't parse them again. The
+        plan is shared by the runs, so it should be immutable (e.g. a
+        NamedTuple).
+        Can be overriden.
+
+        Parameters
+        --
+        - parameters - the validated parameters.
+
+        Returns
+        --
+        The run plan, passed to run() and submit() instead of the
+        parameters. The parameters themselves, by default.
+        """
+
+        return parameters
+
+    def _plan_of(self, parameters: Any) -> Any:
+        """
+        Description
+        --
+        Gets the run plan of a run, preparing it if the parameters were
+        passed instead (e.g. when a provider is run directly, rather than by
+        the runner).
+
+        Parameters
+        --
+        - parameters - the run plan, or the parameters.
+
+        Returns
+        --
+        The run plan.
+        """
+
+        return self.prepare(parameters) if isinstance(parameters, dict) else parameters
+
+    def probe_plan(self, plan: Any) -> Any:
+        """
+        Description
+        --
+        Gets the part of a run plan that the probe itself depends on, without
+        how its result is judged (e.g. the threshold). Profiles of the
+        provider with the same probe plan (and timeout) share a single probe
+        in flight, whose result each profile then judges on its own (see
+        judge).
+        Can be overriden.
+
+        Parameters
+        --
+        - plan - the run plan of a profile.
+
+        Returns
+        --
+        The probe plan, which must be hashable and is run instead of the
+        profile's plan. None if the probes can't be shared, by default.
+        """
+
+        return None
+
+    def judge(self, plan: Any, result: ProviderResult) -> ProviderResult:
+        """
+        Description
+        --
+        Judges the result of a shared probe (see probe_plan) for a profile.
+        A GREEN result is checked against the threshold of the plan, if it
+        has one (a 'threshold' field).
+        Can be overriden.
+
+        Parameters
+        --
+        - plan - the run plan of the profile.
+        - result - the result of the shared probe.
+
+        Returns
+        --
+        The result of the profile, a copy of the probe result.
+        """
+
+        status = result.status
+        threshold = getattr(plan, 'threshold', None)
+        if status == ResultStatus.GREEN and threshold is not None and result.value is not None:
+            status = threshold.status(result.value)
+
+        return ProviderResult(status, result.value, result.resolve_ms, result.timings)
+
     def _discover_parameters(self) -> Dict[str, ParameterMetadata]:
         """
         Description
@@ -92,7 +332,7 @@ class BaseProvider(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def run(self, parameters: Dict[str, str]) -> ProviderResult:
+    def run(self, parameters: Dict[str, str], deadline: Deadline = None) -> ProviderResult:
         """
         Description
         --
@@ -101,8 +341,10 @@ class BaseProvider(abc.ABC):
 
         Parameters
         --
-        - parameters - the parameters to pass to the provider instance at
-        runtime.
+        - parameters - the run plan of the profile (see prepare), which are
+        its parameters by default.
+        - deadline - the time budget of the run. Blocking calls should not
+        wait longer than the remaining budget.
 
         Returns
         --
@@ -111,6 +353,29 @@ class BaseProvider(abc.ABC):
 
         pass
 
+    def submit(self, parameters: Dict[str, str], deadline: Deadline) -> Optional['concurrent.futures.Future']:
+        """
+        Description
+        --
+        Starts the workload without blocking, for providers which multiplex
+        their I/O (e.g. over a single socket) instead of waiting on a thread.
+        Can be overriden.
+
+        Parameters
+        --
+        - parameters - the run plan of the profile (see prepare), which are
+        its parameters by default.
+        - deadline - the time budget of the run. The future must be resolved
+        by then.
+
+        Returns
+        --
+        A future of the run result, or None if the run must be done by run(),
+        on a worker thread.
+        """
+
+        return None
+
     def validate(self, parameters: Dict[str, str]) -> None:
         """
         Description
@@ -164,16 +429,33 @@ class ProvidersManager:
     --
     - Lists available providers.
     - Creates an instance of a provider.
+    - Caches the instances which run the profiles, managing their lifecycle.
     """
 
     # Initialized once, at loading and then cached
-    _providers = {}     # Dict[str, str]
+    _providers = {}     # Dict[str, type]
 
-    def __init__(self) -> None:
+    def __init__(self, metrics=None) -> None:
         """
         Loads and caches the list of providers.
+
+        Parameters
+        --
+        - metrics - if set, a metrics registry (see pulse.metrics) to record
+        the set up durations and the instance counts in.
         """
 
+        # The instances which are set up, by (provider_id, profile_id)
+        self._instances = {}    # type: Dict[Tuple[str, str], BaseProvider]
+
+        # The instances used for discovery and validation (not set up)
+        self._prototypes = {}   # type: Dict[str, BaseProvider]
+        self._lock = threading.RLock()
+
+        self._metrics = metrics
+        if metrics is not None:
+            metrics.gauge('provider_instances', lambda: len(self._instances))
+
         impl_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'impl')
         for (module_loader, name, ispkg) in pkgutil.iter_modules([impl_dir]):
             importlib.import_module('.impl.' + name, __package__)
@@ -182,8 +464,8 @@ class ProvidersManager:
         # implementation modules are imported)
         providers = BaseProvider.__subclasses__()
         for provider in providers:
-            # Dictionary of provider_id:provider_module
-            self._providers[provider.__name__] = provider.__module__
+            # Dictionary of provider_id:provider_class
+            self._providers[provider.__name__] = provider
 
     def get_all_ids(self) -> List[str]:
         """
@@ -219,11 +501,8 @@ class ProvidersManager:
         if not provider_id:
             raise ValueError("provider_id is required!")
 
-        # Create an instance of the provider
-        provider_instance = self.instantiate(provider_id)
-
-        # Ask the instance of the provider to reveal its runtime parameters.
-        return provider_instance.discover_parameters()
+        # Ask an instance of the provider to reveal its runtime parameters.
+        return self.get_prototype(provider_id).discover_parameters()
 
     def instantiate(self, provider_id: str) -> BaseProvider:
         """
@@ -244,13 +523,124 @@ class ProvidersManager:
         if not provider_id:
             raise ValueError("provider_id is required!")
 
-        if self._providers[provider_id] is None:
+        provider_class_ = self._providers.get(provider_id)
+        if provider_class_ is None:
             raise ValueError("Provider with Id '%s' not found!", provider_id)
 
-        # Use 'reflection' to create an instance
-        provider_class_ = getattr(
-                            sys.modules[self._providers[provider_id]],
-                            provider_id)
-
         # Return the instance
         return provider_class_()
+
+    def get_prototype(self, provider_id: str) -> BaseProvider:
+        """
+        Description
+        --
+        Gets a cached instance of a provider, which is not set up. Good for
+        discovery and validation, but not for runs.
+
+        Parameters
+        --
+        - provider_id - the Id of the provider.
+
+        Returns
+        --
+        An instance of the provider.
+        """
+
+        prototype = self._prototypes.get(provider_id)
+        if prototype is None:
+            prototype = self._prototypes.setdefault(provider_id, self.instantiate(provider_id))
+
+        return prototype
+
+    def get_instance(self, provider_id: str, profile_id: str = None) -> BaseProvider:
+        """
+        Description
+        --
+        Gets the instance of a provider which runs a profile. It's created and
+        set up on first use and then reused, for all the profiles of the
+        provider, or for this profile only (see
+        BaseProvider.instance_per_profile).
+
+        Parameters
+        --
+        - provider_id - the Id of the provider.
+        - profile_id - the Id of the profile to run.
+
+        Returns
+        --
+        The set up instance of the provider.
+        """
+
+        key = self._instance_key(provider_id, profile_id)
+        instance = self._instances.get(key)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            instance = self._instances.get(key)
+            if instance is None:
+                started = time.monotonic()
+                instance = self.instantiate(provider_id)
+                instance.setup()
+                self._instances[key] = instance
+
+                if self._metrics is not None:
+                    self._metrics.observe('provider_setup_ms', (time.monotonic() - started) * 1000, provider=provider_id)
+
+        return instance
+
+    def release_instance(self, provider_id: str, profile_id: str) -> None:
+        """
+        Description
+        --
+        Tears down the instance of a provider dedicated to a profile, if any.
+        Instances shared by all the profiles of the provider are kept. Must be
+        called once no run of the profile is in flight, the instance is torn
+        down right away.
+
+        Parameters
+        --
+        - provider_id - the Id of the provider.
+        - profile_id - the Id of the profile which is no longer ran.
+        """
+
+        key = self._instance_key(provider_id, profile_id)
+        if key[1] is None:
+            return
+
+        with self._lock:
+            instance = self._instances.pop(key, None)
+
+        if instance is not None:
+            instance.teardown()
+
+            if self._metrics is not None:
+                self._metrics.inc('provider_teardowns_total', provider=provider_id)
+
+    def teardown(self) -> None:
+        """
+        Description
+        --
+        Tears down all the cached instances.
+        """
+
+        with self._lock:
+            instances = list(self._instances.values())
+            self._instances.clear()
+
+        for instance in instances:
+            instance.teardown()
+
+    def _instance_key(self, provider_id: str, profile_id: str) -> Tuple[str, str]:
+        """
+        Gets the cache key of the instance which runs a profile.
+        """
+
+        if not provider_id:
+            raise ValueError("provider_id is required!")
+
+        provider_class_ = self._providers.get(provider_id)
+        if provider_class_ is None:
+            raise ValueError("Provider with Id '%s' not found!", provider_id)
+
+        return (provider_id, profile_id if provider_class_.instance_per_profile else None)
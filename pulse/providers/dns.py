@@ -0,0 +1,249 @@
+# System imports
+import ipaddress
+import queue
+import socket
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# Local imports
+from ..config import Config
+from ..logging import get_module_logger
+
+
+# The address family of each IP version
+_FAMILIES = {4: socket.AF_INET, 6: socket.AF_INET6}
+
+
+class Resolution(NamedTuple):
+    """
+    Description
+    --
+    The result of a hostname resolution.
+    """
+
+    address: Optional[str]
+    resolve_ms: int = 0
+
+
+class _Entry:
+    """
+    Description
+    --
+    A cached resolution.
+    """
+
+    __slots__ = ('address', 'expires_at', 'refresh_at', 'refreshing')
+
+    def __init__(self, address: Optional[str], ttl_s: float, refresh_ahead: float) -> None:
+        now = time.monotonic()
+        self.address = address
+        self.expires_at = now + ttl_s
+        self.refresh_at = now + ttl_s * refresh_ahead
+        self.refreshing = False
+
+
+class ResolverCache:
+    """
+    Description
+    --
+    A process-wide, thread-safe hostname resolution cache, shared by the
+    network providers.
+    - Entries are kept by address family: ICMP needs IPv4 addresses, TCP
+    and HTTP take the system's preferred address, IPv4 or IPv6.
+    - Entries expire after a TTL, failed resolutions after a (shorter)
+    negative TTL.
+    - Entries used after most of their TTL has passed are refreshed in the
+    background, so hot hostnames never wait for the resolver.
+
+    The system resolver doesn't expose record TTLs, so the TTLs come from
+    the 'dns' config section.
+    """
+
+    _shared = None          # type: ResolverCache
+    _shared_lock = threading.Lock()
+
+    def __init__(self, ttl_s: float = 60, negative_ttl_s: float = 5, refresh_ahead: float = 0.8) -> None:
+        """
+        Parameters
+        --
+        - ttl_s - how long to cache a resolved address, in seconds.
+        - negative_ttl_s - how long to cache a failed resolution, in seconds.
+        - refresh_ahead - the part of the TTL after which a used entry is
+        refreshed in the background (0..1).
+        """
+
+        self._logger = get_module_logger(__name__)
+        self._ttl_s = ttl_s
+        self._negative_ttl_s = negative_ttl_s
+        self._refresh_ahead = refresh_ahead
+        self._entries = {}      # type: Dict[Tuple[str, int], _Entry]
+        self._lock = threading.Lock()
+        self._refresh_queue = queue.Queue()     # type: queue.Queue
+        self._refresher = None  # type: threading.Thread
+
+    @classmethod
+    def shared(cls) -> 'ResolverCache':
+        """
+        Description
+        --
+        Gets the process-wide cache, creating it (from the 'dns' config
+        section) on first use.
+
+        Returns
+        --
+        The cache.
+        """
+
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = ResolverCache(
+                                    Config.load_typed('dns', 'ttl_s', 60, float),
+                                    Config.load_typed('dns', 'negative_ttl_s', 5, float),
+                                    Config.load_typed('dns', 'refresh_ahead', 0.8, float))
+
+        return cls._shared
+
+    @staticmethod
+    def _query(hostname: str, family: int) -> Optional[str]:
+        """
+        Resolves a hostname through the system resolver, to the first address
+        of the family (in the order of preference of the system).
+        """
+
+        try:
+            return socket.getaddrinfo(hostname, None, family, socket.SOCK_RAW)[0][4][0]
+        except (socket.gaierror, IndexError, UnicodeError):
+            return None
+
+    def _store(self, key: Tuple[str, int], address: Optional[str]) -> _Entry:
+        """
+        Caches a resolution.
+        """
+
+        entry = _Entry(
+                    address,
+                    self._ttl_s if address is not None else self._negative_ttl_s,
+                    self._refresh_ahead)
+
+        with self._lock:
+            self._entries[key] = entry
+
+        return entry
+
+    def _refresh_loop(self) -> None:
+        """
+        The background refresh thread.
+        """
+
+        while True:
+            key = self._refresh_queue.get()
+            address = self._query(*key)
+
+            if address is None:
+                # Keep serving the last known address, until it expires
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        entry.refreshing = False
+                continue
+
+            self._store(key, address)
+
+    def _refresh_later(self, key: Tuple[str, int], entry: _Entry) -> None:
+        """
+        Schedules a background refresh of an entry, unless already scheduled.
+        """
+
+        with self._lock:
+            if entry.refreshing:
+                return
+            entry.refreshing = True
+
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._refresh_loop, name='pulse-dns', daemon=True)
+                self._refresher.start()
+
+        self._refresh_queue.put(key)
+
+    def lookup(self, hostname: str, family: int = socket.AF_INET) -> Optional[Resolution]:
+        """
+        Description
+        --
+        Resolves a hostname from the cache only, without blocking.
+
+        Parameters
+        --
+        - hostname - the hostname (or IP address) to resolve.
+        - family - the address family to resolve to, socket.AF_INET,
+        socket.AF_INET6 or socket.AF_UNSPEC (either).
+
+        Returns
+        --
+        The resolution, or None if the hostname is not cached.
+        """
+
+        if not hostname:
+            raise ValueError("hostname is required!")
+
+        try:
+            address = ipaddress.ip_address(hostname)
+        except ValueError:
+            pass
+        else:
+            # IP addresses need no resolution, but must be of the family
+            if family in (socket.AF_UNSPEC, _FAMILIES[address.version]):
+                return Resolution(str(address))
+            return Resolution(None)
+
+        key = (hostname, family)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        now = time.monotonic()
+        if now >= entry.expires_at:
+            return None
+
+        if now >= entry.refresh_at and entry.address is not None:
+            self._refresh_later(key, entry)
+
+        return Resolution(entry.address)
+
+    def resolve(self, hostname: str, family: int = socket.AF_INET) -> Resolution:
+        """
+        Description
+        --
+        Resolves a hostname, through the cache.
+
+        Parameters
+        --
+        - hostname - the hostname (or IP address) to resolve.
+        - family - the address family to resolve to, socket.AF_INET,
+        socket.AF_INET6 or socket.AF_UNSPEC (either).
+
+        Returns
+        --
+        The resolution. Its address is None if the hostname did not resolve,
+        its resolve_ms is 0 if it was served from the cache.
+        """
+
+        resolution = self.lookup(hostname, family)
+        if resolution is not None:
+            return resolution
+
+        started = time.monotonic()
+        entry = self._store((hostname, family), self._query(hostname, family))
+
+        return Resolution(entry.address, int((time.monotonic() - started) * 1000))
+
+    def clear(self) -> None:
+        """
+        Description
+        --
+        Drops all the cached resolutions.
+        """
+
+        with self._lock:
+            self._entries.clear()
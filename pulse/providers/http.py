@@ -0,0 +1,342 @@
+# System imports
+import http.client
+import select
+import socket
+import ssl
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional, Tuple
+
+# Local imports
+from ..config import Config
+from ..logging import get_module_logger
+from .dns import ResolverCache
+
+
+class Exchange(NamedTuple):
+    """
+    Description
+    --
+    The outcome of an HTTP request, and how long its phases took (ms). The
+    connect and TLS times are 0 when a pooled connection was reused, the
+    resolve time is 0 when it was served from the cache. The total time
+    excludes the resolution.
+    """
+
+    status: int
+    body: bytes
+    reused: bool
+    resolve_ms: int
+    connect_ms: int
+    tls_ms: int
+    ttfb_ms: int
+    total_ms: int
+
+
+class _Key(NamedTuple):
+    """
+    Description
+    --
+    What a pooled connection is good for.
+    """
+
+    scheme: str
+    host: str
+    port: int
+    verify_tls: bool
+
+
+class ConnectionPool:
+    """
+    Description
+    --
+    A process-wide, thread-safe pool of keep-alive HTTP(S) connections, by
+    scheme, host and port, shared by the runs of every profile.
+    - A request takes an idle connection of its host (the most recently
+    used one), or opens a new one, and returns it to the pool once the
+    response is read, unless the server is closing it.
+    - Idle connections which were closed by the server, or idle for too
+    long, are discarded. A request on a reused connection which turns out
+    to be stale is retried once, on a new connection.
+    - TLS sessions are resumed across new connections of a host, to save
+    the full handshake.
+    """
+
+    _shared = None      # type: ConnectionPool
+    _shared_lock = threading.Lock()
+
+    _headers = {'User-Agent': 'heartbeat-pulse', 'Accept': '*/*', 'Connection': 'keep-alive'}
+
+    def __init__(self, max_idle_per_host: int = 16, idle_timeout_s: float = 30, max_body_bytes: int = 1024 * 1024) -> None:
+        """
+        Parameters
+        --
+        - max_idle_per_host - how many idle connections to keep per host.
+        - idle_timeout_s - how long can a connection stay idle, in seconds.
+        - max_body_bytes - how much of a response body to read. The
+        connection of a longer response is not reused.
+        """
+
+        self._logger = get_module_logger(__name__)
+        self._max_idle_per_host = max_idle_per_host
+        self._idle_timeout_s = idle_timeout_s
+        self._max_body_bytes = max_body_bytes
+
+        self._idle = {}         # type: Dict[_Key, Deque[Tuple[http.client.HTTPConnection, float]]]
+        self._sessions = {}     # type: Dict[_Key, ssl.SSLSession]
+        self._contexts = {}     # type: Dict[bool, ssl.SSLContext]
+        self._lock = threading.Lock()
+
+        # Counters
+        self.opened = 0
+        self.reused = 0
+
+    @classmethod
+    def shared(cls) -> 'ConnectionPool':
+        """
+        Description
+        --
+        Gets the process-wide pool, creating it (from the 'http' config
+        section) on first use.
+
+        Returns
+        --
+        The pool.
+        """
+
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = ConnectionPool(
+                                    Config.load_typed('http', 'max_idle_per_host', 16),
+                                    Config.load_typed('http', 'idle_timeout_s', 30, float),
+                                    Config.load_typed('http', 'max_body_bytes', 1024 * 1024))
+
+        return cls._shared
+
+    @property
+    def idle(self) -> int:
+        """
+        The number of idle connections.
+        """
+
+        with self._lock:
+            return sum(len(connections) for connections in self._idle.values())
+
+    def _context(self, verify_tls: bool) -> ssl.SSLContext:
+        """
+        Gets the (shared) TLS context, verifying the certificates or not.
+        """
+
+        context = self._contexts.get(verify_tls)
+        if context is None:
+            context = ssl.create_default_context()
+            if not verify_tls:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            self._contexts[verify_tls] = context
+
+        return context
+
+    def _checkout(self, key: _Key) -> Optional[http.client.HTTPConnection]:
+        """
+        Takes the most recently used idle connection of a host, discarding
+        the stale ones.
+        """
+
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                connections = self._idle.get(key)
+                if not connections:
+                    return None
+                connection, idle_since = connections.pop()
+
+            if now - idle_since < self._idle_timeout_s and self._is_open(connection.sock):
+                return connection
+
+            connection.close()
+
+    @staticmethod
+    def _is_open(sock: socket.socket) -> bool:
+        """
+        Checks (without blocking) that the server didn't close an idle
+        connection.
+        """
+
+        # An idle connection is readable only if the server closed it ...
+        if not select.select([sock], [], [], 0)[0]:
+            return True
+
+        # ... or sent TLS records only (e.g. session tickets)
+        if not isinstance(sock, ssl.SSLSocket):
+            return False
+
+        try:
+            sock.setblocking(False)
+            sock.recv(1)
+            return False
+        except ssl.SSLWantReadError:
+            return True
+        except OSError:
+            return False
+
+    def _checkin(self, key: _Key, connection: http.client.HTTPConnection) -> None:
+        """
+        Returns a connection to the pool, closing the oldest idle connection
+        of the host, if there are too many.
+        """
+
+        if key.scheme == 'https':
+            self._sessions[key] = connection.sock.session
+
+        with self._lock:
+            connections = self._idle.get(key)
+            if connections is None:
+                connections = self._idle[key] = deque()
+
+            connections.append((connection, time.monotonic()))
+            oldest = connections.popleft()[0] if len(connections) > self._max_idle_per_host else None
+
+        if oldest is not None:
+            oldest.close()
+
+    def _connect(self, key: _Key, address: str, timeout_s: float) -> Tuple[http.client.HTTPConnection, int, int]:
+        """
+        Opens a connection to the resolved address, timing the TCP connect and
+        the TLS handshake (ms).
+        """
+
+        started = time.monotonic()
+        sock = socket.create_connection((address, key.port), timeout_s)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connected = time.monotonic()
+
+        try:
+            if key.scheme == 'https':
+                context = self._context(key.verify_tls)
+                sock = context.wrap_socket(sock, server_hostname=key.host, session=self._sessions.get(key))
+                connection = http.client.HTTPSConnection(key.host, key.port, timeout=timeout_s, context=context)
+            else:
+                connection = http.client.HTTPConnection(key.host, key.port, timeout=timeout_s)
+        except BaseException:
+            sock.close()
+            raise
+
+        connection.sock = sock
+        self.opened += 1
+
+        return (
+            connection,
+            int((connected - started) * 1000),
+            int((time.monotonic() - connected) * 1000))
+
+    def request(
+                self,
+                scheme: str,
+                host: str,
+                port: int,
+                target: str,
+                method: str = 'GET',
+                timeout_s: float = 10,
+                verify_tls: bool = True) -> Exchange:
+        """
+        Description
+        --
+        Sends an HTTP request over a pooled connection and reads the
+        response.
+
+        Parameters
+        --
+        - scheme - 'http' or 'https'.
+        - host - the hostname (or IP address).
+        - port - the port.
+        - target - the path and query.
+        - method - the request method.
+        - timeout_s - the time budget of the request, in seconds.
+        - verify_tls - verify the certificate of the server?
+
+        Returns
+        --
+        The exchange. Raises socket.timeout if the budget runs out, OSError
+        or http.client.HTTPException if the request fails.
+        """
+
+        key = _Key(scheme, host, port, verify_tls)
+        expires_at = time.monotonic() + timeout_s
+
+        connection = self._checkout(key)
+        reused = connection is not None
+        resolve_ms, connect_ms, tls_ms = 0, 0, 0
+
+        while True:
+            address = None
+            if connection is None:
+                resolution = ResolverCache.shared().resolve(host, socket.AF_UNSPEC)
+                if resolution.address is None:
+                    raise OSError("Could not resolve '%s'" % host)
+                address, resolve_ms = resolution.address, resolution.resolve_ms
+
+            # The resolution is reported apart, it's not part of the total
+            started = time.monotonic()
+            if address is not None:
+                connection, connect_ms, tls_ms = self._connect(key, address, max(expires_at - started, 0.001))
+
+            try:
+                connection.sock.settimeout(max(expires_at - time.monotonic(), 0.001))
+                sent = time.monotonic()
+                connection.request(method, target, headers=self._headers)
+                response = connection.getresponse()
+                responded = time.monotonic()
+                body = response.read(self._max_body_bytes)
+            except (ConnectionError, http.client.BadStatusLine) as ex:
+                connection.close()
+
+                # A reused connection can turn out stale, retry on a new one
+                if not reused or method not in ('GET', 'HEAD'):
+                    raise
+
+                self._logger.debug("Stale connection to '%s:%s', reconnecting: %s", host, port, ex)
+                connection, reused = None, False
+                continue
+            except BaseException:
+                connection.close()
+                raise
+
+            break
+
+        # Reuse the connection, unless the server is closing it or the body
+        # was not read to the end
+        if response.will_close or not response.isclosed():
+            connection.close()
+        else:
+            self._checkin(key, connection)
+
+        if reused:
+            self.reused += 1
+
+        return Exchange(
+                    response.status,
+                    body,
+                    reused,
+                    resolve_ms,
+                    connect_ms,
+                    tls_ms,
+                    int((responded - sent) * 1000),
+                    int((time.monotonic() - started) * 1000))
+
+    def clear(self) -> None:
+        """
+        Description
+        --
+        Closes all the idle connections.
+        """
+
+        with self._lock:
+            idle = [connection for connections in self._idle.values() for connection, _ in connections]
+            self._idle.clear()
+            self._sessions.clear()
+
+        for connection in idle:
+            connection.close()
@@ -0,0 +1,363 @@
+# System imports
+import collections
+import concurrent.futures
+import heapq
+import itertools
+import os
+import select
+import socket
+import struct
+import threading
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Local imports
+from ..logging import get_module_logger
+
+_ICMP_ECHO_REQUEST = 8
+_ICMP_ECHO_REPLY = 0
+_PAYLOAD = b'heartbeat-pulse!'
+_RECEIVE_BUFFER = 4 * 1024 * 1024
+
+
+def _checksum(data: bytes) -> int:
+    """
+    Description
+    --
+    Calculates the Internet checksum (RFC 1071) of a packet.
+    """
+
+    if len(data) % 2:
+        data += b'\x00'
+
+    total = sum(struct.unpack('!%dH' % (len(data) // 2), data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+
+    return ~total & 0xffff
+
+
+def _echo_request(ident: int, seq: int) -> bytes:
+    """
+    Description
+    --
+    Builds an ICMP echo request packet.
+    """
+
+    header = struct.pack('!BBHHH', _ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    checksum = _checksum(header + _PAYLOAD)
+
+    return struct.pack('!BBHHH', _ICMP_ECHO_REQUEST, 0, checksum, ident, seq) + _PAYLOAD
+
+
+class IcmpEngine:
+    """
+    Description
+    --
+    Multiplexes ICMP echoes (IPv4) for any number of targets over a single
+    socket, the way fping does.
+    - Requests are sent right away, from the calling thread. When the send
+    buffer is full, they are queued and sent by the receiver thread as soon
+    as the socket is writable again.
+    - A single receiver thread matches the replies to the requests by
+    address, identifier and sequence number, and resolves their futures.
+    - Requests without a reply are resolved at their deadline.
+
+    Uses a raw socket when permitted, otherwise an unprivileged ICMP datagram
+    socket (Linux, see net.ipv4.ping_group_range).
+    """
+
+    _shared = None              # type: IcmpEngine
+    _shared_failed = False
+    _shared_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        try:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            self._raw = True
+        except PermissionError:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            self._raw = False
+
+        # Replies to a burst of requests arrive at once, make room for them
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, _RECEIVE_BUFFER)
+        self._socket.setblocking(False)
+        self._ident = os.getpid() & 0xffff
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+        # The requests waiting for a reply and their deadlines
+        self._waiting = {}      # type: Dict[Tuple[str, int], Tuple[float, float, concurrent.futures.Future]]
+        self._deadlines = []    # type: List[Tuple[float, Tuple[str, int]]]
+
+        # The requests waiting for room in the send buffer
+        self._unsent = collections.deque()  # type: Deque[Tuple[bytes, Tuple[str, int]]]
+
+        # Wakes up the receiver, when an earlier deadline comes in
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._closed = False
+
+        self._receiver = threading.Thread(target=self._receive_loop, name='pulse-icmp', daemon=True)
+        self._receiver.start()
+
+    @classmethod
+    def shared(cls) -> Optional['IcmpEngine']:
+        """
+        Description
+        --
+        Gets the process-wide engine, creating it on first use.
+
+        Returns
+        --
+        The engine, or None if ICMP sockets are not permitted.
+        """
+
+        if cls._shared is None and not cls._shared_failed:
+            with cls._shared_lock:
+                if cls._shared is None and not cls._shared_failed:
+                    try:
+                        cls._shared = IcmpEngine()
+                    except OSError as ex:
+                        cls._shared_failed = True
+                        get_module_logger(__name__).warn("ICMP engine is not available: %s", ex)
+
+        return cls._shared
+
+    @property
+    def waiting(self) -> int:
+        """
+        The number of requests waiting for a reply.
+        """
+
+        return len(self._waiting)
+
+    def submit(self, address: str, timeout_s: float) -> concurrent.futures.Future:
+        """
+        Description
+        --
+        Sends an echo request, without waiting for the reply.
+
+        Parameters
+        --
+        - address - the IPv4 address to ping.
+        - timeout_s - how long to wait for the reply, in seconds.
+
+        Returns
+        --
+        A future of the round-trip time in seconds, or None if there was no
+        reply within the timeout.
+        """
+
+        if not address:
+            raise ValueError("address is required!")
+
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+
+        seq = next(self._seq) & 0xffff
+        key = (address, seq)
+        packet = _echo_request(self._ident, seq)
+        sent_at = time.monotonic()
+        deadline = sent_at + timeout_s
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The ICMP engine is closed!")
+
+            self._waiting[key] = (sent_at, deadline, future)
+            heapq.heappush(self._deadlines, (deadline, key))
+            earliest = self._deadlines[0][1] == key
+
+            # Keep the order of the requests already queued
+            queued = bool(self._unsent)
+            if queued:
+                self._unsent.append((packet, key))
+
+        if not queued:
+            try:
+                self._socket.sendto(packet, (address, 0))
+            except BlockingIOError:
+                # The send buffer is full - the receiver sends it when there's room
+                with self._lock:
+                    self._unsent.append((packet, key))
+                queued = True
+            except OSError:
+                # Unreachable network and alike - same as no reply
+                self._resolve(key, None)
+                return future
+
+        if earliest or queued:
+            self._wakeup_w.send(b'\x00')
+
+        return future
+
+    def ping(self, address: str, timeout_s: float) -> Optional[float]:
+        """
+        Description
+        --
+        Pings an address, waiting for the reply.
+
+        Parameters
+        --
+        - address - the IPv4 address to ping.
+        - timeout_s - how long to wait for the reply, in seconds.
+
+        Returns
+        --
+        The round-trip time in seconds, or None if there was no reply.
+        """
+
+        return self.submit(address, timeout_s).result()
+
+    def close(self) -> None:
+        """
+        Description
+        --
+        Stops the engine, resolving the requests still waiting with None.
+        """
+
+        with self._lock:
+            self._closed = True
+            self._unsent.clear()
+            keys = list(self._waiting)
+
+        for key in keys:
+            self._resolve(key, None)
+
+        self._wakeup_w.send(b'\x00')
+
+    def _resolve(self, key: Tuple[str, int], received_at: Optional[float]) -> None:
+        """
+        Resolves a waiting request with its round-trip time (or None).
+        """
+
+        with self._lock:
+            waiting = self._waiting.pop(key, None)
+
+        if waiting is not None:
+            sent_at, _, future = waiting
+            future.set_result(received_at - sent_at if received_at is not None else None)
+
+    def _send_unsent(self) -> None:
+        """
+        Sends the queued requests, until the send buffer is full again.
+        """
+
+        while True:
+            with self._lock:
+                if not self._unsent:
+                    return
+                packet, key = self._unsent[0]
+
+                if key not in self._waiting:
+                    # Expired while queued
+                    self._unsent.popleft()
+                    continue
+
+            try:
+                self._socket.sendto(packet, (key[0], 0))
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                with self._lock:
+                    self._unsent.popleft()
+                self._resolve(key, None)
+                continue
+
+            sent_at = time.monotonic()
+
+            with self._lock:
+                self._unsent.popleft()
+
+                # The round-trip time starts when the request is actually sent
+                waiting = self._waiting.get(key)
+                if waiting is not None:
+                    self._waiting[key] = (sent_at,) + waiting[1:]
+
+    def _read_replies(self) -> None:
+        """
+        Reads all the pending replies from the socket.
+        """
+
+        while True:
+            try:
+                packet, (address, _) = self._socket.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+
+            received_at = time.monotonic()
+
+            # Raw sockets get the IP header as well
+            offset = (packet[0] & 0x0f) * 4 if self._raw else 0
+            if len(packet) < offset + 8:
+                continue
+
+            icmp_type, _, _, ident, seq = struct.unpack('!BBHHH', packet[offset:offset + 8])
+            if icmp_type != _ICMP_ECHO_REPLY:
+                continue
+
+            # Datagram sockets get their identifier rewritten by the kernel
+            # and only receive their own replies
+            if self._raw and ident != self._ident:
+                continue
+
+            self._resolve((address, seq), received_at)
+
+    def _expire(self) -> Optional[float]:
+        """
+        Resolves the requests past their deadline with None.
+
+        Returns
+        --
+        How long until the next deadline, None if nothing's waiting.
+        """
+
+        now = time.monotonic()
+        expired = []
+
+        with self._lock:
+            while self._deadlines:
+                deadline, key = self._deadlines[0]
+                waiting = self._waiting.get(key)
+                if waiting is None or waiting[1] != deadline:
+                    # Already replied
+                    heapq.heappop(self._deadlines)
+                elif deadline <= now:
+                    heapq.heappop(self._deadlines)
+                    expired.append(key)
+                else:
+                    break
+
+            next_in = self._deadlines[0][0] - now if self._deadlines else None
+
+        for key in expired:
+            self._resolve(key, None)
+
+        return next_in
+
+    def _receive_loop(self) -> None:
+        """
+        The receiver thread.
+        """
+
+        while not self._closed:
+            timeout = self._expire()
+            writers = [self._socket] if self._unsent else []
+            readable, writable, _ = select.select([self._socket, self._wakeup_r], writers, [], timeout)
+
+            if self._wakeup_r in readable:
+                try:
+                    self._wakeup_r.recv(4096)
+                except BlockingIOError:
+                    pass
+
+            if self._socket in writable:
+                self._send_unsent()
+
+            if self._socket in readable:
+                self._read_replies()
+
+        self._socket.close()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
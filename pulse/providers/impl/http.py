@@ -0,0 +1,219 @@
+# Import system
+import http.client
+import socket
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Local application imports
+from .. import BaseProvider, Deadline, ParameterMetadata, ProviderResult, ResultStatus, Threshold
+from ..http import ConnectionPool, Exchange
+
+
+def _parse_statuses(statuses: str) -> List[Tuple[int, int]]:
+    """
+    Description
+    --
+    Parses the expected statuses, e.g. '200', '200,301-302' or '2xx,3xx'.
+
+    Returns
+    --
+    The ranges (inclusive) of the expected statuses.
+    """
+
+    ranges = []
+    for part in str(statuses).split(','):
+        part = part.strip().lower()
+        if part.endswith('xx') and len(part) == 3:
+            low = int(part[0]) * 100
+            ranges.append((low, low + 99))
+        elif '-' in part:
+            low, high = part.split('-', 1)
+            ranges.append((int(low), int(high)))
+        else:
+            ranges.append((int(part), int(part)))
+
+    return ranges
+
+
+class _Plan(NamedTuple):
+    """
+    Description
+    --
+    The run plan of an HTTP(S) profile.
+    """
+
+    scheme: str
+    host: str
+    port: int
+    target: str
+    method: str
+    verify_tls: bool
+    statuses: Tuple[Tuple[int, int], ...]
+    body_contains: Optional[bytes]
+    threshold: Optional[Threshold]
+
+
+class HttpProvider(BaseProvider):
+    """
+    Description
+    --
+    An HTTP(S) provider. Requests a URL and checks the status, the body and
+    the latency of the response.
+
+    The connections are kept alive and shared by the runs of every profile,
+    through the process-wide pool, so most runs don't connect (or handshake)
+    at all. The resolve, connect, TLS and time-to-first-byte timings are
+    reported separately, the value is the latency of the request without
+    the resolution.
+    """
+
+    _default_timeout_s = 10
+    _p_url = "Url"
+    _p_threshold_ms = "ThresholdMs"
+    _p_expected_status = "ExpectedStatus"
+    _p_body_contains = "BodyContains"
+    _p_method = "Method"
+    _p_verify_tls = "VerifyTls"
+
+    _methods = ('GET', 'HEAD')
+    _default_statuses = '200-399'
+
+    def _validate(self, parameters: Dict[str, str]) -> None:
+        # URL validation
+        param = self._p_url
+        try:
+            url = urlsplit(parameters[param])
+            valid = url.scheme in ('http', 'https') and bool(url.hostname) and url.port != 0
+        except ValueError:
+            valid = False
+
+        if not valid:
+            raise ValueError("Param '%s' is not an HTTP(S) URL" % param)
+
+        # Threshold validation
+        param = self._p_threshold_ms
+        if parameters.get(param):
+            try:
+                valid = int(parameters[param]) >= 0
+            except ValueError:
+                valid = False
+
+            if not valid:
+                raise ValueError("Param '%s' is not a positive integer" % param)
+
+        # Status validation
+        param = self._p_expected_status
+        if parameters.get(param):
+            try:
+                _parse_statuses(parameters[param])
+            except ValueError:
+                raise ValueError("Param '%s' is not a list of statuses (e.g. '200,301-302' or '2xx')" % param)
+
+        # Method validation
+        param = self._p_method
+        if parameters.get(param, 'GET').upper() not in self._methods:
+            raise ValueError("Param '%s' must be one of %s" % (param, ', '.join(self._methods)))
+
+    def _discover_parameters(self) -> Dict[str, ParameterMetadata]:
+        return {
+            # URL
+            self._p_url: ParameterMetadata(description="HTTP(S) URL", required=True),
+
+            # Threshold
+            self._p_threshold_ms: ParameterMetadata(description="Latency threshold (ms)"),
+
+            # Expectations
+            self._p_expected_status: ParameterMetadata(
+                description="Expected statuses, e.g. '200,301-302' or '2xx' (default: 200-399)"),
+            self._p_body_contains: ParameterMetadata(description="Text the body must contain"),
+
+            # Request
+            self._p_method: ParameterMetadata(description="GET or HEAD (default: GET)"),
+            self._p_verify_tls: ParameterMetadata(description="Verify the certificate, true or false (default: true)")
+        }
+
+    def prepare(self, parameters: Dict[str, str]) -> _Plan:
+        url = urlsplit(parameters[self._p_url])
+        target = url.path or '/'
+        if url.query:
+            target += '?' + url.query
+
+        text = parameters.get(self._p_body_contains)
+        threshold = parameters.get(self._p_threshold_ms)
+
+        return _Plan(
+                url.scheme,
+                url.hostname,
+                url.port or (443 if url.scheme == 'https' else 80),
+                target,
+                (parameters.get(self._p_method) or 'GET').upper(),
+                str(parameters.get(self._p_verify_tls, 'true')).lower() != 'false',
+                tuple(_parse_statuses(parameters.get(self._p_expected_status) or self._default_statuses)),
+                text.encode() if text else None,
+                Threshold.of(int(threshold)) if threshold else None)
+
+    def probe_plan(self, plan: _Plan) -> _Plan:
+        # The same request and expectations, whatever the threshold
+        return plan._replace(threshold=None)
+
+    def _to_result(self, plan: _Plan, exchange: Exchange) -> ProviderResult:
+        """
+        Description
+        --
+        Converts an exchange into a run result.
+
+        Parameters
+        --
+        - plan - the run plan.
+        - exchange - the request and the response.
+
+        Returns
+        --
+        The run result.
+        """
+
+        timings = {'connect': exchange.connect_ms, 'tls': exchange.tls_ms, 'ttfb': exchange.ttfb_ms}
+        result = ProviderResult(ResultStatus.GREEN, exchange.total_ms, exchange.resolve_ms, timings)
+
+        if not any(low <= exchange.status <= high for low, high in plan.statuses):
+            # Unexpected status
+            result.status = ResultStatus.RED
+            return result
+
+        if plan.body_contains is not None and plan.body_contains not in exchange.body:
+            # Unexpected body
+            result.status = ResultStatus.RED
+            return result
+
+        if plan.threshold is not None:
+            result.status = plan.threshold.status(result.value)
+
+        return result
+
+    def run(self, parameters: _Plan, deadline: Deadline = None) -> ProviderResult:
+        deadline = deadline or Deadline()
+        if deadline.expired:
+            return ProviderResult(ResultStatus.TIMEOUT)
+
+        plan = self._plan_of(parameters)
+
+        try:
+            exchange = ConnectionPool.shared().request(
+                plan.scheme,
+                plan.host,
+                plan.port,
+                plan.target,
+                plan.method,
+                deadline.remaining(self._default_timeout_s),
+                plan.verify_tls)
+        except socket.timeout:
+            # No response within the budget
+            return ProviderResult(ResultStatus.TIMEOUT)
+        except (OSError, http.client.HTTPException):
+            # Unreachable - bad
+            return ProviderResult(ResultStatus.RED)
+
+        return self._to_result(plan, exchange)
+
+    def teardown(self) -> None:
+        ConnectionPool.shared().clear()
@@ -1,11 +1,25 @@
 # Import system
-from typing import Dict
+import concurrent.futures
+from typing import Dict, NamedTuple, Optional
 
 # Third party imports
 from ping3 import ping
 
 # Local application imports
-from .. import BaseProvider, ParameterMetadata, ProviderResult, ResultStatus
+from .. import BaseProvider, Deadline, ParameterMetadata, ProviderResult, ResultStatus, Threshold
+from ..dns import Resolution, ResolverCache
+from ..icmp import IcmpEngine
+
+
+class _Plan(NamedTuple):
+    """
+    Description
+    --
+    The run plan of a ping profile.
+    """
+
+    target: str
+    threshold: Optional[Threshold]
 
 
 class PingProvider(BaseProvider):
@@ -17,6 +31,7 @@ class PingProvider(BaseProvider):
 
     _unit = "ms"
     _count = 5
+    _timeout_s = 4
     _p_target = "Target"
     _p_threshold_ms = "ThresholdMs"
 
@@ -50,22 +65,88 @@ class PingProvider(BaseProvider):
             self._p_threshold_ms: ParameterMetadata(description="Threshold (ms)", required=True)
         }
 
-    def run(self, parameters: Dict[str, str]) -> ProviderResult:
-        target = parameters[self._p_target]
-        ping_val = ping(target, unit=self._unit)
+    def prepare(self, parameters: Dict[str, str]) -> _Plan:
+        return _Plan(parameters[self._p_target], Threshold.of(int(parameters[self._p_threshold_ms])))
+
+    def probe_plan(self, plan: _Plan) -> _Plan:
+        # The same target, whatever the threshold
+        return plan._replace(threshold=None)
+
+    def _to_result(
+                self,
+                plan: _Plan,
+                deadline: Deadline,
+                resolution: Resolution,
+                ping_val: Optional[float]) -> ProviderResult:
+        """
+        Description
+        --
+        Converts the round-trip time of a ping into a run result.
+
+        Parameters
+        --
+        - plan - the run plan.
+        - deadline - the time budget of the run.
+        - resolution - the resolution of the target.
+        - ping_val - the round-trip time (ms), None or False if there was no
+        reply.
 
-        if ping_val is None or not ping_val:
+        Returns
+        --
+        The run result.
+        """
+
+        if ping_val is None and deadline.expired:
+            # No reply within the budget
+            return ProviderResult(ResultStatus.TIMEOUT, resolve_ms=resolution.resolve_ms)
+        elif ping_val is None or not ping_val:
             # Resolution issue - bad
-            return ProviderResult(ResultStatus.RED)
+            return ProviderResult(ResultStatus.RED, resolve_ms=resolution.resolve_ms)
         else:
-            limit = int(parameters[self._p_threshold_ms])
-            result = ProviderResult(ResultStatus.GREEN, int(ping_val))
+            value = int(ping_val)
+            status = plan.threshold.status(value) if plan.threshold is not None else ResultStatus.GREEN
+            return ProviderResult(status, value, resolution.resolve_ms)
+
+    def submit(self, parameters: _Plan, deadline: Deadline) -> Optional[concurrent.futures.Future]:
+        # Multiplexed over the shared ICMP socket, if available - for
+        # addresses and cached hostnames only, the rest are resolved by run()
+        engine = IcmpEngine.shared()
+        if engine is None or deadline.expired:
+            return None
+
+        plan = self._plan_of(parameters)
+        resolution = ResolverCache.shared().lookup(plan.target)
+        if resolution is None or resolution.address is None:
+            return None
+
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+
+        def done(reply: concurrent.futures.Future) -> None:
+            try:
+                rtt_s = reply.result()
+                future.set_result(self._to_result(plan, deadline, resolution, rtt_s * 1000 if rtt_s is not None else None))
+            except Exception as err:
+                future.set_exception(err)
+
+        engine.submit(resolution.address, deadline.remaining(self._timeout_s)).add_done_callback(done)
+        return future
+
+    def run(self, parameters: _Plan, deadline: Deadline = None) -> ProviderResult:
+        deadline = deadline or Deadline()
+        if deadline.expired:
+            return ProviderResult(ResultStatus.TIMEOUT)
+
+        # Resolve the target through the shared cache, so the resolution
+        # isn't part of the measured value
+        plan = self._plan_of(parameters)
+        resolution = ResolverCache.shared().resolve(plan.target)
+        if resolution.address is None:
+            return self._to_result(plan, deadline, resolution, None)
 
-            if (result.value > limit):
-                # Over the limit
-                result.status = ResultStatus.RED
-            elif (result.value > limit - (limit / 10)):
-                # Close to the limit (over 90%)
-                result.status = ResultStatus.YELLOW
+        # Don't wait for the reply past the deadline
+        ping_val = None
+        if not deadline.expired:
+            ping_val = ping(resolution.address, unit=self._unit, timeout=deadline.remaining(self._timeout_s))
 
-            return result
+        return self._to_result(plan, deadline, resolution, ping_val)
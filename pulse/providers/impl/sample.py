@@ -2,7 +2,7 @@
 from typing import Dict
 
 # Local application imports
-from .. import BaseProvider, ParameterMetadata, ProviderResult, ResultStatus
+from .. import BaseProvider, Deadline, ParameterMetadata, ProviderResult, ResultStatus
 
 
 class SampleProvider(BaseProvider):
@@ -26,11 +26,11 @@ class SampleProvider(BaseProvider):
             self._p_sample_param: ParameterMetadata(description="Sample param description", required=True)
         }
 
-    def run(self, parameters: Dict[str, str]) -> ProviderResult:
+    def run(self, parameters: Dict[str, str], deadline: Deadline = None) -> ProviderResult:
         # get the expected parameter
         param_value = parameters[self._p_sample_param]
 
-        # TODO: Perform logic
+        # TODO: Perform logic, not waiting longer than deadline.remaining()
         result = ProviderResult(ResultStatus.GREEN, 0)
 
         raise NotImplementedError()
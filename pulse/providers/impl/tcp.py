@@ -0,0 +1,173 @@
+# Import system
+import concurrent.futures
+import socket
+from typing import Dict, NamedTuple, Optional
+
+# Local application imports
+from .. import BaseProvider, Deadline, ParameterMetadata, ProviderResult, ResultStatus, Threshold
+from ..dns import Resolution, ResolverCache
+from ..tcp import ConnectEngine
+
+
+class _Plan(NamedTuple):
+    """
+    Description
+    --
+    The run plan of a TCP port check profile.
+    """
+
+    target: str
+    port: int
+    threshold: Optional[Threshold]
+
+
+class TcpProvider(BaseProvider):
+    """
+    Description
+    --
+    A TCP port check provider. Connects to a port of a hostname/IP address
+    (IPv4 or IPv6), e.g. to check that a database accepts connections.
+
+    The connects of every profile are multiplexed over the shared selector
+    of the process-wide engine, instead of a blocking socket per worker.
+    """
+
+    _timeout_s = 4
+    _p_target = "Target"
+    _p_port = "Port"
+    _p_threshold_ms = "ThresholdMs"
+
+    def _validate(self, parameters: Dict[str, str]) -> None:
+        # IP/hostname format validation
+        param = self._p_target
+        if " " in parameters[param]:
+            raise ValueError("Param '%s' contains spaces" % param)
+
+        # Port validation
+        param = self._p_port
+        try:
+            valid = 0 < int(parameters[param]) < 65536
+        except ValueError:
+            valid = False
+
+        if not valid:
+            raise ValueError("Param '%s' is not a port (1-65535)" % param)
+
+        # Threshold validation
+        param = self._p_threshold_ms
+        if parameters.get(param):
+            try:
+                valid = int(parameters[param]) >= 0
+            except ValueError:
+                valid = False
+
+            if not valid:
+                raise ValueError("Param '%s' is not a positive integer" % param)
+
+    def _discover_parameters(self) -> Dict[str, ParameterMetadata]:
+        return {
+            # IP / Hostname and port
+            self._p_target: ParameterMetadata(description="IP or hostname", required=True),
+            self._p_port: ParameterMetadata(description="TCP port", required=True),
+
+            # Threshold
+            self._p_threshold_ms: ParameterMetadata(description="Connect time threshold (ms)")
+        }
+
+    def prepare(self, parameters: Dict[str, str]) -> _Plan:
+        threshold = parameters.get(self._p_threshold_ms)
+
+        return _Plan(
+                parameters[self._p_target],
+                int(parameters[self._p_port]),
+                Threshold.of(int(threshold)) if threshold else None)
+
+    def probe_plan(self, plan: _Plan) -> _Plan:
+        # The same port, whatever the threshold
+        return plan._replace(threshold=None)
+
+    def _to_result(
+                self,
+                plan: _Plan,
+                resolution: Resolution,
+                connect: concurrent.futures.Future) -> ProviderResult:
+        """
+        Description
+        --
+        Converts the outcome of a connect into a run result.
+
+        Parameters
+        --
+        - plan - the run plan.
+        - resolution - the resolution of the target.
+        - connect - the (resolved) future of the connect.
+
+        Returns
+        --
+        The run result.
+        """
+
+        try:
+            connect_s = connect.result()
+        except OSError:
+            # Refused or unreachable - bad
+            return ProviderResult(ResultStatus.RED, resolve_ms=resolution.resolve_ms)
+
+        if connect_s is None:
+            # Not connected within the budget
+            return ProviderResult(ResultStatus.TIMEOUT, resolve_ms=resolution.resolve_ms)
+
+        value = int(connect_s * 1000)
+        status = plan.threshold.status(value) if plan.threshold is not None else ResultStatus.GREEN
+
+        return ProviderResult(status, value, resolution.resolve_ms)
+
+    def submit(self, parameters: _Plan, deadline: Deadline) -> Optional[concurrent.futures.Future]:
+        # For addresses and cached hostnames only, the rest are resolved by
+        # run()
+        if deadline.expired:
+            return None
+
+        plan = self._plan_of(parameters)
+        resolution = ResolverCache.shared().lookup(plan.target, socket.AF_UNSPEC)
+        if resolution is None or resolution.address is None:
+            return None
+
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+
+        def done(connect: concurrent.futures.Future) -> None:
+            try:
+                future.set_result(self._to_result(plan, resolution, connect))
+            except Exception as err:
+                future.set_exception(err)
+
+        ConnectEngine.shared().submit(
+                    resolution.address,
+                    plan.port,
+                    deadline.remaining(self._timeout_s)).add_done_callback(done)
+        return future
+
+    def run(self, parameters: _Plan, deadline: Deadline = None) -> ProviderResult:
+        deadline = deadline or Deadline()
+        if deadline.expired:
+            return ProviderResult(ResultStatus.TIMEOUT)
+
+        # Resolve the target through the shared cache, so the resolution
+        # isn't part of the measured value
+        plan = self._plan_of(parameters)
+        resolution = ResolverCache.shared().resolve(plan.target, socket.AF_UNSPEC)
+        if resolution.address is None:
+            # Resolution issue - bad
+            return ProviderResult(ResultStatus.RED, resolve_ms=resolution.resolve_ms)
+
+        if deadline.expired:
+            return ProviderResult(ResultStatus.TIMEOUT, resolve_ms=resolution.resolve_ms)
+
+        connect = ConnectEngine.shared().submit(
+                    resolution.address,
+                    plan.port,
+                    deadline.remaining(self._timeout_s))
+        concurrent.futures.wait([connect])
+
+        return self._to_result(plan, resolution, connect)
@@ -0,0 +1,270 @@
+# System imports
+import concurrent.futures
+import errno
+import heapq
+import itertools
+import selectors
+import socket
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Abort (RST) instead of the graceful close, so the checks don't leave
+# sockets in TIME_WAIT behind
+_LINGER_ABORT = struct.pack('ii', 1, 0)
+
+
+class ConnectEngine:
+    """
+    Description
+    --
+    Multiplexes TCP connects for any number of targets over a single
+    selector (epoll/kqueue, where available).
+    - Non-blocking connects are started right away, from the calling thread.
+    - A single loop thread waits for the sockets to become writable (the
+    connect completed, or failed) and resolves their futures.
+    - Connects still in progress are aborted at their deadline.
+
+    A check closes the socket as soon as it's connected, nothing is sent.
+    """
+
+    _shared = None      # type: ConnectEngine
+    _shared_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._keys = itertools.count()
+        self._lock = threading.Lock()
+
+        # The connects in progress, those to register with the selector and
+        # their deadlines
+        self._waiting = {}      # type: Dict[int, Tuple[socket.socket, float, float, concurrent.futures.Future]]
+        self._pending = []      # type: List[int]
+        self._deadlines = []    # type: List[Tuple[float, int]]
+
+        # Wakes up the loop, when a connect comes in
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+        self._closed = False
+
+        self._loop = threading.Thread(target=self._select_loop, name='pulse-tcp', daemon=True)
+        self._loop.start()
+
+    @classmethod
+    def shared(cls) -> 'ConnectEngine':
+        """
+        Description
+        --
+        Gets the process-wide engine, creating it on first use.
+
+        Returns
+        --
+        The engine.
+        """
+
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = ConnectEngine()
+
+        return cls._shared
+
+    @property
+    def waiting(self) -> int:
+        """
+        The number of connects in progress.
+        """
+
+        return len(self._waiting)
+
+    def submit(self, address: str, port: int, timeout_s: float) -> concurrent.futures.Future:
+        """
+        Description
+        --
+        Starts connecting to a port, without waiting for the outcome.
+
+        Parameters
+        --
+        - address - the IPv4 or IPv6 address to connect to.
+        - port - the port to connect to.
+        - timeout_s - how long to wait for the connect, in seconds.
+
+        Returns
+        --
+        A future of the connect time in seconds, or None if the connect did
+        not complete within the timeout. Fails with OSError if the connect
+        was refused (or the target is unreachable).
+        """
+
+        if not address:
+            raise ValueError("address is required!")
+
+        future = concurrent.futures.Future()
+        future.set_running_or_notify_cancel()
+
+        sock = socket.socket(socket.AF_INET6 if ':' in address else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, _LINGER_ABORT)
+
+        started_at = time.monotonic()
+        err = sock.connect_ex((address, port))
+        if err not in (0, errno.EINPROGRESS, errno.EAGAIN, errno.EWOULDBLOCK):
+            # Failed right away (e.g. unreachable network)
+            sock.close()
+            future.set_exception(OSError(err, "Could not connect to %s:%s" % (address, port)))
+            return future
+
+        key = next(self._keys)
+        deadline = started_at + timeout_s
+
+        with self._lock:
+            if self._closed:
+                sock.close()
+                raise RuntimeError("The TCP connect engine is closed!")
+
+            self._waiting[key] = (sock, started_at, deadline, future)
+            self._pending.append(key)
+            heapq.heappush(self._deadlines, (deadline, key))
+
+        # Even if already connected (loopback), it's the loop which resolves
+        self._wakeup_w.send(b'\x00')
+
+        return future
+
+    def connect(self, address: str, port: int, timeout_s: float) -> Optional[float]:
+        """
+        Description
+        --
+        Connects to a port, waiting for the outcome.
+
+        Parameters
+        --
+        - address - the IPv4 or IPv6 address to connect to.
+        - port - the port to connect to.
+        - timeout_s - how long to wait for the connect, in seconds.
+
+        Returns
+        --
+        The connect time in seconds, or None if the connect did not complete
+        within the timeout. Raises OSError if the connect was refused.
+        """
+
+        return self.submit(address, port, timeout_s).result()
+
+    def close(self) -> None:
+        """
+        Description
+        --
+        Stops the engine. The connects still in progress are resolved with
+        None.
+        """
+
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        self._wakeup_w.send(b'\x00')
+
+    def _resolve(self, key: int, connected_at: Optional[float], err: int = 0) -> None:
+        """
+        Resolves a connect with its duration (or None, or the error). Only
+        the loop thread uses the selector.
+        """
+
+        with self._lock:
+            waiting = self._waiting.pop(key, None)
+
+        if waiting is None:
+            return
+
+        sock, started_at, _, future = waiting
+        try:
+            self._selector.unregister(sock)
+        except (KeyError, ValueError):
+            # Was never registered
+            pass
+        sock.close()
+
+        if err:
+            future.set_exception(OSError(err, "Could not connect: %s" % errno.errorcode.get(err, err)))
+        else:
+            future.set_result(connected_at - started_at if connected_at is not None else None)
+
+    def _register_pending(self) -> None:
+        """
+        Registers the connects submitted since the last round with the
+        selector.
+        """
+
+        with self._lock:
+            pending, self._pending = self._pending, []
+            sockets = [(key, self._waiting[key][0]) for key in pending if key in self._waiting]
+
+        for key, sock in sockets:
+            self._selector.register(sock, selectors.EVENT_WRITE, key)
+
+    def _expire(self) -> Optional[float]:
+        """
+        Resolves the connects past their deadline with None.
+
+        Returns
+        --
+        How long until the next deadline, None if nothing's waiting.
+        """
+
+        now = time.monotonic()
+        expired = []
+
+        with self._lock:
+            while self._deadlines:
+                deadline, key = self._deadlines[0]
+                if key not in self._waiting:
+                    # Already resolved
+                    heapq.heappop(self._deadlines)
+                elif deadline <= now:
+                    heapq.heappop(self._deadlines)
+                    expired.append(key)
+                else:
+                    break
+
+            next_in = self._deadlines[0][0] - now if self._deadlines else None
+
+        for key in expired:
+            self._resolve(key, None)
+
+        return next_in
+
+    def _select_loop(self) -> None:
+        """
+        The loop thread.
+        """
+
+        while not self._closed:
+            self._register_pending()
+            timeout = self._expire()
+            events = self._selector.select(timeout)
+            connected_at = time.monotonic()
+
+            for selector_key, _ in events:
+                if selector_key.fileobj is self._wakeup_r:
+                    try:
+                        self._wakeup_r.recv(4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+
+                err = selector_key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                self._resolve(selector_key.data, connected_at, err)
+
+        with self._lock:
+            keys = list(self._waiting)
+
+        for key in keys:
+            self._resolve(key, None)
+
+        self._selector.close()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
@@ -0,0 +1,82 @@
+import unittest
+
+# Local imports
+from pulse.bench import SyntheticProvider, _measure_models, _run_size, run
+from pulse.providers import Deadline, ResultStatus
+
+
+class TestSyntheticProvider(unittest.TestCase):
+    def test_run(self):
+        # Arrange
+        provider = SyntheticProvider()
+        parameters = {"LatencyMs": "1", "Distribution": "fixed", "ErrorRate": "1"}
+
+        # Act
+        result = provider.run(parameters, Deadline(1))
+
+        # Assert
+        self.assertEqual(result.status, ResultStatus.RED)
+
+    def test_submit_times_out(self):
+        # Arrange
+        provider = SyntheticProvider()
+        parameters = {"LatencyMs": "200", "Distribution": "fixed"}
+        expected_timeouts = SyntheticProvider.expected_timeouts()
+
+        # Act
+        future = provider.submit(parameters, Deadline(0.05))
+
+        # Assert
+        self.assertEqual(future.result(timeout=1).status, ResultStatus.TIMEOUT)
+        self.assertEqual(SyntheticProvider.expected_timeouts(), expected_timeouts + 1)
+
+    def test_validate(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            SyntheticProvider().validate({"LatencyMs": "1", "Distribution": "unknown"})
+
+
+class TestBench(unittest.TestCase):
+    _options = {
+        'engine': 'thread',
+        'duration_s': 1,
+        'interval_s': 0.5,
+        'timeout_s': 1,
+        'latency_ms': 5,
+        'distribution': 'exp',
+        'error_rate': 0.1,
+        'hang_rate': 0,
+        'hang_s': 30,
+        'blocking': False
+    }
+
+    def test_run_size(self):
+        # Act
+        report = _run_size(50, self._options)
+
+        # Assert
+        self.assertEqual(report['profiles'], 50)
+        self.assertEqual(report['target_probes_per_s'], 100)
+        self.assertGreater(report['probes_per_s'], 0)
+        self.assertEqual(report['runner_timeouts'], 0)
+        self.assertGreater(report['schedule_lag_ms']['count'], 0)
+        self.assertGreater(report['peak_threads'], 1)
+
+    def test_measure_models(self):
+        # Act
+        report = _measure_models(1000)
+
+        # Assert
+        self.assertEqual(report['profiles'], 1000)
+        self.assertGreater(report['bytes_per_profile'], 0)
+        self.assertGreater(report['bytes_per_result'], 0)
+        self.assertGreater(report['us_per_run'], 0)
+
+    def test_unknown_distribution(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            run([10], dict(self._options, distribution='unknown'))
+
+
+if __name__ == '__main__':
+    unittest.main()
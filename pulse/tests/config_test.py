@@ -0,0 +1,20 @@
+import unittest
+
+# Local imports
+from pulse.config import Config
+
+
+class TestConfig(unittest.TestCase):
+    def test_load_typed(self):
+        # Act & Assert
+        self.assertEqual(Config.load_typed('dns', 'ttl_s', 1, float), float(Config.load('dns', 'ttl_s')))
+        self.assertEqual(Config.load_typed('dns', 'missing_key', 7), 7)
+
+    def test_load_typed_invalid(self):
+        # Act & Assert - falls back, with a warning
+        with self.assertLogs('pulse.config', 'WARNING'):
+            self.assertEqual(Config.load_typed('logging', 'format', 7), 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import os
+import time
+import unittest
+
+
+def pin_timezone(test_case: unittest.TestCase, tz: str) -> None:
+    """
+    Description
+    --
+    Sets the local timezone of the process for the duration of a test.
+
+    Parameters
+    --
+    - test_case - the test.
+    - tz - the timezone (e.g. 'Europe/Berlin').
+    """
+
+    previous = os.environ.get('TZ')
+
+    def restore():
+        if previous is None:
+            os.environ.pop('TZ', None)
+        else:
+            os.environ['TZ'] = previous
+        time.tzset()
+
+    os.environ['TZ'] = tz
+    time.tzset()
+    test_case.addCleanup(restore)
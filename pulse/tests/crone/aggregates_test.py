@@ -0,0 +1,116 @@
+import time
+import unittest
+from datetime import datetime
+
+# Local imports
+from pulse.cron.aggregates import Aggregate, AggregatesStore
+from pulse.cron.output import ProfileResult
+from pulse.profiles import Profile
+from pulse.providers import ProviderResult, ResultStatus
+from pulse.tests.crone import pin_timezone
+
+
+class TestAggregatesStore(unittest.TestCase):
+    _now = 1000020.0
+
+    def _result(self, profile: Profile, seconds_ago: float, status: ResultStatus, value: int = None) -> ProfileResult:
+        result = ProfileResult(profile, datetime.fromtimestamp(self._now - seconds_ago))
+        result.result = ProviderResult(status, value)
+        return result
+
+    def test_windows(self):
+        # Arrange
+        store = AggregatesStore()
+        profile = Profile("profile", "SampleProvider", 1)
+
+        # Act
+        store.handle_results([
+            self._result(profile, 5, ResultStatus.GREEN, 10),
+            self._result(profile, 30, ResultStatus.RED, 20),
+            self._result(profile, 120, ResultStatus.TIMEOUT),
+            self._result(profile, 1200, ResultStatus.GREEN, 40),
+            self._result(profile, 7200, ResultStatus.GREEN, 50)])
+
+        # Assert
+        summary = store.summary(profile.id, self._now)
+        self.assertEqual(summary['1m']['count'], 2)
+        self.assertEqual(summary['1m']['p99'], 20)
+        self.assertEqual(summary['1m']['RED'], 0.5)
+        self.assertEqual(summary['5m']['count'], 3)
+        self.assertAlmostEqual(summary['5m']['TIMEOUT'], 1 / 3)
+        self.assertEqual(summary['1h']['count'], 4)
+        self.assertEqual(summary['1h']['p99'], 40)
+
+    def test_failures_have_no_latency(self):
+        # Arrange
+        store = AggregatesStore()
+        profile = Profile("profile", "SampleProvider", 1)
+
+        greens = [self._result(profile, 5, ResultStatus.GREEN, 100) for _ in range(10)]
+        timeouts = [self._result(profile, 5, ResultStatus.TIMEOUT) for _ in range(10)]
+
+        # Act
+        store.handle_results(greens + timeouts)
+
+        # Assert - the timeouts count, but measured no latency
+        summary = store.summary(profile.id, self._now)
+        self.assertEqual(summary['1m']['count'], 20)
+        self.assertEqual(summary['1m']['TIMEOUT'], 0.5)
+        self.assertEqual(summary['1m']['p50'], 100)
+
+    def test_slots_expire(self):
+        # Arrange
+        store = AggregatesStore()
+        profile = Profile("profile", "SampleProvider", 1)
+        store.handle_result(self._result(profile, 0, ResultStatus.GREEN, 10))
+
+        # Act - an hour later, the slot is reused
+        store.handle_result(self._result(profile, -3600, ResultStatus.RED, 20))
+
+        # Assert
+        aggregate = store.window(profile.id, 60, self._now + 3600)
+        self.assertEqual(aggregate.count, 1)
+        self.assertEqual(aggregate.ratios()[ResultStatus.RED], 1)
+
+    def test_local_timezone(self):
+        # Arrange - a host which is not on UTC
+        pin_timezone(self, 'Europe/Berlin')
+        store = AggregatesStore()
+        profile = Profile("profile", "SampleProvider", 1)
+        result = ProfileResult(profile)
+        result.result = ProviderResult(ResultStatus.GREEN, 10)
+
+        # Act
+        store.handle_result(result)
+
+        # Assert
+        self.assertEqual(store.window(profile.id, 60, time.time()).count, 1)
+
+    def test_fleet(self):
+        # Arrange
+        store = AggregatesStore()
+        profiles = [Profile("profile %s" % i, "SampleProvider", 1) for i in range(3)]
+        for i, profile in enumerate(profiles):
+            store.handle_result(self._result(profile, 1, ResultStatus.GREEN, i * 10))
+
+        # Act
+        fleet = store.fleet(60, now=self._now)
+
+        # Assert
+        self.assertEqual(fleet.count, 3)
+        self.assertEqual(fleet.percentile(100), 20)
+        self.assertEqual(Aggregate.from_dict(fleet.to_dict()).summary(), fleet.summary())
+
+    def test_window_too_long(self):
+        # Arrange
+        store = AggregatesStore()
+        profile = Profile("profile", "SampleProvider", 1)
+        store.handle_result(self._result(profile, 0, ResultStatus.GREEN, 10))
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            store.window(profile.id, 7200, self._now)
+
+
+if __name__ == '__main__':
+    unittest.main()
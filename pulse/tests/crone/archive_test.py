@@ -0,0 +1,150 @@
+import math
+import os
+import random
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+# Local imports
+from pulse.cron.archive import ArchiveReader, ResultArchive
+from pulse.cron.history import statuses
+from pulse.cron.output import ProfileResult
+from pulse.profiles import Profile
+from pulse.providers import ProviderResult, ResultStatus
+from pulse.tests.crone import pin_timezone
+
+
+class TestResultArchive(unittest.TestCase):
+    _start = 1700000000
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.directory = temp_dir.name
+
+    def _result(self, profile: Profile, timestamp: float, status: ResultStatus, value: float = None) -> ProfileResult:
+        result = ProfileResult(profile, datetime.fromtimestamp(timestamp))
+        result.result = ProviderResult(status, value)
+        return result
+
+    def _archive(self, profile: Profile, count: int, chunk_s: int = 600, block_size: int = 100):
+        rows = []
+        archive = ResultArchive(self.directory, chunk_s, block_size)
+        for i in range(count):
+            timestamp = self._start + i + random.randint(0, 20) / 1000
+            status = random.choice((ResultStatus.GREEN, ResultStatus.GREEN, ResultStatus.RED, ResultStatus.TIMEOUT))
+            value = random.randint(1, 500) if status == ResultStatus.GREEN else None
+            result = self._result(profile, timestamp, status, value)
+            archive.handle_result(result)
+            rows.append((round(timestamp, 3), status, result.result.value))
+
+        archive.close()
+        return rows
+
+    def _rows(self, samples):
+        return [(round(timestamp, 3), status, value) for timestamp, status, value in samples.rows()]
+
+    def test_round_trip(self):
+        # Arrange
+        profile = Profile("profile", "SampleProvider", 1)
+        rows = self._archive(profile, 2000)
+
+        # Act
+        samples = ArchiveReader(self.directory).query(profile.id)
+
+        # Assert - across blocks and chunks
+        self.assertEqual(self._rows(samples), rows)
+        self.assertGreater(len([name for name in os.listdir(self.directory) if name.endswith('.seg')]), 1)
+
+    def test_query_range(self):
+        # Arrange
+        profile, other = Profile("profile", "SampleProvider", 1), Profile("other", "SampleProvider", 1)
+        rows = self._archive(profile, 1500)
+        self._archive(other, 10)
+
+        # Act
+        samples = ArchiveReader(self.directory).query(profile.id, self._start + 550, self._start + 1250)
+
+        # Assert
+        self.assertEqual(self._rows(samples), rows[550:1250])
+        self.assertEqual(ArchiveReader(self.directory).profile_ids(), sorted([profile.id, other.id]))
+
+    def test_compression(self):
+        # Arrange - a steady interval and a mostly stable latency
+        profile = Profile("profile", "SampleProvider", 1)
+        archive = ResultArchive(self.directory, 3600, 3600)
+        for i in range(3600):
+            archive.handle_result(self._result(profile, self._start + i, ResultStatus.GREEN, 20 + i % 3))
+
+        # Act
+        archive.close()
+
+        # Assert - a few bytes per result
+        size = os.path.getsize(os.path.join(self.directory, '%s.seg' % (self._start // 3600 * 3600)))
+        self.assertLess(size / 3600, 4)
+
+    def test_appends_after_partial_index_entry(self):
+        # Arrange
+        profile = Profile("profile", "SampleProvider", 1)
+        archive = ResultArchive(self.directory, 3600, 10)
+        archive.handle_result(self._result(profile, self._start, ResultStatus.GREEN, 1))
+        archive.close()
+
+        index_path = os.path.join(self.directory, '%s.idx' % (self._start // 3600 * 3600))
+        with open(index_path, 'ab') as file:
+            file.write(b'\x05\x00abc')
+
+        # Act
+        archive = ResultArchive(self.directory, 3600, 10)
+        archive.handle_result(self._result(profile, self._start + 1, ResultStatus.RED))
+        archive.close()
+
+        # Assert
+        samples = ArchiveReader(self.directory).query(profile.id)
+        self.assertEqual([statuses[code] for code in samples.statuses], [ResultStatus.GREEN, ResultStatus.RED])
+        self.assertEqual(samples.values[0], 1)
+        self.assertTrue(math.isnan(samples.values[1]))
+
+    def test_reader_loads_appended_entries(self):
+        # Arrange
+        profile, other = Profile("profile", "SampleProvider", 1), Profile("other", "SampleProvider", 1)
+        archive = ResultArchive(self.directory, 3600, 1)
+        archive.handle_result(self._result(profile, self._start, ResultStatus.GREEN, 1))
+        archive.flush()
+        reader = ArchiveReader(self.directory)
+        reader.query(profile.id)
+
+        # Act - the current chunk is still being archived
+        archive.handle_result(self._result(other, self._start + 1, ResultStatus.GREEN, 2))
+        archive.handle_result(self._result(profile, self._start + 2, ResultStatus.RED))
+        archive.flush()
+        samples = reader.query(profile.id)
+        archive.close()
+
+        # Assert
+        self.assertEqual(list(samples.timestamps), [self._start, self._start + 2])
+        self.assertEqual(reader.profile_ids(), sorted([profile.id, other.id]))
+
+    def test_local_timezone(self):
+        # Arrange - a host which is not on UTC
+        pin_timezone(self, 'Europe/Berlin')
+        profile = Profile("profile", "SampleProvider", 1)
+        archive = ResultArchive(self.directory)
+        result = ProfileResult(profile)
+        result.result = ProviderResult(ResultStatus.GREEN, 1)
+
+        # Act
+        archive.handle_result(result)
+        archive.close()
+
+        # Assert
+        self.assertEqual(len(ArchiveReader(self.directory).query(profile.id, time.time() - 60)), 1)
+
+    def test_unknown_profile(self):
+        # Act & Assert
+        self.assertEqual(len(ArchiveReader(self.directory).query("unknown")), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
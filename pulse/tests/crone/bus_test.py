@@ -0,0 +1,182 @@
+import threading
+import time
+import unittest
+from datetime import datetime
+from typing import List
+
+# Local imports
+from pulse.cron.bus import ResultBus
+from pulse.cron.output import BaseResultHandler, ProfileResult
+from pulse.profiles import Profile
+
+
+class _CollectingSink(BaseResultHandler):
+    def __init__(self) -> None:
+        self.batches = []   # type: List[List[ProfileResult]]
+        self.dropped = []   # type: List[tuple]
+        self.closed = False
+
+    def handle_result(self, result: ProfileResult) -> None:
+        raise NotImplementedError()
+
+    def handle_results(self, batch: List[ProfileResult]) -> None:
+        self.batches.append(batch)
+
+    def drop(self, profile_id: str) -> None:
+        self.dropped.append((len(self.batches), profile_id))
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class _BlockedSink(_CollectingSink):
+    def __init__(self) -> None:
+        super().__init__()
+        self.release = threading.Event()
+
+    def handle_results(self, batch: List[ProfileResult]) -> None:
+        self.release.wait()
+        super().handle_results(batch)
+
+
+class _FailingSink(_CollectingSink):
+    def handle_results(self, batch: List[ProfileResult]) -> None:
+        raise RuntimeError("sink failure")
+
+
+class TestResultBus(unittest.TestCase):
+    def _results(self, count: int) -> List[ProfileResult]:
+        return [ProfileResult(Profile("profile %s" % i, "SampleProvider", 1), datetime.now()) for i in range(count)]
+
+    def test_batches(self):
+        # Arrange
+        sink = _CollectingSink()
+        bus = ResultBus({'sink': sink}, batch_size=10, flush_interval_s=0.05)
+        results = self._results(25)
+
+        # Act
+        for result in results:
+            bus.handle_result(result)
+        bus.close()
+
+        # Assert
+        self.assertTrue(sink.closed)
+        self.assertEqual([result for batch in sink.batches for result in batch], results)
+        self.assertTrue(all(len(batch) <= 10 for batch in sink.batches))
+        self.assertEqual(bus.stats()['sink']['handled'], 25)
+
+    def test_drop(self):
+        # Arrange
+        sink = _CollectingSink()
+        bus = ResultBus({'sink': sink}, batch_size=10, flush_interval_s=0.05)
+        results = self._results(5)
+
+        # Act
+        for result in results[:3]:
+            bus.handle_result(result)
+        bus.drop(results[0].profile.id)
+        for result in results[3:]:
+            bus.handle_result(result)
+        bus.close()
+
+        # Assert - after the results queued before it
+        self.assertEqual([len(batch) for batch in sink.batches], [3, 2])
+        self.assertEqual(sink.dropped, [(1, results[0].profile.id)])
+
+    def test_drop_is_never_evicted(self):
+        # Arrange - the sink is stuck on a result, the queue fills up
+        sink = _BlockedSink()
+        bus = ResultBus({'sink': sink}, capacity=3, batch_size=1, flush_interval_s=0.01)
+        self.addCleanup(sink.release.set)
+        stuck = self._results(1)[0]
+        profile_id = stuck.profile.id
+        bus.handle_result(stuck)
+        time.sleep(0.05)
+
+        # Act
+        bus.drop(profile_id)
+        for result in self._results(5):
+            bus.handle_result(result)
+        sink.release.set()
+        bus.close()
+
+        # Assert - only the results were evicted
+        self.assertEqual([dropped[1] for dropped in sink.dropped], [profile_id])
+        self.assertEqual(bus.stats()['sink']['dropped'], 3)
+
+    def test_flush_interval(self):
+        # Arrange
+        sink = _CollectingSink()
+        bus = ResultBus({'sink': sink}, batch_size=100, flush_interval_s=0.05)
+        self.addCleanup(bus.close)
+
+        # Act
+        bus.handle_result(self._results(1)[0])
+        time.sleep(0.2)
+
+        # Assert
+        self.assertEqual(len(sink.batches), 1)
+
+    def test_slow_sink_drops_oldest(self):
+        # Arrange
+        slow, fast = _BlockedSink(), _CollectingSink()
+        bus = ResultBus({'slow': slow, 'fast': fast}, capacity=5, batch_size=1, flush_interval_s=0.01)
+        self.addCleanup(slow.release.set)
+        results = self._results(20)
+
+        # Act
+        started = time.monotonic()
+        for result in results:
+            bus.handle_result(result)
+        published_s = time.monotonic() - started
+        time.sleep(0.1)
+
+        # Assert - the publisher isn't blocked, the fast sink isn't stalled
+        self.assertLess(published_s, 0.1)
+        fast_stats, slow_stats = bus.stats()['fast'], bus.stats()['slow']
+        self.assertEqual(fast_stats['handled'] + fast_stats['dropped'], 20)
+        self.assertEqual(fast_stats['queued'], 0)
+        self.assertGreaterEqual(slow_stats['dropped'], 14)
+
+        # The slow sink keeps the newest results
+        slow.release.set()
+        bus.close()
+        self.assertEqual(slow.batches[-1][0], results[-1])
+
+    def test_failing_sink(self):
+        # Arrange
+        failing, healthy = _FailingSink(), _CollectingSink()
+        bus = ResultBus({'failing': failing, 'healthy': healthy}, batch_size=5, flush_interval_s=0.01)
+
+        # Act
+        for result in self._results(10):
+            bus.handle_result(result)
+        bus.close()
+
+        # Assert
+        self.assertGreater(bus.stats()['failing']['errors'], 0)
+        self.assertEqual(bus.stats()['healthy']['handled'], 10)
+
+    def test_close_leaves_stuck_sink_open(self):
+        # Arrange
+        stuck, healthy = _BlockedSink(), _CollectingSink()
+        bus = ResultBus({'stuck': stuck, 'healthy': healthy}, batch_size=1, flush_interval_s=0.01)
+        self.addCleanup(stuck.release.set)
+        bus.handle_result(self._results(1)[0])
+
+        # Act
+        with self.assertLogs('pulse.cron.bus', 'WARNING'):
+            bus.close(timeout_s=0.1)
+
+        # Assert - not closed while its thread is still handling results
+        self.assertFalse(stuck.closed)
+        self.assertTrue(healthy.closed)
+
+    def test_no_sinks(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            ResultBus({})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+# Local imports
+from pulse.cron.cluster import ClusterNode, ClusterProfileStorage, SqliteLeaseCoordinator
+from pulse.profiles import Profile
+from pulse.profiles.storage import InMemoryProfileStorage
+
+
+def _run_node(path: str, duration_s: float, changes: multiprocessing.Queue) -> None:
+    # A node in a process of its own, reporting the shards it runs over time
+    node = ClusterNode(SqliteLeaseCoordinator(path), 16, 0.6, "node-%s" % os.getpid())
+    node.on_change(lambda: changes.put((node.node_id, time.time(), node.owned)))
+    node.start()
+    changes.put((node.node_id, time.time(), node.owned))
+
+    # Then fail, without leaving the cluster
+    time.sleep(duration_s)
+    changes.put((node.node_id, time.time(), frozenset()))
+    changes.close()
+    changes.join_thread()
+    os._exit(0)
+
+
+class TestClusterNode(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = os.path.join(temp_dir.name, 'cluster.db')
+
+    def _node(self, node_id: str, lease_s: float = 0.6) -> ClusterNode:
+        return ClusterNode(SqliteLeaseCoordinator(self.path), 16, lease_s, node_id)
+
+    def test_fair_share(self):
+        # Arrange
+        nodes = [self._node("node %s" % i) for i in range(3)]
+
+        # Act - each node releases its surplus and claims the released shards
+        for _ in range(2):
+            for node in nodes:
+                node.heartbeat()
+            time.sleep(0.25)
+            for node in nodes:
+                node.heartbeat()
+
+        # Assert
+        owned = [node.owned for node in nodes]
+        self.assertEqual(set().union(*owned), set(range(16)))
+        self.assertEqual(sum(len(shards) for shards in owned), 16)
+        self.assertTrue(all(len(shards) <= 6 for shards in owned))
+
+    def test_takeover(self):
+        # Arrange
+        failed, survivor = self._node("failed"), self._node("survivor")
+        failed.heartbeat()
+        survivor.heartbeat()
+        self.assertEqual(len(failed.owned), 16)
+        self.assertEqual(len(survivor.owned), 0)
+
+        # Act - the failed node stops heartbeating
+        time.sleep(0.7)
+        survivor.heartbeat()
+
+        # Assert
+        self.assertEqual(len(survivor.owned), 16)
+
+    def test_leave(self):
+        # Arrange
+        leaving, staying = self._node("leaving"), self._node("staying")
+        leaving.start()
+        staying.start()
+        time.sleep(0.5)
+
+        # Act
+        leaving.stop()
+        time.sleep(0.5)
+
+        # Assert
+        self.assertEqual(len(leaving.owned), 0)
+        self.assertEqual(len(staying.owned), 16)
+        staying.stop()
+
+    def test_locked_coordinator(self):
+        # Arrange - another node holds the database lock
+        node = self._node("node")
+        node.heartbeat()
+        locker = sqlite3.connect(self.path, isolation_level=None)
+        self.addCleanup(locker.close)
+        locker.execute("BEGIN IMMEDIATE")
+        self.addCleanup(locker.execute, "ROLLBACK")
+        time.sleep(0.3)
+
+        # Act
+        started = time.monotonic()
+        with self.assertLogs('pulse.cron.cluster', 'ERROR'):
+            node.heartbeat()
+
+        # Assert - gave up in time to stop running the expiring shards
+        self.assertLess(time.monotonic() - started, 0.2)
+        self.assertEqual(len(node.owned), 0)
+
+    def test_storage(self):
+        # Arrange
+        storage = InMemoryProfileStorage()
+        storage._profiles = {}
+        for i in range(50):
+            profile = Profile("profile %s" % i, "SampleProvider", 1)
+            storage._profiles[profile.id] = profile
+
+        nodes = [self._node("node %s" % i) for i in range(2)]
+        for node in nodes * 2:
+            node.heartbeat()
+        time.sleep(0.25)
+        for node in nodes:
+            node.heartbeat()
+
+        # Act
+        ids = [ClusterProfileStorage(storage, node).get_all_ids() for node in nodes]
+
+        # Assert - every profile runs on exactly one node
+        self.assertCountEqual(ids[0] + ids[1], storage.get_all_ids())
+
+    def test_processes_never_overlap(self):
+        # Arrange
+        context = multiprocessing.get_context('spawn')
+        changes = context.Queue()
+        processes = [
+            context.Process(target=_run_node, args=(self.path, duration_s, changes))
+            for duration_s in (1.5, 4, 4)]
+
+        # Act - the first node fails, the others take over its shards
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+
+        timeline = []
+        while not changes.empty():
+            timeline.append(changes.get())
+
+        # Assert - at any time, a shard is run by one node at most
+        timeline.sort(key=lambda change: change[1])
+        failed_id = "node-%s" % processes[0].pid
+        current = {}
+        covered = 0
+        for node_id, _, owned in timeline:
+            current[node_id] = owned
+            running = [shard for shards in current.values() for shard in shards]
+            self.assertEqual(len(running), len(set(running)))
+
+            if failed_id in current and not current[failed_id]:
+                covered = max(covered, len(running))
+
+        # The survivors took over the failed node's shards
+        self.assertEqual(covered, 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
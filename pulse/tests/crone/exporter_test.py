@@ -0,0 +1,120 @@
+import time
+import unittest
+import urllib.request
+from datetime import datetime, timedelta
+
+# Local imports
+from pulse.cron.exporter import CONTENT_TYPE, OpenMetricsExporter
+from pulse.cron.output import ProfileResult
+from pulse.profiles import Profile
+from pulse.providers import ProviderResult, ResultStatus
+from pulse.tests.crone import pin_timezone
+
+
+class TestOpenMetricsExporter(unittest.TestCase):
+    def setUp(self):
+        self.exporter = OpenMetricsExporter('127.0.0.1', 0)
+        self.addCleanup(self.exporter.close)
+
+    def _result(self, profile: Profile, status: ResultStatus, value: int) -> ProfileResult:
+        result = ProfileResult(profile, datetime.fromtimestamp(1700000000))
+        result.finished_at = result.started_at + timedelta(milliseconds=250)
+        result.result = ProviderResult(status, value)
+        return result
+
+    def _scrape(self) -> str:
+        with urllib.request.urlopen("http://%s:%s/metrics" % self.exporter.address, timeout=5) as response:
+            self.assertEqual(response.headers['Content-Type'], CONTENT_TYPE)
+            return response.read().decode()
+
+    def test_scrape(self):
+        # Arrange
+        profile = Profile('Profile "one"', "PingProvider", 1)
+        self.exporter.handle_results([
+            self._result(profile, ResultStatus.GREEN, 12),
+            self._result(profile, ResultStatus.RED, 0),
+            self._result(profile, ResultStatus.GREEN, 15)])
+
+        # Act
+        body = self._scrape()
+
+        # Assert
+        labels = 'profile_id="%s",profile_name="Profile \\"one\\"",provider_id="PingProvider"' % profile.id
+        self.assertIn('pulse_profile_status{%s,pulse_profile_status="GREEN"} 1\n' % labels, body)
+        self.assertIn('pulse_profile_status{%s,pulse_profile_status="RED"} 0\n' % labels, body)
+        self.assertIn('pulse_profile_value{%s} 15\n' % labels, body)
+        self.assertIn('pulse_profile_run_duration_seconds{%s} 0.25\n' % labels, body)
+        self.assertIn('pulse_profile_last_run_timestamp_seconds{%s} 1700000000.0\n' % labels, body)
+        self.assertIn('pulse_profile_results_total{%s,status="GREEN"} 2\n' % labels, body)
+        self.assertIn('pulse_profile_results_total{%s,status="RED"} 1\n' % labels, body)
+        self.assertIn('# TYPE pulse_profile_results counter\n', body)
+        self.assertTrue(body.endswith('# EOF\n'))
+
+    def test_failure_has_no_value(self):
+        # Arrange
+        profile = Profile("profile", "PingProvider", 1)
+        self.exporter.handle_results([self._result(profile, ResultStatus.TIMEOUT, None)])
+
+        # Act
+        body = self._scrape()
+
+        # Assert
+        self.assertIn('pulse_profile_value{profile_id="%s",profile_name="profile",provider_id="PingProvider"} NaN\n' % profile.id, body)
+
+    def test_families_are_grouped(self):
+        # Arrange
+        profiles = [Profile("profile %s" % i, "PingProvider", 1) for i in range(3)]
+        for profile in profiles:
+            self.exporter.handle_result(self._result(profile, ResultStatus.GREEN, 1))
+
+        # Act
+        names = [line.split('{')[0] for line in self._scrape().splitlines() if not line.startswith('#')]
+
+        # Assert - every family is contiguous
+        families = [name for i, name in enumerate(names) if i == 0 or names[i - 1] != name]
+        self.assertEqual(len(families), len(set(families)))
+
+    def test_render_is_cached(self):
+        # Arrange
+        profile = Profile("profile", "PingProvider", 1)
+        self.exporter.handle_result(self._result(profile, ResultStatus.GREEN, 1))
+        first = self.exporter.render()
+
+        # Act & Assert
+        self.assertIs(self.exporter.render(), first)
+        self.exporter.drop(profile.id)
+        self.assertEqual(self.exporter.render(), b''.join(
+            line + b'\n' for line in first.splitlines() if line.startswith(b'#')))
+
+    def test_render_only_changed_segments(self):
+        # Arrange
+        profiles = [Profile("profile %s" % i, "PingProvider", 1) for i in range(200)]
+        self.exporter.handle_results([self._result(profile, ResultStatus.GREEN, 1) for profile in profiles])
+        self.exporter.render()
+
+        # Act
+        self.exporter.handle_result(self._result(profiles[100], ResultStatus.GREEN, 7))
+        dirty = [segment.dirty for segment in self.exporter._segments]
+        body = self.exporter.render().decode()
+
+        # Assert
+        self.assertEqual(dirty.count(True), 1)
+        self.assertIn('pulse_profile_value{profile_id="%s",profile_name="profile 100",provider_id="PingProvider"} 7\n' % profiles[100].id, body)
+        self.assertEqual(body.count('pulse_profile_value{'), 200)
+
+    def test_local_timezone(self):
+        # Arrange - a host which is not on UTC
+        pin_timezone(self, 'Europe/Berlin')
+        result = ProfileResult(Profile("profile", "PingProvider", 1))
+        result.result = ProviderResult(ResultStatus.GREEN, 1)
+
+        # Act
+        self.exporter.handle_result(result)
+
+        # Assert
+        line = next(line for line in self._scrape().splitlines() if line.startswith('pulse_profile_last_run_timestamp_seconds{'))
+        self.assertAlmostEqual(float(line.split()[-1]), time.time(), delta=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import math
+import time
+import unittest
+from datetime import datetime
+
+# Local imports
+from pulse.cron.history import HistoryRing, HistoryStore, statuses
+from pulse.cron.output import ProfileResult
+from pulse.profiles import Profile
+from pulse.providers import ProviderResult, ResultStatus
+from pulse.tests.crone import pin_timezone
+
+
+class TestHistoryRing(unittest.TestCase):
+    def test_query_all(self):
+        # Arrange
+        ring = HistoryRing(5)
+        ring.append(1, ResultStatus.GREEN, 10)
+        ring.append(2, ResultStatus.RED, None)
+
+        # Act
+        samples = ring.query()
+
+        # Assert
+        self.assertEqual(list(samples.rows()), [(1, ResultStatus.GREEN, 10), (2, ResultStatus.RED, None)])
+
+    def test_overwrites_oldest(self):
+        # Arrange
+        ring = HistoryRing(3)
+
+        # Act
+        for i in range(7):
+            ring.append(i, ResultStatus.GREEN, i)
+
+        # Assert
+        self.assertEqual(len(ring), 3)
+        self.assertEqual(list(ring.query().timestamps), [4, 5, 6])
+        self.assertEqual(list(ring.query().values), [4, 5, 6])
+
+    def test_query_range(self):
+        # Arrange - wrapped around
+        ring = HistoryRing(10)
+        for i in range(25):
+            ring.append(i, ResultStatus.GREEN, i)
+
+        # Act & Assert
+        self.assertEqual(list(ring.query(17, 21).timestamps), [17, 18, 19, 20])
+        self.assertEqual(list(ring.query(since=18.5).timestamps), [19, 20, 21, 22, 23, 24])
+        self.assertEqual(list(ring.query(until=16).timestamps), [15])
+        self.assertEqual(len(ring.query(30, 40)), 0)
+        self.assertEqual(len(ring.query(21, 17)), 0)
+
+    def test_out_of_order(self):
+        # Arrange - overlapping runs complete out of order
+        ring = HistoryRing(4)
+
+        # Act
+        for timestamp in (1, 3, 2, 5, 4, 0):
+            ring.append(timestamp, ResultStatus.GREEN, timestamp)
+
+        # Assert - the oldest are overwritten, the rest stay sorted
+        self.assertEqual(list(ring.query().timestamps), [2, 3, 4, 5])
+        self.assertEqual(list(ring.query().values), [2, 3, 4, 5])
+        self.assertEqual(list(ring.query(3, 5).timestamps), [3, 4])
+
+    def test_statuses(self):
+        # Arrange
+        ring = HistoryRing(len(statuses))
+        for status in statuses:
+            ring.append(0, status, None)
+
+        # Act
+        samples = ring.query()
+
+        # Assert
+        self.assertEqual([statuses[code] for code in samples.statuses], list(statuses))
+        self.assertTrue(all(math.isnan(value) for value in samples.values))
+
+    def test_invalid_capacity(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            HistoryRing(0)
+
+    def test_resized(self):
+        # Arrange - wrapped around
+        ring = HistoryRing(4)
+        for i in range(6):
+            ring.append(i, ResultStatus.GREEN, i)
+
+        # Act
+        larger = ring.resized(8)
+        smaller = ring.resized(2)
+        larger.append(6, ResultStatus.RED, None)
+
+        # Assert
+        self.assertEqual(larger.capacity, 8)
+        self.assertEqual(list(larger.query().timestamps), [2, 3, 4, 5, 6])
+        self.assertEqual(list(smaller.query().values), [4, 5])
+
+
+class TestHistoryStore(unittest.TestCase):
+    def _result(self, profile: Profile, timestamp: float, value: int) -> ProfileResult:
+        result = ProfileResult(profile, datetime.fromtimestamp(timestamp))
+        result.result = ProviderResult(ResultStatus.GREEN, value)
+        return result
+
+    def test_retention(self):
+        # Arrange
+        store = HistoryStore(retention_s=10, max_samples=100)
+        profile = Profile("profile", "SampleProvider", 2)
+
+        # Act
+        store.handle_results([self._result(profile, 1000 + i * 2, i) for i in range(20)])
+
+        # Assert - 10 seconds of results, every 2 seconds
+        samples = store.query(profile.id)
+        self.assertEqual(list(samples.values), [15, 16, 17, 18, 19])
+        self.assertEqual(store.nbytes, 5 * 13)
+
+    def test_interval_changed(self):
+        # Arrange
+        store = HistoryStore(retention_s=10, max_samples=100)
+        profile = Profile("profile", "SampleProvider", 2)
+        store.handle_results([self._result(profile, 1000 + i * 2, i) for i in range(10)])
+
+        # Act - reloaded, running every second
+        profile.run_every_x_seconds = 1
+        store.handle_results([self._result(profile, 1020 + i, 10 + i) for i in range(7)])
+
+        # Assert - 10 seconds of results, every second
+        samples = store.query(profile.id)
+        self.assertEqual(list(samples.values), [7, 8, 9, 10, 11, 12, 13, 14, 15, 16])
+        self.assertEqual(store.nbytes, 10 * 13)
+
+    def test_max_samples(self):
+        # Arrange
+        store = HistoryStore(retention_s=3600, max_samples=3)
+        profile = Profile("profile", "SampleProvider", 0.5)
+
+        # Act
+        for i in range(10):
+            store.handle_result(self._result(profile, 1000 + i, i))
+
+        # Assert
+        self.assertEqual(list(store.query(profile.id, since=1008).values), [8, 9])
+
+    def test_local_timezone(self):
+        # Arrange - a host which is not on UTC
+        pin_timezone(self, 'Europe/Berlin')
+
+        store = HistoryStore()
+        profile = Profile("profile", "SampleProvider", 1)
+        result = ProfileResult(profile)
+        result.result = ProviderResult(ResultStatus.GREEN, 1)
+
+        # Act
+        store.handle_result(result)
+
+        # Assert
+        timestamps = store.query(profile.id, time.time() - 60).timestamps
+        self.assertEqual(len(timestamps), 1)
+        self.assertAlmostEqual(timestamps[0], time.time(), delta=5)
+
+    def test_unknown_and_dropped_profile(self):
+        # Arrange
+        store = HistoryStore()
+        profile = Profile("profile", "SampleProvider", 1)
+        store.handle_result(self._result(profile, 1000, 1))
+
+        # Act
+        store.drop(profile.id)
+
+        # Assert
+        self.assertEqual(len(store.query(profile.id)), 0)
+        self.assertEqual(store.profile_ids(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import pickle
+import time
+import unittest
+from datetime import datetime, timedelta
+
+# Local imports
+from pulse.cron.output import ProfileResult
+from pulse.profiles import Profile
+from pulse.providers import ProviderResult, ResultStatus
+
+
+class TestProfileResult(unittest.TestCase):
+    def test_runtime(self):
+        # Arrange
+        result = ProfileResult(Profile("profile", "SampleProvider", 1))
+        self.assertIsNone(result.runtime_ms)
+        self.assertIsNone(result.finished_at)
+
+        # Act
+        time.sleep(0.02)
+        result.finish()
+
+        # Assert - the finish is derived from the start and the runtime
+        self.assertGreaterEqual(result.runtime_ms, 20)
+        self.assertEqual(result.finished_at - result.started_at, timedelta(microseconds=(result.finished_ns - result.started_ns) // 1000))
+
+    def test_finished_at(self):
+        # Arrange
+        result = ProfileResult(Profile("profile", "SampleProvider", 1), datetime(2024, 1, 1))
+
+        # Act
+        result.finished_at = result.started_at + timedelta(milliseconds=250)
+
+        # Assert
+        self.assertEqual(result.runtime_ms, 250)
+        self.assertEqual(result.finished_at, datetime(2024, 1, 1, 0, 0, 0, 250000))
+
+    def test_slots_and_pickle(self):
+        # Arrange
+        result = ProfileResult(Profile("profile", "SampleProvider", 1))
+        result.result = ProviderResult(ResultStatus.GREEN, 5, timings={'connect': 1})
+        result.finish()
+
+        # Act
+        copy = pickle.loads(pickle.dumps(result))
+
+        # Assert
+        self.assertFalse(hasattr(result, "__dict__"))
+        self.assertFalse(hasattr(result.result, "__dict__"))
+        self.assertEqual(copy.runtime_ms, result.runtime_ms)
+        self.assertEqual(copy.result.timings, {'connect': 1})
+        self.assertEqual(copy.profile.id, result.profile.id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import concurrent.futures
+import threading
+import unittest
+
+# Local imports
+from pulse.cron.pool import WorkerPool
+
+
+class TestWorkerPool(unittest.TestCase):
+    def test_submit(self):
+        # Arrange
+        pool = WorkerPool(2)
+
+        # Act
+        future = pool.submit("key", lambda x: x * 2, 21)
+
+        # Assert
+        self.assertEqual(future.result(timeout=1), 42)
+        pool.shutdown()
+
+    def test_key_limit_queues(self):
+        # Arrange
+        release = threading.Event()
+        self.addCleanup(release.set)
+        pool = WorkerPool(4, {"slow": 1})
+
+        # Act
+        first = pool.submit("slow", release.wait)
+        second = pool.submit("slow", release.wait)
+        other = pool.submit("fast", lambda: True)
+
+        # Assert
+        self.assertTrue(other.result(timeout=1))
+        self.assertEqual(pool.queued, 1)
+        self.assertEqual(pool.queued_by_key(), {"slow": 1})
+
+        release.set()
+        self.assertTrue(first.result(timeout=1))
+        self.assertTrue(second.result(timeout=1))
+        self.assertEqual(pool.queued, 0)
+        pool.shutdown()
+
+    def test_timeout(self):
+        # Arrange
+        release = threading.Event()
+        self.addCleanup(release.set)
+        pool = WorkerPool(1)
+
+        # Act
+        future = pool.submit("key", release.wait, timeout_s=0.05)
+
+        # Assert
+        with self.assertRaises(concurrent.futures.TimeoutError):
+            future.result(timeout=1)
+
+        release.set()
+        pool.shutdown()
+
+    def test_slow_timeout_callback(self):
+        # Arrange
+        release = threading.Event()
+        self.addCleanup(release.set)
+        pool = WorkerPool(2)
+        first = pool.submit("key", release.wait, timeout_s=0.05)
+        first.add_done_callback(lambda _: release.wait(1))
+
+        # Act
+        second = pool.submit("key", release.wait, timeout_s=0.1)
+
+        # Assert
+        concurrent.futures.wait([second], timeout=0.5)
+        self.assertTrue(second.done())
+        self.assertIsInstance(second.exception(), concurrent.futures.TimeoutError)
+
+        release.set()
+        pool.shutdown()
+
+    def test_shutdown_cancels_queued(self):
+        # Arrange
+        release = threading.Event()
+        pool = WorkerPool(1)
+        pool.submit("key", release.wait)
+        queued = pool.submit("key", release.wait)
+
+        # Act
+        release.set()
+        pool.shutdown()
+
+        # Assert
+        self.assertTrue(queued.cancelled() or queued.done())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,525 @@
+import asyncio
+import concurrent.futures
+import os
+import tempfile
+import threading
+import time
+import unittest
+from typing import Dict, List, NamedTuple
+
+# Local imports
+from pulse.cron import ProfileRunner
+from pulse.cron.output import BaseResultHandler
+from pulse.cron.scheduler import Scheduler
+from pulse.profiles import Profile
+from pulse.profiles.storage import InMemoryProfileStorage, SqliteProfileStorage
+from pulse.providers import BaseProvider, Deadline, ProviderResult, ResultStatus, Threshold
+
+
+class _SleepyProvider(BaseProvider):
+    def run(self, parameters: Dict[str, str], deadline: Deadline = None) -> ProviderResult:
+        # Sleep, but not past the deadline
+        sleep_s = float(parameters["SleepS"])
+        time.sleep(min(sleep_s, deadline.remaining(sleep_s)))
+        return ProviderResult(ResultStatus.TIMEOUT if deadline.expired else ResultStatus.GREEN, 1)
+
+
+class _NonBlockingProvider(BaseProvider):
+    def submit(self, parameters: Dict[str, str], deadline: Deadline) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        future.set_result(ProviderResult(ResultStatus.YELLOW, 2))
+        return future
+
+    def run(self, parameters: Dict[str, str], deadline: Deadline = None) -> ProviderResult:
+        raise NotImplementedError()
+
+
+class _PlannedProvider(BaseProvider):
+    prepared = 0
+
+    def prepare(self, parameters: Dict[str, str]) -> float:
+        _PlannedProvider.prepared += 1
+        return float(parameters["SleepS"])
+
+    def run(self, parameters: float, deadline: Deadline = None) -> ProviderResult:
+        return ProviderResult(ResultStatus.GREEN, int(parameters))
+
+
+class _SharedPlan(NamedTuple):
+    target: str
+    threshold: Threshold
+
+
+class _SharedProvider(BaseProvider):
+    probes = 0
+
+    def prepare(self, parameters: Dict[str, str]) -> _SharedPlan:
+        return _SharedPlan(parameters["Target"], Threshold.of(int(parameters["ThresholdMs"])))
+
+    def probe_plan(self, plan: _SharedPlan) -> _SharedPlan:
+        return plan._replace(threshold=None)
+
+    def run(self, parameters: _SharedPlan, deadline: Deadline = None) -> ProviderResult:
+        _SharedProvider.probes += 1
+        time.sleep(0.1)
+        return ProviderResult(ResultStatus.GREEN, 50)
+
+
+_providers = {
+    "_NonBlockingProvider": _NonBlockingProvider,
+    "_PlannedProvider": _PlannedProvider,
+    "_SharedProvider": _SharedProvider
+}
+
+
+class _ProvidersManagerStub:
+    def __init__(self) -> None:
+        self.released = []  # type: List[str]
+
+    def get_instance(self, provider_id: str, profile_id: str = None) -> BaseProvider:
+        return _providers.get(provider_id, _SleepyProvider)()
+
+    def get_prototype(self, provider_id: str) -> BaseProvider:
+        return self.get_instance(provider_id)
+
+    def release_instance(self, provider_id: str, profile_id: str) -> None:
+        self.released.append(profile_id)
+
+    def teardown(self) -> None:
+        pass
+
+
+class _CollectingResultHandler(BaseResultHandler):
+    def __init__(self) -> None:
+        self.results = []   # type: List
+        self.dropped = []   # type: List[str]
+
+    def handle_result(self, result) -> None:
+        self.results.append(result)
+
+    def drop(self, profile_id: str) -> None:
+        self.dropped.append(profile_id)
+
+
+class TestProfileRunner(unittest.TestCase):
+    def _run_async(self, runner: ProfileRunner, profile: Profile) -> None:
+        asyncio.run(runner._async_run_and_handle(profile))
+
+    def _profile(self, sleep_s: float) -> Profile:
+        profile = Profile("profile", "_SleepyProvider", 1)
+        profile.provider_parameters["SleepS"] = str(sleep_s)
+        return profile
+
+    def test_async_run_and_handle(self):
+        # Arrange
+        handler = _CollectingResultHandler()
+        runner = ProfileRunner(InMemoryProfileStorage(), _ProvidersManagerStub(), handler)
+
+        # Act
+        self._run_async(runner, self._profile(0))
+
+        # Assert
+        self.assertEqual(len(handler.results), 1)
+        self.assertEqual(handler.results[0].result.status, ResultStatus.GREEN)
+
+    def test_async_run_and_handle_timeout(self):
+        # Arrange
+        handler = _CollectingResultHandler()
+        runner = ProfileRunner(InMemoryProfileStorage(), _ProvidersManagerStub(), handler)
+        runner._max_run_timeout_s = 0.05
+
+        # Act
+        self._run_async(runner, self._profile(0.2))
+
+        # Assert
+        self.assertEqual(len(handler.results), 1)
+        self.assertEqual(handler.results[0].result.status, ResultStatus.TIMEOUT)
+
+    def test_run_and_handle_timeout(self):
+        # Arrange
+        handler = _CollectingResultHandler()
+        runner = ProfileRunner(InMemoryProfileStorage(), _ProvidersManagerStub(), handler)
+        runner._max_run_timeout_s = 0.05
+
+        # Act
+        runner._run_and_handle(self._profile(0.2))
+        time.sleep(0.1)
+
+        # Assert
+        self.assertEqual(len(handler.results), 1)
+        self.assertEqual(handler.results[0].result.status, ResultStatus.TIMEOUT)
+
+    def test_profile_timeout_override(self):
+        # Arrange
+        handler = _CollectingResultHandler()
+        runner = ProfileRunner(InMemoryProfileStorage(), _ProvidersManagerStub(), handler)
+        profile = self._profile(0.2)
+        profile.timeout_s = 0.05
+
+        # Act
+        started = time.monotonic()
+        self._run_async(runner, profile)
+
+        # Assert
+        self.assertLess(time.monotonic() - started, 0.15)
+        self.assertEqual(handler.results[0].result.status, ResultStatus.TIMEOUT)
+
+        # The worker is freed along with the deadline
+        time.sleep(0.02)
+        self.assertEqual(runner.pool.in_flight, 0)
+
+    def test_non_blocking_provider(self):
+        # Arrange
+        handler = _CollectingResultHandler()
+        runner = ProfileRunner(InMemoryProfileStorage(), _ProvidersManagerStub(), handler)
+
+        # Act
+        self._run_async(runner, Profile("profile", "_NonBlockingProvider", 1))
+
+        # Assert
+        self.assertEqual(handler.results[0].result.status, ResultStatus.YELLOW)
+        self.assertEqual(runner.pool.in_flight + runner.pool.queued, 0)
+
+    def test_sync(self):
+        # Arrange
+        storage = InMemoryProfileStorage()
+        storage._profiles = {}
+        kept, changed, moved, removed = (self._profile(0) for _ in range(4))
+        for profile in (kept, changed, moved, removed):
+            storage._profiles[profile.id] = profile
+
+        providers_manager = _ProvidersManagerStub()
+        handler = _CollectingResultHandler()
+        runner = ProfileRunner(storage, providers_manager, handler)
+        runner._scheduler = Scheduler()
+        runner._sync()
+        jobs = dict(runner._jobs)
+
+        # Act
+        changed_copy = self._profile(1)
+        changed_copy.id = changed.id
+        moved_copy = self._profile(0)
+        moved_copy.id = moved.id
+        moved_copy.run_every_x_seconds = 2
+        added = self._profile(0)
+        storage._profiles = {profile.id: profile for profile in (kept, changed_copy, moved_copy, added)}
+        runner._sync()
+
+        # Assert
+        self.assertEqual(set(runner._active), {kept.id, changed.id, moved.id, added.id})
+        self.assertIs(runner._jobs[kept.id], jobs[kept.id])
+        self.assertIs(runner._jobs[changed.id], jobs[changed.id])
+        self.assertIs(runner._active[changed.id], changed_copy)
+        self.assertIsNot(runner._jobs[moved.id], jobs[moved.id])
+        self.assertTrue(jobs[removed.id].cancelled)
+        self.assertCountEqual(providers_manager.released, [changed.id, moved.id, removed.id])
+        self.assertEqual(handler.dropped, [removed.id])
+
+    def test_sync_waits_for_runs_in_flight(self):
+        # Arrange
+        storage = InMemoryProfileStorage()
+        profile = self._profile(0.2)
+        storage._profiles = {profile.id: profile}
+        providers_manager = _ProvidersManagerStub()
+        handler = _CollectingResultHandler()
+        runner = ProfileRunner(storage, providers_manager, handler)
+        runner._scheduler = Scheduler()
+        runner._sync()
+        runner._run_and_handle(profile)
+
+        # Act
+        storage._profiles = {}
+        runner._sync()
+        released, dropped = list(providers_manager.released), list(handler.dropped)
+        time.sleep(0.3)
+
+        # Assert - released once the run is done, its result handled first
+        self.assertEqual((released, dropped), ([], []))
+        self.assertEqual(providers_manager.released, [profile.id])
+        self.assertEqual(handler.dropped, [profile.id])
+        self.assertEqual(len(handler.results), 1)
+        self.assertEqual(runner._in_flight, {})
+
+    def test_async_reload_reads_off_the_loop(self):
+        # Arrange - a slow storage
+        storage = InMemoryProfileStorage()
+        profile = self._profile(0)
+        readers = []
+
+        def iter_profiles():
+            readers.append(threading.current_thread())
+            time.sleep(0.2)
+            return iter([profile])
+
+        storage.iter_profiles = iter_profiles
+        runner = ProfileRunner(storage, _ProvidersManagerStub(), _CollectingResultHandler())
+
+        async def reload() -> float:
+            runner._loop = asyncio.get_running_loop()
+            started = time.monotonic()
+            task = runner._loop.create_task(runner._async_reload())
+            await asyncio.sleep(0.05)
+            lag_s = time.monotonic() - started
+            await task
+            return lag_s
+
+        # Act
+        lag_s = asyncio.run(reload())
+
+        # Assert - the loop kept running during the read
+        self.assertLess(lag_s, 0.15)
+        self.assertIsNot(readers[0], threading.current_thread())
+        self.assertEqual(set(runner._active), {profile.id})
+
+    def test_sync_incremental(self):
+        # Arrange
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        storage = SqliteProfileStorage(os.path.join(temp_dir.name, 'profiles.db'))
+        self.addCleanup(storage.close)
+        kept, changed, removed = (self._profile(0) for _ in range(3))
+        storage.put([kept, changed, removed])
+
+        runner = ProfileRunner(storage, _ProvidersManagerStub(), _CollectingResultHandler())
+        runner._scheduler = Scheduler()
+        runner._sync()
+        jobs = dict(runner._jobs)
+
+        # Act - only the changes are read
+        changed_copy = self._profile(1)
+        changed_copy.id = changed.id
+        added = self._profile(0)
+        storage.put([changed_copy, added])
+        storage.remove([removed.id])
+        storage.iter_profiles = None
+        runner._sync()
+
+        # Assert
+        self.assertEqual(set(runner._active), {kept.id, changed.id, added.id})
+        self.assertIs(runner._jobs[kept.id], jobs[kept.id])
+        self.assertEqual(runner._active[changed.id].provider_parameters, changed_copy.provider_parameters)
+        self.assertTrue(jobs[removed.id].cancelled)
+        self.assertEqual(runner._version, storage.get_version())
+
+    def test_sync_prepares_plans(self):
+        # Arrange
+        storage = InMemoryProfileStorage()
+        profile = self._profile(3)
+        profile.provider_id = "_PlannedProvider"
+        storage._profiles = {profile.id: profile}
+        _PlannedProvider.prepared = 0
+
+        runner = ProfileRunner(storage, _ProvidersManagerStub(), _CollectingResultHandler())
+        runner._scheduler = Scheduler()
+        runner._sync()
+
+        # Act - the runs use the plan prepared at sync
+        results = [runner._run_profile(profile) for _ in range(3)]
+        runner._sync()
+
+        # Assert
+        self.assertEqual(_PlannedProvider.prepared, 1)
+        self.assertEqual(runner._plans[profile.id], 3.0)
+        self.assertTrue(all(result.result.value == 3 for result in results))
+
+        # The plan goes along with the profile
+        storage._profiles = {}
+        runner._sync()
+        self.assertEqual(runner._plans, {})
+
+    def _shared_profile(self, target: str, threshold_ms: int, run_every_x_seconds: int = 5) -> Profile:
+        profile = Profile("profile", "_SharedProvider", run_every_x_seconds)
+        profile.provider_parameters.update(Target=target, ThresholdMs=str(threshold_ms))
+        return profile
+
+    def test_shared_probe(self):
+        # Arrange - the same target, with different thresholds and intervals
+        storage = InMemoryProfileStorage()
+        relaxed, strict, other = (
+            self._shared_profile("db", 100), self._shared_profile("db", 40, 10), self._shared_profile("web", 100))
+        storage._profiles = {profile.id: profile for profile in (relaxed, strict, other)}
+        _SharedProvider.probes = 0
+
+        runner = ProfileRunner(storage, _ProvidersManagerStub(), _CollectingResultHandler())
+        runner._max_run_timeout_s = 1
+        runner._scheduler = Scheduler()
+        runner._sync()
+
+        # Act
+        futures = [runner._submit(profile) for profile in (relaxed, strict, other)]
+        results = [future.result(timeout=1) for future in futures]
+
+        # Assert - a probe per target, judged by each profile
+        self.assertEqual(_SharedProvider.probes, 2)
+        self.assertEqual([result.profile for result in results], [relaxed, strict, other])
+        self.assertEqual([result.result.status for result in results],
+                         [ResultStatus.GREEN, ResultStatus.RED, ResultStatus.GREEN])
+        self.assertEqual(results[0].started_ns, results[1].started_ns)
+        self.assertIsNot(results[0].result, results[1].result)
+        self.assertEqual(runner.metrics.snapshot()['counters']['probes_coalesced{provider=_SharedProvider}'], 1)
+        self.assertEqual(runner._probes, {})
+
+        # The runs of the profiles sharing the probe are lined up
+        apart_s = (runner._jobs[strict.id].deadline - runner._jobs[relaxed.id].deadline) % 5
+        self.assertLess(min(apart_s, 5 - apart_s), 0.01)
+
+        # A later run probes again
+        runner._submit(strict).result(timeout=1)
+        self.assertEqual(_SharedProvider.probes, 3)
+
+    def test_shared_probe_off(self):
+        # Arrange
+        storage = InMemoryProfileStorage()
+        first, second = self._shared_profile("db", 100), self._shared_profile("db", 100)
+        storage._profiles = {profile.id: profile for profile in (first, second)}
+        _SharedProvider.probes = 0
+
+        runner = ProfileRunner(storage, _ProvidersManagerStub(), _CollectingResultHandler())
+        runner._coalesce_probes = False
+        runner._scheduler = Scheduler()
+        runner._sync()
+
+        # Act
+        futures = [runner._submit(profile) for profile in (first, second)]
+        for future in futures:
+            future.result(timeout=1)
+
+        # Assert
+        self.assertEqual(_SharedProvider.probes, 2)
+
+    def test_metrics(self):
+        # Arrange
+        handler = _CollectingResultHandler()
+        runner = ProfileRunner(InMemoryProfileStorage(), _ProvidersManagerStub(), handler)
+        runner._max_run_timeout_s = 0.05
+
+        # Act
+        self._run_async(runner, self._profile(0))
+        self._run_async(runner, self._profile(0.2))
+
+        # Assert
+        snapshot = runner.metrics.snapshot()
+        self.assertEqual(snapshot['counters']['runs_total{provider=_SleepyProvider,status=GREEN}'], 1)
+        self.assertEqual(snapshot['counters']['runs_total{provider=_SleepyProvider,status=TIMEOUT}'], 1)
+        self.assertEqual(snapshot['histograms']['queue_wait_ms{key=_SleepyProvider}']['count'], 2)
+        self.assertEqual(snapshot['histograms']['handler_latency_ms']['count'], 2)
+        self.assertIn('runs_in_flight', snapshot['gauges'])
+        self.assertGreater(snapshot['gauges']['threads'], 0)
+
+        # The run duration is recorded once the provider returns
+        time.sleep(0.2)
+        snapshot = runner.metrics.snapshot()
+        self.assertEqual(snapshot['histograms']['run_duration_ms{provider=_SleepyProvider}']['count'], 2)
+
+    def test_stop(self):
+        for engine in ProfileRunner.engines:
+            with self.subTest(engine=engine):
+                # Arrange
+                profile = Profile("profile", "_NonBlockingProvider", 0.05)
+                storage = InMemoryProfileStorage()
+                storage._profiles = {profile.id: profile}
+                handler = _CollectingResultHandler()
+                runner = ProfileRunner(storage, _ProvidersManagerStub(), handler)
+                threading.Timer(0.3, runner.stop).start()
+
+                # Act - returns once stopped
+                runner.start(engine)
+
+                # Assert
+                self.assertGreater(len(handler.results), 0)
+
+    def test_async_tick_skips_missed_runs(self):
+        # Arrange
+        profile = Profile("profile", "_NonBlockingProvider", 0.1)
+        handler = _CollectingResultHandler()
+        runner = ProfileRunner(InMemoryProfileStorage(), _ProvidersManagerStub(), handler)
+        runner._active[profile.id] = profile
+
+        async def stall() -> float:
+            runner._loop = asyncio.get_running_loop()
+
+            # Due 5.5 intervals ago, the loop was busy
+            runner._async_tick(profile.id, runner._loop.time() - 0.55)
+            next_at = runner._jobs[profile.id].when() - runner._loop.time()
+            await asyncio.sleep(0.03)
+            runner._jobs[profile.id].cancel()
+            return next_at
+
+        # Act
+        next_in_s = asyncio.run(stall())
+
+        # Assert - a single run, and the next one on its phase
+        self.assertEqual(len(handler.results), 1)
+        self.assertGreater(next_in_s, 0.03)
+        self.assertLessEqual(next_in_s, 0.1)
+
+    def test_shutdown_waits_for_runs_in_flight(self):
+        # Arrange
+        providers_manager = _ProvidersManagerStub()
+        handler = _CollectingResultHandler()
+        runner = ProfileRunner(InMemoryProfileStorage(), providers_manager, handler)
+        torn_down = []
+        providers_manager.teardown = lambda: torn_down.append(len(handler.results))
+        runner._run_and_handle(self._profile(0.2))
+
+        # Act
+        runner._shutdown()
+
+        # Assert - torn down once the run was done and handled
+        self.assertEqual(torn_down, [1])
+
+    def test_shutdown_waits_for_cancelled_async_runs(self):
+        # Arrange
+        providers_manager = _ProvidersManagerStub()
+        runner = ProfileRunner(InMemoryProfileStorage(), providers_manager, _CollectingResultHandler())
+        torn_down = []
+        providers_manager.teardown = lambda: torn_down.append(runner.pool.in_flight)
+
+        async def cancel():
+            task = asyncio.get_running_loop().create_task(runner._async_run_and_handle(self._profile(0.2)))
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        # Act - the loop is gone, the run goes on on its worker
+        asyncio.run(cancel())
+        runner._shutdown()
+
+        # Assert
+        self.assertEqual(torn_down, [0])
+
+    def test_reload(self):
+        for engine in ProfileRunner.engines:
+            with self.subTest(engine=engine):
+                # Arrange - no profiles yet
+                storage = InMemoryProfileStorage()
+                storage._profiles = {}
+                handler = _CollectingResultHandler()
+                runner = ProfileRunner(storage, _ProvidersManagerStub(), handler)
+                runner.exit_if_idle = False
+                runner._reload_interval_s = 0
+                thread = threading.Thread(target=runner.start, args=(engine,))
+                thread.start()
+                time.sleep(0.1)
+
+                # Act
+                profile = Profile("profile", "_NonBlockingProvider", 0.05)
+                storage._profiles[profile.id] = profile
+                runner.reload()
+                time.sleep(0.3)
+                runner.stop()
+                thread.join(5)
+
+                # Assert
+                self.assertGreater(len(handler.results), 0)
+
+    def test_start_unknown_engine(self):
+        # Arrange
+        runner = ProfileRunner(InMemoryProfileStorage(), _ProvidersManagerStub(), _CollectingResultHandler())
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            runner.start("unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import threading
+import time
+import unittest
+
+# Local imports
+from pulse.cron.scheduler import Scheduler, phase_delay
+from pulse.metrics import MetricsRegistry
+
+
+class TestPhaseDelay(unittest.TestCase):
+    def test_deterministic(self):
+        # Act
+        first = phase_delay("profile id", 10, wall_time=1000)
+        second = phase_delay("profile id", 10, wall_time=1000)
+
+        # Assert
+        self.assertEqual(first, second)
+        self.assertGreaterEqual(first, 0)
+        self.assertLess(first, 10)
+
+    def test_spreads_keys(self):
+        # Act
+        delays = [phase_delay("profile {}".format(i), 1, wall_time=0) for i in range(100)]
+
+        # Assert
+        self.assertGreater(len(set(delays)), 90)
+        self.assertLess(min(delays), 0.2)
+        self.assertGreater(max(delays), 0.8)
+
+    def test_anchored_to_wall_clock(self):
+        # Act
+        now = phase_delay("profile id", 10, wall_time=1000)
+        later = phase_delay("profile id", 10, wall_time=1003)
+
+        # Assert
+        self.assertAlmostEqual((now - later) % 10, 3)
+
+    def test_lines_up_intervals(self):
+        # Act
+        every_5s = phase_delay("probe key", 5, wall_time=1000)
+        every_10s = phase_delay("probe key", 10, wall_time=1000)
+
+        # Assert - every other run of the 5s job is along with the 10s job's
+        self.assertAlmostEqual(every_10s % 5, every_5s)
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler()
+        self.scheduler.start()
+        self.addCleanup(self.scheduler.stop)
+
+    def test_every_fractional_interval(self):
+        # Arrange
+        calls = []
+
+        # Act
+        self.scheduler.every(0.02, lambda: calls.append(time.monotonic()))
+        time.sleep(0.21)
+
+        # Assert
+        self.assertGreaterEqual(len(calls), 8)
+        self.assertLessEqual(len(calls), 12)
+
+    def test_call_later(self):
+        # Arrange
+        called = threading.Event()
+
+        # Act
+        self.scheduler.call_later(0.01, called.set)
+
+        # Assert
+        self.assertTrue(called.wait(1))
+
+    def test_cancel(self):
+        # Arrange
+        called = threading.Event()
+
+        # Act
+        job = self.scheduler.call_later(0.05, called.set)
+        self.scheduler.cancel(job)
+
+        # Assert
+        self.assertFalse(called.wait(0.1))
+
+    def test_records_lag(self):
+        # Arrange
+        metrics = MetricsRegistry()
+        scheduler = Scheduler(metrics)
+        called = threading.Event()
+
+        # Act - due before the scheduler starts
+        scheduler.call_later(0, called.set)
+        time.sleep(0.05)
+        scheduler.start()
+        self.addCleanup(scheduler.stop)
+
+        # Assert
+        self.assertTrue(called.wait(1))
+        self.assertGreaterEqual(metrics.snapshot()['histograms']['schedule_lag_ms']['p50'], 40)
+
+
+if __name__ == '__main__':
+    unittest.main()
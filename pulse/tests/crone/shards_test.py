@@ -0,0 +1,131 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+import yaml
+from datetime import datetime
+from typing import List
+
+# Local imports
+from pulse.cron.output import BaseResultHandler, ProfileResult
+from pulse.cron.shards import ShardSupervisor, ShardedProfileStorage, _QueueResultHandler, shard_of
+from pulse.profiles import Profile
+from pulse.profiles.storage import InMemoryProfileStorage
+
+
+class _CollectingResultHandler(BaseResultHandler):
+    def __init__(self) -> None:
+        self.results = []   # type: List
+        self.closed = False
+
+    def handle_result(self, result) -> None:
+        self.results.append(result)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class TestShardOf(unittest.TestCase):
+    _ids = [uuid.uuid4().hex for _ in range(10000)]
+
+    def test_balanced(self):
+        # Act
+        counts = [0] * 4
+        for profile_id in self._ids:
+            counts[shard_of(profile_id, 4)] += 1
+
+        # Assert
+        for count in counts:
+            self.assertAlmostEqual(count, 2500, delta=250)
+
+    def test_minimal_moves(self):
+        # Act
+        moved = [
+            profile_id for profile_id in self._ids
+            if shard_of(profile_id, 4) != shard_of(profile_id, 5)]
+
+        # Assert - about 1/5 of the profiles move, all into the new shard
+        self.assertAlmostEqual(len(moved), 2000, delta=250)
+        self.assertTrue(all(shard_of(profile_id, 5) == 4 for profile_id in moved))
+
+    def test_invalid(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            shard_of("id", 0)
+
+
+class TestShardedProfileStorage(unittest.TestCase):
+    def test_partition(self):
+        # Arrange
+        storage = InMemoryProfileStorage()
+        storage._profiles = {}
+        for i in range(100):
+            profile = Profile("profile %s" % i, "SampleProvider", 1)
+            storage._profiles[profile.id] = profile
+
+        # Act
+        shards = [ShardedProfileStorage(storage, shard, 3).get_all_ids() for shard in range(3)]
+
+        # Assert - every profile is in exactly one shard
+        self.assertCountEqual(sum(shards, []), storage.get_all_ids())
+        self.assertTrue(all(shards))
+
+
+class TestShardSupervisor(unittest.TestCase):
+    def _supervisor(self, handler: BaseResultHandler) -> ShardSupervisor:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        filename = os.path.join(temp_dir.name, 'profiles.yaml')
+
+        profile = Profile("profile", "SampleProvider", 1)
+        profile.provider_parameters["SampleParam"] = "value"
+        with open(filename, 'w') as file:
+            file.write(yaml.safe_dump([profile.to_dict()]))
+
+        return ShardSupervisor(filename, 2, handler)
+
+    def test_gather(self):
+        # Arrange
+        handler = _CollectingResultHandler()
+        supervisor = self._supervisor(handler)
+        results = [ProfileResult(Profile("profile %s" % i, "SampleProvider", 1), datetime.now()) for i in range(3)]
+
+        # Act
+        _QueueResultHandler(supervisor._results).handle_results(results[:2])
+        _QueueResultHandler(supervisor._results).handle_result(results[2])
+        supervisor._results.put(None)
+        supervisor._gather()
+
+        # Assert
+        self.assertEqual([result.profile.id for result in handler.results], [result.profile.id for result in results])
+
+    def test_restarts_and_stops(self):
+        # Arrange
+        handler = _CollectingResultHandler()
+        supervisor = self._supervisor(handler)
+        supervisor._max_backoff_s = 1
+        thread = threading.Thread(target=supervisor.start)
+        thread.start()
+
+        deadline = time.monotonic() + 30
+        while not all(process and process.is_alive() for process in supervisor._processes) and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+        # Act
+        supervisor._processes[0].kill()
+        while supervisor.restarts == 0 and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+        supervisor.stop()
+        thread.join(30)
+
+        # Assert
+        self.assertEqual(supervisor.restarts, 1)
+        self.assertTrue(handler.closed)
+        self.assertFalse(any(process.is_alive() for process in supervisor._processes))
+
+
+if __name__ == '__main__':
+    unittest.main()
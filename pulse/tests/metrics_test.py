@@ -0,0 +1,133 @@
+import random
+import threading
+import unittest
+
+# Local imports
+from pulse.metrics import LatencyHistogram, MetricsRegistry
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles(self):
+        # Arrange
+        histogram = LatencyHistogram()
+        values = [random.randint(0, 100000) for _ in range(10000)]
+
+        # Act
+        for value in values:
+            histogram.record(value)
+
+        # Assert - within the relative error of the exact percentiles
+        values.sort()
+        for percent in (50, 95, 99):
+            exact = values[int(len(values) * percent / 100) - 1]
+            self.assertAlmostEqual(histogram.percentile(percent), exact, delta=exact * 0.01 + 1)
+
+    def test_small_values_exact(self):
+        # Arrange
+        histogram = LatencyHistogram()
+
+        # Act
+        for value in range(1, 101):
+            histogram.record(value)
+
+        # Assert
+        self.assertEqual(histogram.percentile(50), 50)
+        self.assertEqual(histogram.percentile(99), 99)
+        self.assertEqual(histogram.percentile(100), 100)
+
+    def test_merge(self):
+        # Arrange
+        first, second, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for value in range(0, 5000, 3):
+            first.record(value)
+            both.record(value)
+        for value in range(10000, 20000, 7):
+            second.record(value)
+            both.record(value)
+
+        # Act
+        merged = LatencyHistogram.from_dict(first.to_dict()).merge(second)
+
+        # Assert
+        self.assertEqual(merged.count, both.count)
+        for percent in (1, 50, 95, 99, 100):
+            self.assertEqual(merged.percentile(percent), both.percentile(percent))
+
+    def test_empty(self):
+        # Act & Assert
+        self.assertIsNone(LatencyHistogram().percentile(50))
+
+    def test_invalid(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            LatencyHistogram().record(-1)
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_counters(self):
+        # Arrange
+        metrics = MetricsRegistry()
+
+        # Act
+        metrics.inc('runs_total', provider='PingProvider', status='GREEN')
+        metrics.inc('runs_total', 2, status='GREEN', provider='PingProvider')
+        metrics.inc('runs_total', provider='PingProvider', status='RED')
+
+        # Assert
+        self.assertEqual(metrics.snapshot()['counters'], {
+            'runs_total{provider=PingProvider,status=GREEN}': 3,
+            'runs_total{provider=PingProvider,status=RED}': 1
+        })
+
+    def test_histograms(self):
+        # Arrange
+        metrics = MetricsRegistry()
+
+        # Act
+        for value in range(1, 101):
+            metrics.observe('lag_ms', value)
+        metrics.observe('lag_ms', -5)
+
+        # Assert
+        stats = metrics.snapshot()['histograms']['lag_ms']
+        self.assertEqual(stats['count'], 101)
+        self.assertAlmostEqual(stats['p50'], 50, delta=0.5)
+        self.assertEqual(stats['max'], 100)
+
+    def test_gauges(self):
+        # Arrange
+        metrics = MetricsRegistry()
+        value = [1]
+
+        # Act
+        metrics.gauge('in_flight', lambda: value[0])
+        value[0] = 5
+
+        # Assert
+        self.assertEqual(metrics.snapshot()['gauges'], {'in_flight': 5})
+        self.assertIn('in_flight=5', metrics.summary())
+
+    def test_thread_safety(self):
+        # Arrange
+        metrics = MetricsRegistry()
+
+        def work() -> None:
+            for _ in range(10000):
+                metrics.inc('count')
+                metrics.observe('duration_ms', 1)
+
+        # Act
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['counters']['count'], 40000)
+        self.assertEqual(snapshot['histograms']['duration_ms']['count'], 40000)
+
+
+if __name__ == '__main__':
+    unittest.main()
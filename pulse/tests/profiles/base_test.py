@@ -1,7 +1,7 @@
 import unittest
 
 # Local imports
-from profiles import Profile
+from pulse.profiles import Profile
 
 
 class TestProfile(unittest.TestCase):
@@ -14,3 +14,26 @@ class TestProfile(unittest.TestCase):
         # Act & Assert
         self.assertEqual(profile.name, name)
         self.assertEqual(profile.provider_id, provider_id)
+
+    def test_slots(self):
+        # Arrange
+        profile = Profile("profile", "provider", 1)
+
+        # Act & Assert
+        self.assertFalse(hasattr(profile, "__dict__"))
+        self.assertIsNone(profile.timeout_s)
+        self.assertEqual(profile.tags, ())
+
+    def test_from_dict_shares_parameter_names(self):
+        # Arrange - distinct strings, as parsed
+        data = [
+            {"id": str(i), "provider_id": "".join(["Ping", "Provider"]), "provider_parameters": {"".join(["Tar", "get"]): "localhost"}}
+            for i in range(2)]
+
+        # Act
+        first, second = (Profile.from_dict(item) for item in data)
+
+        # Assert
+        self.assertIs(next(iter(first.provider_parameters)), next(iter(second.provider_parameters)))
+        self.assertIs(first.provider_id, second.provider_id)
+        self.assertEqual(first.to_dict()["provider_parameters"], {"Target": "localhost"})
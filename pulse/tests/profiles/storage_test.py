@@ -0,0 +1,254 @@
+import os
+import tempfile
+import unittest
+from typing import List
+
+import yaml
+
+# Local imports
+from pulse.profiles import Profile
+from pulse.profiles.storage import FileProfileStorage, InMemoryProfileStorage, SqliteProfileStorage, open_profile_storage
+
+
+class _CountingFileProfileStorage(FileProfileStorage):
+    def __init__(self, data_file: str, profiles: List[Profile]) -> None:
+        super().__init__(data_file)
+        self.profiles = profiles
+        self.reads = 0
+
+    def _read_profiles(self) -> List[Profile]:
+        self.reads += 1
+        return list(self.profiles)
+
+
+class TestFileProfileStorage(unittest.TestCase):
+    def setUp(self):
+        handle, self.data_file = tempfile.mkstemp(suffix=".yaml")
+        os.write(handle, b"[]")
+        os.close(handle)
+        self.addCleanup(os.remove, self.data_file)
+
+    def test_parses_once(self):
+        # Arrange
+        profiles = [Profile("profile {}".format(i), "provider", 1) for i in range(10)]
+        storage = _CountingFileProfileStorage(self.data_file, profiles)
+
+        # Act
+        for profile_id in storage.get_all_ids():
+            storage.get(profile_id)
+
+        # Assert
+        self.assertEqual(storage.reads, 1)
+
+    def test_reloads_on_change(self):
+        # Arrange
+        profile = Profile("profile", "provider", 1)
+        storage = _CountingFileProfileStorage(self.data_file, [])
+        storage.get_all_ids()
+
+        # Act
+        storage.profiles.append(profile)
+        with open(self.data_file, "w") as file:
+            file.write("[] ")
+
+        # Assert
+        self.assertEqual(storage.get(profile.id), profile)
+        self.assertEqual(storage.reads, 2)
+
+    def test_missing_file_read_once(self):
+        # Arrange
+        storage = _CountingFileProfileStorage(self.data_file + ".missing", [])
+
+        # Act
+        for _ in range(3):
+            storage.get_all_ids()
+
+        # Assert
+        self.assertEqual(storage.reads, 1)
+
+    def test_get_not_found(self):
+        # Arrange
+        storage = _CountingFileProfileStorage(self.data_file, [])
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            storage.get("missing")
+
+
+class TestInMemoryProfileStorage(unittest.TestCase):
+    def test_put_and_get(self):
+        # Arrange
+        storage = InMemoryProfileStorage()
+        profile = Profile("profile", "provider", 1)
+
+        # Act
+        storage.put([profile])
+
+        # Assert
+        self.assertEqual(storage.get_all_ids(), [profile.id])
+        self.assertIs(storage.get(profile.id), profile)
+        self.assertEqual(InMemoryProfileStorage().get_all_ids(), [])
+
+
+class _SnapshotSpyFileProfileStorage(FileProfileStorage):
+    snapshot_hits = 0
+
+    def _read_snapshot(self, digest: bytes):
+        records = super()._read_snapshot(digest)
+        self.snapshot_hits += records is not None
+        return records
+
+
+class TestFileProfileStorageFormat(unittest.TestCase):
+    def setUp(self):
+        handle, self.data_file = tempfile.mkstemp(suffix=".yaml")
+        os.close(handle)
+        self.addCleanup(os.remove, self.data_file)
+        self.addCleanup(lambda: os.path.exists(self.data_file + ".snapshot") and os.remove(self.data_file + ".snapshot"))
+
+    def _write(self, content: str) -> None:
+        with open(self.data_file, "w") as file:
+            file.write(content)
+
+    def test_plain_data(self):
+        # Arrange
+        profile = Profile("profile", "provider", 0.5)
+        profile.provider_parameters["Target"] = "localhost"
+        self._write(yaml.safe_dump([profile.to_dict()]))
+
+        # Act
+        loaded = FileProfileStorage(self.data_file).get(profile.id)
+
+        # Assert
+        self.assertEqual(loaded.to_dict(), profile.to_dict())
+
+    def test_legacy_python_object_tags(self):
+        # Arrange
+        self._write(
+            "- !!python/object:pulse.profiles.Profile\n"
+            "  id: abc\n"
+            "  name: legacy\n"
+            "  provider_id: PingProvider\n"
+            "  provider_parameters: {Target: localhost}\n"
+            "  run_every_x_seconds: 10\n")
+
+        # Act
+        loaded = FileProfileStorage(self.data_file).get("abc")
+
+        # Assert
+        self.assertIsInstance(loaded, Profile)
+        self.assertEqual(loaded.name, "legacy")
+        self.assertEqual(loaded.provider_parameters, {"Target": "localhost"})
+
+    def test_snapshot(self):
+        # Arrange
+        profile = Profile("profile", "provider", 1)
+        self._write(yaml.safe_dump([profile.to_dict()]))
+        FileProfileStorage(self.data_file).get_all_ids()
+
+        # Act
+        storage = _SnapshotSpyFileProfileStorage(self.data_file)
+        loaded = storage.get(profile.id)
+
+        # Assert
+        self.assertEqual(storage.snapshot_hits, 1)
+        self.assertEqual(loaded.to_dict(), profile.to_dict())
+
+    def test_snapshot_invalidated(self):
+        # Arrange
+        first = Profile("first", "provider", 1)
+        second = Profile("second", "provider", 1)
+        self._write(yaml.safe_dump([first.to_dict()]))
+        FileProfileStorage(self.data_file).get_all_ids()
+
+        # Act
+        self._write(yaml.safe_dump([second.to_dict()]))
+        storage = _SnapshotSpyFileProfileStorage(self.data_file)
+        ids = storage.get_all_ids()
+
+        # Assert
+        self.assertEqual(storage.snapshot_hits, 0)
+        self.assertEqual(ids, [second.id])
+
+
+class TestSqliteProfileStorage(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.storage = SqliteProfileStorage(os.path.join(temp_dir.name, "profiles.db"))
+        self.addCleanup(self.storage.close)
+
+    def _profile(self, name: str, provider_id: str = "provider", interval_s: float = 10, tags=()) -> Profile:
+        profile = Profile(name, provider_id, interval_s)
+        profile.provider_parameters["Target"] = "localhost"
+        profile.tags = tuple(tags)
+        return profile
+
+    def test_put_and_get(self):
+        # Arrange
+        profile = self._profile("profile", tags=["db"])
+        profile.timeout_s = 2
+
+        # Act
+        self.storage.put([profile])
+
+        # Assert
+        self.assertEqual(self.storage.get_all_ids(), [profile.id])
+        self.assertEqual(self.storage.get(profile.id).to_dict(), profile.to_dict())
+        with self.assertRaises(ValueError):
+            self.storage.get("missing")
+
+    def test_pages(self):
+        # Arrange
+        profiles = [self._profile("profile {}".format(i)) for i in range(25)]
+        self.storage.put(profiles)
+
+        # Act
+        first = self.storage.get_page(limit=10)
+        second = self.storage.get_page(first[-1].id, 10)
+        streamed = list(self.storage.iter_profiles(page_size=10))
+
+        # Assert
+        self.assertEqual(len(first), 10)
+        self.assertLess(first[-1].id, second[0].id)
+        self.assertEqual([profile.id for profile in streamed], sorted(profile.id for profile in profiles))
+
+    def test_filters(self):
+        # Arrange
+        ping = self._profile("ping", "PingProvider", 5, ["edge", "eu"])
+        http = self._profile("http", "HttpProvider", 60, ["eu"])
+        self.storage.put([ping, http])
+
+        # Act & Assert
+        self.assertEqual([p.id for p in self.storage.get_page(provider_id="HttpProvider")], [http.id])
+        self.assertEqual([p.id for p in self.storage.get_page(tag="edge")], [ping.id])
+        self.assertCountEqual([p.id for p in self.storage.get_page(tag="eu")], [ping.id, http.id])
+        self.assertEqual([p.id for p in self.storage.get_page(max_interval_s=10)], [ping.id])
+        self.assertEqual(self.storage.get_page(tag="eu", provider_id="Other"), [])
+
+    def test_changes_since(self):
+        # Arrange
+        kept, changed, removed = (self._profile(name) for name in ("kept", "changed", "removed"))
+        version = self.storage.put([kept, changed, removed])
+
+        # Act
+        changed.name = "changed again"
+        self.storage.put([changed])
+        self.storage.remove([removed.id, "missing"])
+        changes = self.storage.changes_since(version)
+
+        # Assert
+        self.assertEqual([profile.name for profile in changes.changed], ["changed again"])
+        self.assertEqual(changes.removed, [removed.id])
+        self.assertEqual(changes.version, self.storage.get_version())
+        self.assertEqual(self.storage.changes_since(changes.version).changed, [])
+        self.assertEqual(self.storage.remove([]), changes.version)
+        self.assertCountEqual(self.storage.get_all_ids(), [kept.id, changed.id])
+
+    def test_open_profile_storage(self):
+        # Act & Assert
+        self.assertIsInstance(open_profile_storage("profiles.yaml"), FileProfileStorage)
+
+
+if __name__ == '__main__':
+    unittest.main()
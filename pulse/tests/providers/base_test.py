@@ -1,7 +1,8 @@
+import time
 import unittest
 
 # Local imports
-from providers import ParameterMetadata
+from pulse.providers import Deadline, ParameterMetadata, ResultStatus, Threshold
 
 
 class TestBaseProvider(unittest.TestCase):
@@ -36,5 +37,48 @@ class TestParameterMetadata(unittest.TestCase):
         self.assertEqual(parameter_metadata.required, required)
 
 
+class TestDeadline(unittest.TestCase):
+    def test_no_deadline(self):
+        # Arrange
+        deadline = Deadline()
+
+        # Act & Assert
+        self.assertFalse(deadline.expired)
+        self.assertEqual(deadline.remaining(4), 4)
+
+    def test_remaining(self):
+        # Arrange
+        deadline = Deadline(10)
+
+        # Act & Assert
+        self.assertFalse(deadline.expired)
+        self.assertLessEqual(deadline.remaining(4), 10)
+        self.assertGreater(deadline.remaining(4), 9)
+
+    def test_expired(self):
+        # Arrange
+        deadline = Deadline(0.01)
+
+        # Act
+        time.sleep(0.02)
+
+        # Assert
+        self.assertTrue(deadline.expired)
+        self.assertEqual(deadline.remaining(), 0)
+
+
+class TestThreshold(unittest.TestCase):
+    def test_status(self):
+        # Arrange
+        threshold = Threshold.of(100)
+
+        # Act & Assert
+        self.assertEqual(threshold.warning, 90)
+        self.assertEqual(threshold.status(90), ResultStatus.GREEN)
+        self.assertEqual(threshold.status(91), ResultStatus.YELLOW)
+        self.assertEqual(threshold.status(100), ResultStatus.YELLOW)
+        self.assertEqual(threshold.status(101), ResultStatus.RED)
+
+
 if __name__ == '__main__':
     unittest.main()
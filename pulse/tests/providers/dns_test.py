@@ -0,0 +1,111 @@
+import socket
+import time
+import unittest
+from typing import List, Optional
+
+# Local imports
+from pulse.providers.dns import ResolverCache
+
+
+class _CountingResolverCache(ResolverCache):
+    def __init__(self, addresses: List[Optional[str]], **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.addresses = addresses
+        self.queries = 0
+        self.families = []
+
+    def _query(self, hostname: str, family: int) -> Optional[str]:
+        self.queries += 1
+        self.families.append(family)
+        return self.addresses[min(self.queries, len(self.addresses)) - 1]
+
+
+class TestResolverCache(unittest.TestCase):
+    def test_ip_address(self):
+        # Arrange
+        cache = _CountingResolverCache(["10.0.0.1"])
+
+        # Act
+        resolution = cache.resolve("127.0.0.1")
+
+        # Assert
+        self.assertEqual(resolution.address, "127.0.0.1")
+        self.assertEqual(cache.queries, 0)
+
+    def test_cached(self):
+        # Arrange
+        cache = _CountingResolverCache(["10.0.0.1"])
+
+        # Act
+        first = cache.resolve("host")
+        second = cache.resolve("host")
+
+        # Assert
+        self.assertEqual(first.address, "10.0.0.1")
+        self.assertEqual(second, first._replace(resolve_ms=0))
+        self.assertEqual(cache.queries, 1)
+
+    def test_expires(self):
+        # Arrange
+        cache = _CountingResolverCache(["10.0.0.1", "10.0.0.2"], ttl_s=0.01, refresh_ahead=1)
+        cache.resolve("host")
+
+        # Act
+        time.sleep(0.02)
+
+        # Assert
+        self.assertIsNone(cache.lookup("host"))
+        self.assertEqual(cache.resolve("host").address, "10.0.0.2")
+
+    def test_negative_cached(self):
+        # Arrange
+        cache = _CountingResolverCache([None, "10.0.0.1"], negative_ttl_s=10)
+
+        # Act
+        first = cache.resolve("host")
+        second = cache.resolve("host")
+
+        # Assert
+        self.assertIsNone(first.address)
+        self.assertIsNone(second.address)
+        self.assertEqual(cache.queries, 1)
+
+    def test_refresh_ahead(self):
+        # Arrange
+        cache = _CountingResolverCache(["10.0.0.1", "10.0.0.2"], ttl_s=10, refresh_ahead=0)
+        cache.resolve("host")
+
+        # Act
+        stale = cache.lookup("host")
+        time.sleep(0.05)
+
+        # Assert
+        self.assertEqual(stale.address, "10.0.0.1")
+        self.assertEqual(cache.lookup("host").address, "10.0.0.2")
+        self.assertGreaterEqual(cache.queries, 2)
+
+    def test_families(self):
+        # Arrange
+        cache = _CountingResolverCache(["10.0.0.1", "fd00::1"])
+
+        # Act
+        ipv4 = cache.resolve("host")
+        either = cache.resolve("host", socket.AF_UNSPEC)
+
+        # Assert - cached apart, by family
+        self.assertEqual((ipv4.address, either.address), ("10.0.0.1", "fd00::1"))
+        self.assertEqual(cache.families, [socket.AF_INET, socket.AF_UNSPEC])
+        self.assertEqual(cache.resolve("::1", socket.AF_UNSPEC).address, "::1")
+        self.assertIsNone(cache.resolve("::1").address)
+        self.assertEqual(cache.queries, 2)
+
+    def test_localhost(self):
+        # Act
+        resolution = ResolverCache().resolve("localhost")
+
+        # Assert
+        self.assertTrue(resolution.address.startswith("127."))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+# Local imports
+from pulse.providers.icmp import IcmpEngine
+
+
+@unittest.skipIf(IcmpEngine.shared() is None, "ICMP sockets are not permitted")
+class TestIcmpEngine(unittest.TestCase):
+    def test_ping_loopback(self):
+        # Arrange
+        engine = IcmpEngine.shared()
+
+        # Act
+        rtt_s = engine.ping("127.0.0.1", 1)
+
+        # Assert
+        self.assertIsNotNone(rtt_s)
+        self.assertLess(rtt_s, 1)
+
+    def test_submit_many(self):
+        # Arrange
+        engine = IcmpEngine.shared()
+        addresses = ["127.0.0.{}".format(i) for i in range(1, 255)]
+
+        # Act
+        futures = [engine.submit(address, 1) for address in addresses]
+
+        # Assert
+        for future in futures:
+            self.assertIsNotNone(future.result(timeout=2))
+        self.assertEqual(engine.waiting, 0)
+
+    def test_submit_full_send_buffer(self):
+        # Arrange
+        engine = IcmpEngine()
+        self.addCleanup(engine.close)
+        engine._socket = _FullSocket(engine._socket, full_sends=3)
+
+        # Act
+        futures = [engine.submit("127.0.0.1", 1) for _ in range(5)]
+
+        # Assert
+        for future in futures:
+            self.assertIsNotNone(future.result(timeout=2))
+        self.assertEqual(engine.waiting, 0)
+
+
+class _FullSocket:
+    """
+    A socket whose send buffer is full for its first sends.
+    """
+
+    def __init__(self, sock, full_sends):
+        self._socket = sock
+        self._full_sends = full_sends
+
+    def __getattr__(self, name):
+        return getattr(self._socket, name)
+
+    def sendto(self, data, address):
+        if self._full_sends:
+            self._full_sends -= 1
+            raise BlockingIOError()
+
+        return self._socket.sendto(data, address)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,270 @@
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local imports
+from pulse.providers import Deadline, ResultStatus
+from pulse.providers.dns import ResolverCache
+from pulse.providers.http import ConnectionPool
+from pulse.providers.impl.http import HttpProvider
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests += 1
+        if self.path.startswith('/slow'):
+            time.sleep(0.5)
+
+        status = 404 if self.path.startswith('/missing') else 200
+        body = b'all good' if status == 200 else b'not found'
+        try:
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            if self.path.startswith('/close'):
+                self.send_header('Connection', 'close')
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. timed out)
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.requests = 0
+        self.connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+
+class TestHttpProvider(unittest.TestCase):
+    def setUp(self):
+        self.server = _Server()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        # A pool of the test's own
+        ConnectionPool._shared = ConnectionPool()
+        self.addCleanup(ConnectionPool._shared.clear)
+
+    def _url(self, path: str, scheme: str = 'http') -> str:
+        return '%s://127.0.0.1:%s%s' % (scheme, self.server.server_address[1], path)
+
+    def test_keep_alive(self):
+        # Arrange
+        provider = HttpProvider()
+        parameters = {"Url": self._url("/health"), "BodyContains": "good", "ThresholdMs": "1000"}
+
+        # Act
+        results = [provider.run(parameters, Deadline(2)) for _ in range(20)]
+
+        # Assert - a single connection for all the runs
+        self.assertTrue(all(result.status == ResultStatus.GREEN for result in results))
+        self.assertEqual(self.server.requests, 20)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(ConnectionPool.shared().reused, 19)
+        self.assertEqual(set(results[0].timings), {'connect', 'tls', 'ttfb'})
+        self.assertEqual(results[1].timings['connect'], 0)
+
+    def test_concurrent_runs_share_the_pool(self):
+        # Arrange
+        provider = HttpProvider()
+        parameters = {"Url": self._url("/health")}
+        barrier = threading.Barrier(4)
+
+        def run():
+            barrier.wait()
+            for _ in range(10):
+                provider.run(parameters, Deadline(2))
+
+        # Act
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert - a connection per concurrent run, at most
+        self.assertEqual(self.server.requests, 40)
+        self.assertLessEqual(self.server.connections, 4)
+        self.assertEqual(ConnectionPool.shared().idle, self.server.connections)
+
+    def test_server_closes(self):
+        # Arrange
+        provider = HttpProvider()
+        parameters = {"Url": self._url("/close")}
+
+        # Act
+        results = [provider.run(parameters, Deadline(2)) for _ in range(3)]
+
+        # Assert
+        self.assertTrue(all(result.status == ResultStatus.GREEN for result in results))
+        self.assertEqual(self.server.connections, 3)
+        self.assertEqual(ConnectionPool.shared().idle, 0)
+
+    def test_server_closes_idle(self):
+        # Arrange
+        provider = HttpProvider()
+        parameters = {"Url": self._url("/health")}
+        _Handler.timeout = 0.1
+        self.addCleanup(setattr, _Handler, 'timeout', None)
+        provider.run(parameters, Deadline(2))
+
+        # Act - the server drops the idle connection
+        time.sleep(0.3)
+        result = provider.run(parameters, Deadline(2))
+
+        # Assert
+        self.assertEqual(result.status, ResultStatus.GREEN)
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual(ConnectionPool.shared().reused, 0)
+
+    def test_prepare(self):
+        # Arrange
+        provider = HttpProvider()
+
+        # Act
+        plan = provider.prepare({"Url": self._url("/health?full=1"), "ExpectedStatus": "200,301-302,4xx"})
+        result = provider.run(plan, Deadline(2))
+
+        # Assert - the parameters are parsed once, into the plan
+        self.assertEqual((plan.scheme, plan.host, plan.target), ('http', '127.0.0.1', '/health?full=1'))
+        self.assertEqual(plan.port, self.server.server_address[1])
+        self.assertEqual(plan.statuses, ((200, 200), (301, 302), (400, 499)))
+        self.assertIsNone(plan.threshold)
+        self.assertEqual(result.status, ResultStatus.GREEN)
+
+    def test_total_excludes_resolution(self):
+        # Arrange - a cold cache, in front of a slow resolver
+        def query(hostname, family):
+            time.sleep(0.3)
+            return '127.0.0.1'
+
+        self.addCleanup(setattr, ResolverCache, '_shared', ResolverCache._shared)
+        ResolverCache._shared = ResolverCache()
+        ResolverCache._shared._query = query
+
+        # Act
+        exchange = ConnectionPool.shared().request('http', 'localhost', self.server.server_address[1], '/health', timeout_s=2)
+
+        # Assert
+        self.assertGreaterEqual(exchange.resolve_ms, 300)
+        self.assertLess(exchange.total_ms, 300)
+
+    def test_unquoted_parameters(self):
+        # Arrange - the values as parsed from unquoted YAML
+        provider = HttpProvider()
+        parameters = {"Url": self._url("/health"), "ThresholdMs": 1000, "ExpectedStatus": 200, "VerifyTls": False}
+
+        # Act
+        provider.validate(parameters)
+        plan = provider.prepare(parameters)
+
+        # Assert
+        self.assertEqual(plan.statuses, ((200, 200),))
+        self.assertFalse(plan.verify_tls)
+        self.assertEqual(provider.run(plan, Deadline(2)).status, ResultStatus.GREEN)
+        with self.assertRaises(ValueError):
+            provider.validate(dict(parameters, ThresholdMs=-1))
+
+    def test_unexpected_status_and_body(self):
+        # Arrange
+        provider = HttpProvider()
+
+        # Act
+        missing = provider.run({"Url": self._url("/missing")}, Deadline(2))
+        expected = provider.run({"Url": self._url("/missing"), "ExpectedStatus": "4xx"}, Deadline(2))
+        body = provider.run({"Url": self._url("/health"), "BodyContains": "bad"}, Deadline(2))
+
+        # Assert
+        self.assertEqual(missing.status, ResultStatus.RED)
+        self.assertEqual(expected.status, ResultStatus.GREEN)
+        self.assertEqual(body.status, ResultStatus.RED)
+
+    def test_timeout(self):
+        # Arrange
+        provider = HttpProvider()
+
+        # Act
+        result = provider.run({"Url": self._url("/slow")}, Deadline(0.1))
+
+        # Assert
+        self.assertEqual(result.status, ResultStatus.TIMEOUT)
+
+    def test_unreachable(self):
+        # Arrange
+        provider = HttpProvider()
+        port = self.server.server_address[1]
+        self.server.shutdown()
+        self.server.server_close()
+
+        # Act
+        result = provider.run({"Url": "http://127.0.0.1:%s/" % port}, Deadline(2))
+
+        # Assert
+        self.assertEqual(result.status, ResultStatus.RED)
+
+    @unittest.skipUnless(shutil.which('openssl'), "openssl is required")
+    def test_tls(self):
+        # Arrange - a self-signed certificate
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        cert, key = os.path.join(temp_dir.name, 'cert.pem'), os.path.join(temp_dir.name, 'key.pem')
+        subprocess.run(
+            ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=127.0.0.1',
+             '-keyout', key, '-out', cert],
+            check=True, capture_output=True)
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+
+        provider = HttpProvider()
+        parameters = {"Url": self._url("/health", 'https'), "VerifyTls": "false"}
+
+        # Act
+        results = [provider.run(parameters, Deadline(2)) for _ in range(5)]
+        connections = self.server.connections
+        verified = provider.run(dict(parameters, VerifyTls="true"), Deadline(2))
+
+        # Assert
+        self.assertTrue(all(result.status == ResultStatus.GREEN for result in results))
+        self.assertEqual(connections, 1)
+        self.assertEqual(verified.status, ResultStatus.RED)
+
+    def test_validate(self):
+        # Arrange
+        provider = HttpProvider()
+
+        # Act & Assert
+        provider.validate({"Url": "https://example.com:8443/health?full=1", "ExpectedStatus": "200,301-302,2xx"})
+        for parameters in [
+                {"Url": "ftp://example.com/"},
+                {"Url": "http://"},
+                {"Url": "http://example.com:99999/"},
+                {"Url": "http://example.com/", "ThresholdMs": "-1"},
+                {"Url": "http://example.com/", "ExpectedStatus": "ok"},
+                {"Url": "http://example.com/", "Method": "POST"}]:
+            with self.assertRaises(ValueError):
+                provider.validate(parameters)
+
+
+if __name__ == '__main__':
+    unittest.main()
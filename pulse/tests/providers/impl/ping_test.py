@@ -1,8 +1,8 @@
 import unittest
 
 # Local application imports
-from providers.impl.ping import PingProvider
-from providers import ResultStatus
+from pulse.providers.impl.ping import PingProvider
+from pulse.providers import ResultStatus
 
 
 class TestPingProvider(unittest.TestCase):
@@ -0,0 +1,134 @@
+import socket
+import unittest
+
+# Local imports
+from pulse.providers import Deadline, ProviderResult, ResultStatus
+from pulse.providers.impl.tcp import TcpProvider
+
+
+class TestTcpProvider(unittest.TestCase):
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(16)
+        self.addCleanup(self.listener.close)
+        self.port = str(self.listener.getsockname()[1])
+
+    def test_run(self):
+        # Arrange
+        provider = TcpProvider()
+        parameters = {"Target": "127.0.0.1", "Port": self.port, "ThresholdMs": "1000"}
+
+        # Act
+        result = provider.run(parameters, Deadline(2))
+
+        # Assert
+        self.assertEqual(result.status, ResultStatus.GREEN)
+        self.assertIsInstance(result.value, int)
+
+    def test_submit(self):
+        # Arrange
+        provider = TcpProvider()
+        parameters = {"Target": "127.0.0.1", "Port": self.port}
+
+        # Act
+        future = provider.submit(parameters, Deadline(2))
+
+        # Assert - addresses don't need a worker
+        self.assertIsNotNone(future)
+        self.assertEqual(future.result(timeout=2).status, ResultStatus.GREEN)
+
+    def test_prepare(self):
+        # Arrange
+        provider = TcpProvider()
+
+        # Act
+        plan = provider.prepare({"Target": "127.0.0.1", "Port": self.port, "ThresholdMs": "1000"})
+        result = provider.run(plan, Deadline(2))
+
+        # Assert - the parameters are parsed once, into the plan
+        self.assertEqual(plan.port, int(self.port))
+        self.assertEqual(plan.threshold.limit, 1000)
+        self.assertIsNone(provider.prepare({"Target": "127.0.0.1", "Port": self.port}).threshold)
+        self.assertEqual(result.status, ResultStatus.GREEN)
+
+    def test_probe_plan(self):
+        # Arrange
+        provider = TcpProvider()
+        relaxed = provider.prepare({"Target": "127.0.0.1", "Port": self.port, "ThresholdMs": "1000"})
+        strict = provider.prepare({"Target": "127.0.0.1", "Port": self.port, "ThresholdMs": "10"})
+
+        # Act
+        result = provider.run(provider.probe_plan(relaxed), Deadline(2))
+        slow = ProviderResult(ResultStatus.GREEN, 50)
+
+        # Assert - the thresholds don't change the probe, only the judgement
+        self.assertEqual(provider.probe_plan(relaxed), provider.probe_plan(strict))
+        self.assertEqual(result.status, ResultStatus.GREEN)
+        self.assertEqual(provider.judge(relaxed, slow).status, ResultStatus.GREEN)
+        self.assertEqual(provider.judge(strict, slow).status, ResultStatus.RED)
+        self.assertEqual(provider.judge(strict, ProviderResult(ResultStatus.TIMEOUT)).status, ResultStatus.TIMEOUT)
+
+    def test_refused(self):
+        # Arrange
+        provider = TcpProvider()
+        self.listener.close()
+
+        # Act
+        result = provider.run({"Target": "127.0.0.1", "Port": self.port}, Deadline(2))
+
+        # Assert
+        self.assertEqual(result.status, ResultStatus.RED)
+
+    def test_ipv6(self):
+        # Arrange
+        listener = socket.socket(socket.AF_INET6)
+        try:
+            listener.bind(('::1', 0))
+        except OSError:
+            listener.close()
+            self.skipTest("IPv6 is not available")
+        listener.listen(16)
+        self.addCleanup(listener.close)
+        provider = TcpProvider()
+        parameters = {"Target": "::1", "Port": str(listener.getsockname()[1])}
+
+        # Act
+        result = provider.run(parameters, Deadline(2))
+
+        # Assert
+        self.assertEqual(result.status, ResultStatus.GREEN)
+
+    def test_unquoted_parameters(self):
+        # Arrange - the values as parsed from unquoted YAML
+        provider = TcpProvider()
+        parameters = {"Target": "127.0.0.1", "Port": int(self.port), "ThresholdMs": 1000}
+
+        # Act
+        provider.validate(parameters)
+        result = provider.run(parameters, Deadline(2))
+
+        # Assert
+        self.assertEqual(result.status, ResultStatus.GREEN)
+        for invalid in [dict(parameters, Port=0), dict(parameters, ThresholdMs=-1)]:
+            with self.assertRaises(ValueError):
+                provider.validate(invalid)
+
+    def test_validate(self):
+        # Arrange
+        provider = TcpProvider()
+
+        # Act & Assert
+        provider.validate({"Target": "db.example.com", "Port": "5432", "ThresholdMs": "50"})
+        for parameters in [
+                {"Target": "db.example.com"},
+                {"Target": "db example.com", "Port": "5432"},
+                {"Target": "db.example.com", "Port": "0"},
+                {"Target": "db.example.com", "Port": "65536"},
+                {"Target": "db.example.com", "Port": "5432", "ThresholdMs": "-1"}]:
+            with self.assertRaises(ValueError):
+                provider.validate(parameters)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+from typing import Dict
+from unittest.mock import patch
+
+# Local imports
+from pulse.metrics import MetricsRegistry
+from pulse.providers import BaseProvider, Deadline, ProviderResult, ProvidersManager, ResultStatus
+
+
+class _LifecycleProvider(BaseProvider):
+    def __init__(self) -> None:
+        self.setups = 0
+        self.teardowns = 0
+
+    def setup(self) -> None:
+        self.setups += 1
+
+    def teardown(self) -> None:
+        self.teardowns += 1
+
+    def run(self, parameters: Dict[str, str], deadline: Deadline = None) -> ProviderResult:
+        return ProviderResult(ResultStatus.GREEN)
+
+
+class _PerProfileProvider(_LifecycleProvider):
+    instance_per_profile = True
+
+
+class TestProvidersManager(unittest.TestCase):
+    def setUp(self):
+        # Registered directly, as they're not under providers/impl, and only
+        # for the test
+        providers = patch.dict(ProvidersManager._providers, {
+            _LifecycleProvider.__name__: _LifecycleProvider,
+            _PerProfileProvider.__name__: _PerProfileProvider})
+        providers.start()
+        self.addCleanup(providers.stop)
+
+    def test_get_instance_shared(self):
+        # Arrange
+        manager = ProvidersManager()
+
+        # Act
+        first = manager.get_instance("_LifecycleProvider", "profile 1")
+        second = manager.get_instance("_LifecycleProvider", "profile 2")
+
+        # Assert
+        self.assertIs(first, second)
+        self.assertEqual(first.setups, 1)
+
+    def test_get_instance_per_profile(self):
+        # Arrange
+        manager = ProvidersManager()
+
+        # Act
+        first = manager.get_instance("_PerProfileProvider", "profile 1")
+        again = manager.get_instance("_PerProfileProvider", "profile 1")
+        second = manager.get_instance("_PerProfileProvider", "profile 2")
+
+        # Assert
+        self.assertIs(first, again)
+        self.assertIsNot(first, second)
+
+    def test_release_instance(self):
+        # Arrange
+        manager = ProvidersManager()
+        instance = manager.get_instance("_PerProfileProvider", "profile 1")
+
+        # Act
+        manager.release_instance("_PerProfileProvider", "profile 1")
+
+        # Assert
+        self.assertEqual(instance.teardowns, 1)
+        self.assertIsNot(manager.get_instance("_PerProfileProvider", "profile 1"), instance)
+
+    def test_teardown(self):
+        # Arrange
+        manager = ProvidersManager()
+        instance = manager.get_instance("_LifecycleProvider")
+
+        # Act
+        manager.teardown()
+
+        # Assert
+        self.assertEqual(instance.teardowns, 1)
+
+    def test_get_prototype_not_set_up(self):
+        # Arrange
+        manager = ProvidersManager()
+
+        # Act
+        prototype = manager.get_prototype("_LifecycleProvider")
+
+        # Assert
+        self.assertEqual(prototype.setups, 0)
+        self.assertIs(manager.get_prototype("_LifecycleProvider"), prototype)
+
+    def test_metrics(self):
+        # Arrange
+        metrics = MetricsRegistry()
+        manager = ProvidersManager(metrics)
+
+        # Act
+        manager.get_instance("_PerProfileProvider", "profile 1")
+        manager.get_instance("_PerProfileProvider", "profile 2")
+        manager.release_instance("_PerProfileProvider", "profile 1")
+
+        # Assert
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['gauges']['provider_instances'], 1)
+        self.assertEqual(snapshot['histograms']['provider_setup_ms{provider=_PerProfileProvider}']['count'], 2)
+        self.assertEqual(snapshot['counters']['provider_teardowns_total{provider=_PerProfileProvider}'], 1)
+
+    def test_unknown_provider(self):
+        # Arrange
+        manager = ProvidersManager()
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            manager.get_instance("Unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
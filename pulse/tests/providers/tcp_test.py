@@ -0,0 +1,98 @@
+import socket
+import unittest
+
+# Local imports
+from pulse.providers.tcp import ConnectEngine
+
+
+class TestConnectEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = ConnectEngine()
+        self.addCleanup(self.engine.close)
+
+    def _listen(self, backlog: int = 128) -> socket.socket:
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(backlog)
+        self.addCleanup(listener.close)
+        return listener
+
+    def _closed_port(self) -> int:
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        return port
+
+    def test_connect(self):
+        # Arrange
+        port = self._listen().getsockname()[1]
+
+        # Act
+        connect_s = self.engine.connect("127.0.0.1", port, 1)
+
+        # Assert
+        self.assertIsNotNone(connect_s)
+        self.assertLess(connect_s, 1)
+        self.assertEqual(self.engine.waiting, 0)
+
+    def test_refused(self):
+        # Act & Assert
+        with self.assertRaises(OSError):
+            self.engine.connect("127.0.0.1", self._closed_port(), 1)
+
+    def test_submit_many(self):
+        # Arrange - a listener per target, and some closed ports
+        ports = [self._listen().getsockname()[1] for _ in range(50)]
+        closed_ports = [self._closed_port() for _ in range(10)]
+
+        # Act
+        futures = [self.engine.submit("127.0.0.1", port, 2) for port in ports]
+        refused = [self.engine.submit("127.0.0.1", port, 2) for port in closed_ports]
+
+        # Assert
+        for future in futures:
+            self.assertIsNotNone(future.result(timeout=3))
+        for future in refused:
+            self.assertIsInstance(future.exception(timeout=3), OSError)
+        self.assertEqual(self.engine.waiting, 0)
+
+    def _backlogged(self) -> int:
+        # A listener which doesn't accept, with its backlog full - further
+        # connects never complete
+        listener = self._listen(0)
+        port = listener.getsockname()[1]
+        for _ in range(2):
+            sock = socket.socket()
+            sock.setblocking(False)
+            sock.connect_ex(('127.0.0.1', port))
+            self.addCleanup(sock.close)
+
+        return port
+
+    def test_timeout(self):
+        # Arrange
+        port = self._backlogged()
+
+        # Act
+        connect_s = self.engine.connect("127.0.0.1", port, 0.2)
+
+        # Assert
+        self.assertIsNone(connect_s)
+        self.assertEqual(self.engine.waiting, 0)
+
+    def test_close(self):
+        # Arrange
+        future = self.engine.submit("127.0.0.1", self._backlogged(), 10)
+
+        # Act
+        self.engine.close()
+
+        # Assert
+        self.assertIsNone(future.result(timeout=2))
+        with self.assertRaises(RuntimeError):
+            self.engine.submit("127.0.0.1", 9, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()